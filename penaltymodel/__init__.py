@@ -1,13 +1,31 @@
 from __future__ import absolute_import
 
+import sys
+
 from penaltymodel.classes import *
 import penaltymodel.classes
 
 from penaltymodel.exceptions import *
 import penaltymodel.exceptions
 
+from penaltymodel.cache import *
+import penaltymodel.cache
+
+from penaltymodel.memo import *
+import penaltymodel.memo
+
+from penaltymodel.registry import *
+import penaltymodel.registry
+
+from penaltymodel.write_behind import *
+import penaltymodel.write_behind
+
 from penaltymodel.interface import *
 import penaltymodel.interface
 
+if sys.version_info >= (3, 5):
+    from penaltymodel.async_interface import *
+    import penaltymodel.async_interface
+
 from penaltymodel.package_info import *
 import penaltymodel.package_info
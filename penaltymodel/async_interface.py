@@ -0,0 +1,197 @@
+"""
+Asyncio Interface
+-----------------
+
+Coroutine versions of the functions in :mod:`penaltymodel.interface`, for use
+inside an :mod:`asyncio` event loop. Only available in Python 3.5+.
+
+Factories and caches may be coroutine functions, in which case they are
+awaited directly. Likewise the `get` and `put` methods of a
+:class:`.PenaltyModelCache` may be coroutine functions. Regular functions are
+run in an executor so that they do not block the event loop.
+
+Examples:
+    >>> @pm.penaltymodel_factory(105)
+    ... async def factory_function(spec):
+    ...     raise pm.MissingPenaltyModel
+    >>> async def main(spec):
+    ...     return await pm.get_penalty_model_async(spec)
+
+"""
+import asyncio
+
+import penaltymodel.interface as interface
+
+from penaltymodel.cache import PenaltyModelCache, _cache_writer
+from penaltymodel.exceptions import FactoryException, ImpossiblePenaltyModel, FactoryTimeout
+from penaltymodel.interface import (iter_factories, iter_caches, _clock, _factory_deadline, _factory_failed,
+                                    _read_memo, _remember, _remember_impossible, _remember_missing,
+                                    _record_impossible, _reduce, _restore, _join, _logger, _NOT_FOUND)
+
+# asyncio.get_running_loop was added in python 3.7, inside a coroutine get_event_loop returns the
+# running loop
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+__all__ = ['get_penalty_model_async']
+
+
+async def get_penalty_model_async(specification, executor=None, timeout=None, timed_out=None, canonical=False,
+                                  gauge=False, decompose=False):
+    """Retrieve a PenaltyModel from one of the available factories.
+
+    The memo, the negative cache and the read-through caches are checked first,
+    then the factories are tried one after another in order of decreasing
+    priority, exactly as in :func:`.get_penalty_model`.
+
+    Args:
+        specification (:class:`.Specification`): The specification
+            for the desired PenaltyModel.
+
+        executor (:class:`concurrent.futures.Executor`, optional):
+            The executor used to run factories and caches that are not coroutine
+            functions. If not provided, the event loop's default executor
+            is used.
+
+        timeout (number, optional):
+            The maximum time, in seconds, to spend searching the factories.
+            See :func:`.get_penalty_model`.
+
+        timed_out (list, optional):
+            If provided, each factory that exceeded its time budget is
+            appended to `timed_out`.
+
+        canonical (bool, optional, default=False):
+            If True, the canonical form of the specification is looked up
+            instead. See :func:`.get_penalty_model`.
+
+        gauge (bool, optional, default=False):
+            If True, the gauge-canonical representative of the specification
+            is looked up instead. See :func:`.get_penalty_model`.
+
+        decompose (bool, optional, default=False):
+            If True, the independent parts of the specification are looked up
+            concurrently and joined. See :func:`.get_penalty_model`.
+
+    Returns:
+        :class:`.PenaltyModel`/None: A PenaltyModel as returned by
+        the highest priority factory, or None if no factory could
+        produce it.
+
+    Raises:
+        :exc:`ImpossiblePenaltyModel`: If the specification
+            describes a penalty model that cannot be built by any
+            factory.
+
+    Notes:
+        Coroutine factories that run out of time are cancelled. Other factories
+        cannot be interrupted and finish in the background.
+
+    """
+    if decompose:
+        parts = specification.decompose()
+        if len(parts) > 1:
+            penalty_models = await asyncio.gather(*(get_penalty_model_async(part, executor, timeout, timed_out,
+                                                                            canonical, gauge)
+                                                    for part in parts))
+            return _join(specification, penalty_models)
+
+    if canonical or gauge:
+        form, mapping, flipped = _reduce(specification, canonical, gauge)
+        pm = await get_penalty_model_async(form, executor, timeout, timed_out)
+        return _restore(pm, mapping, flipped)
+
+    loop = _get_running_loop()
+
+    # the memo and the negative cache are checked first, then the read-through caches, before
+    # any of the factories are loaded
+    pm = _read_memo(specification)
+    if pm is not _NOT_FOUND:
+        return pm
+
+    for cache in iter_caches():
+        if not isinstance(cache, PenaltyModelCache):
+            continue
+
+        try:
+            if asyncio.iscoroutinefunction(cache.get):
+                pm = await cache.get(specification)
+            else:
+                pm = await loop.run_in_executor(executor, cache.get, specification)
+        except ImpossiblePenaltyModel as e:
+            _remember_impossible(specification)
+            raise e
+        except FactoryException:
+            continue
+        except Exception:
+            _logger.exception("reading penalty model cache %r failed", cache)
+            continue
+
+        _remember(specification, pm)
+        return pm
+
+    deadline = None if timeout is None else _clock() + timeout
+    lookup_timed_out = []
+
+    try:
+        pm = await _call_factories(specification, loop, executor, deadline, lookup_timed_out)
+    except ImpossiblePenaltyModel as e:
+        _record_impossible(specification)
+        raise e
+    finally:
+        if timed_out is not None:
+            timed_out.extend(lookup_timed_out)
+
+    if pm is None:
+        _remember_missing(specification, lookup_timed_out)
+        return None
+
+    _remember(specification, pm)
+
+    # if penalty model was found, broadcast to all of the caches concurrently. If write-behind
+    # is enabled, the regular caches are written in the background
+    queue = interface._write_behind
+    writes = []
+    for cache in iter_caches():
+        write = _cache_writer(cache)
+        if asyncio.iscoroutinefunction(write):
+            writes.append(write(pm))
+            continue
+        if queue is not None:
+            try:
+                queue.put(write, pm)
+                continue
+            except RuntimeError:
+                # write-behind was disabled since the queue was read
+                pass
+        writes.append(loop.run_in_executor(executor, write, pm))
+    await asyncio.gather(*writes)
+
+    return pm
+
+
+async def _call_factories(specification, loop, executor, deadline, timed_out):
+    """Call the factories in order of priority until one gives a penalty model, see
+    interface._call_factories."""
+    for factory in iter_factories():
+        factory_deadline = _factory_deadline(factory, _clock(), deadline)
+
+        try:
+            if factory_deadline is not None and factory_deadline <= _clock():
+                raise FactoryTimeout("factory {} had no time left in its time budget".format(factory))
+
+            if asyncio.iscoroutinefunction(factory):
+                call = factory(specification)
+            else:
+                call = loop.run_in_executor(executor, factory, specification)
+
+            if factory_deadline is None:
+                return await call
+            try:
+                return await asyncio.wait_for(call, factory_deadline - _clock())
+            except asyncio.TimeoutError:
+                raise FactoryTimeout("factory {} did not return within its time budget".format(factory))
+        except FactoryException as e:
+            if _factory_failed(factory, e, deadline, timed_out):
+                return None
+
+    return None
@@ -0,0 +1,140 @@
+"""
+Caches
+------
+
+Caches identified through the :const:`CACHE_ENTRYPOINT` entrypoint receive every
+PenaltyModel produced by a factory. A cache that is a plain function is only
+written to. A cache that implements :class:`PenaltyModelCache` is also read
+from: :func:`.get_penalty_model` asks it for the penalty model before any of
+the factories are loaded or called.
+
+Examples:
+    >>> class DictCache(pm.PenaltyModelCache):
+    ...     def __init__(self):
+    ...         self.models = {}
+    ...     def get(self, specification):
+    ...         for penalty_model in self.models.get(len(specification), []):
+    ...             if pm.Specification.__eq__(specification, penalty_model):
+    ...                 return penalty_model
+    ...         raise pm.MissingPenaltyModel
+    ...     def put(self, penalty_model):
+    ...         self.models.setdefault(len(penalty_model), []).append(penalty_model)
+    >>> pm.register_cache(DictCache())
+
+"""
+from __future__ import absolute_import
+
+import abc
+
+from six import add_metaclass
+
+from penaltymodel.classes.specification import Specification
+from penaltymodel.exceptions import FactoryException, ImpossiblePenaltyModel
+
+__all__ = ['PenaltyModelCache']
+
+
+@add_metaclass(abc.ABCMeta)
+class PenaltyModelCache(object):
+    """Abstract base class for read-through penalty model caches.
+
+    Subclasses must implement :meth:`.get` and :meth:`.put`. Any class that
+    defines both is treated as a PenaltyModelCache, even if it does not
+    inherit from it.
+
+    Instances are callable, calling one is the same as calling :meth:`.put`, so
+    they can also be used wherever a write-only cache function is expected.
+
+    """
+
+    @abc.abstractmethod
+    def get(self, specification):
+        """Retrieve a PenaltyModel matching the specification.
+
+        Args:
+            specification (:class:`.Specification`): The specification
+                for the desired PenaltyModel.
+
+        Returns:
+            :class:`.PenaltyModel`
+
+        Raises:
+            :exc:`MissingPenaltyModel`: If the cache does not hold a matching
+                penalty model.
+
+        """
+        pass
+
+    def get_many(self, specifications):
+        """Retrieve PenaltyModels for several specifications.
+
+        The default implementation calls :meth:`.get` for each specification,
+        caches that can look up many specifications at once should override it.
+
+        Args:
+            specifications (list[:class:`.Specification`]): The specifications
+                for the desired PenaltyModels.
+
+        Returns:
+            list[:class:`.PenaltyModel`/None/:exc:`ImpossiblePenaltyModel`]: The
+            penalty models, in the same order as `specifications`, with None
+            for each one that is not in the cache and the exception raised by
+            :meth:`.get` for each one that the cache knows to be impossible.
+
+        """
+        penalty_models = []
+        for specification in specifications:
+            try:
+                penalty_models.append(self.get(specification))
+            except ImpossiblePenaltyModel as e:
+                penalty_models.append(e)
+            except FactoryException:
+                penalty_models.append(None)
+        return penalty_models
+
+    @abc.abstractmethod
+    def put(self, penalty_model):
+        """Add a PenaltyModel to the cache.
+
+        Args:
+            penalty_model (:class:`.PenaltyModel`): The penalty model to cache.
+
+        """
+        pass
+
+    def put_impossible(self, specification):
+        """Record that the penalty model for the specification is impossible.
+
+        Called only when negative caching is enabled with `use_caches=True`,
+        see :func:`.enable_negative_cache`. The default implementation does
+        nothing, caches that support it should raise :exc:`ImpossiblePenaltyModel`
+        from :meth:`.get` for the specification afterwards.
+
+        Args:
+            specification (:class:`.Specification`): The specification.
+
+        """
+        pass
+
+    def __call__(self, penalty_model):
+        self.put(penalty_model)
+
+    @classmethod
+    def __subclasshook__(cls, C):
+        if cls is PenaltyModelCache:
+            if all(any(name in B.__dict__ for B in C.__mro__) for name in ('get', 'put')):
+                return True
+        return NotImplemented
+
+
+def _cache_writer(cache):
+    """The function that writes a penalty model to the given cache."""
+    if isinstance(cache, PenaltyModelCache):
+        return cache.put
+    return cache
+
+
+def _specification_key(specification):
+    """A hashable key such that specifications with equal keys give the same PenaltyModel."""
+    # for PenaltyModels we want the fingerprint of the specification alone, not the model
+    return Specification.fingerprint.fget(specification)
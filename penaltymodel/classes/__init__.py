@@ -6,6 +6,21 @@ import penaltymodel.classes.vartypes
 from penaltymodel.classes.binary_quadratic_model import *
 import penaltymodel.classes.binary_quadratic_model
 
+from penaltymodel.classes.array_binary_quadratic_model import *
+import penaltymodel.classes.array_binary_quadratic_model
+
+from penaltymodel.classes.flip_evaluator import *
+import penaltymodel.classes.flip_evaluator
+
+from penaltymodel.classes.graph import *
+import penaltymodel.classes.graph
+
+from penaltymodel.classes.ranges import *
+import penaltymodel.classes.ranges
+
+from penaltymodel.classes.feasible_configurations import *
+import penaltymodel.classes.feasible_configurations
+
 from penaltymodel.classes.specification import *
 import penaltymodel.classes.specification
 
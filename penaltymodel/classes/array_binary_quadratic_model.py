@@ -0,0 +1,823 @@
+"""
+ArrayBinaryQuadraticModel
+-------------------------
+"""
+from __future__ import absolute_import
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    # python 2
+    from collections import Mapping
+
+import numpy as np
+
+from six import iteritems, itervalues, iterkeys
+
+from penaltymodel.classes.binary_quadratic_model import BinaryQuadraticModel, _pairs
+from penaltymodel.classes.vartypes import Vartype, _check_vartype
+
+__all__ = ['ArrayBinaryQuadraticModel']
+
+# Interactions added since the sorted edge lookup was built are kept in a dict, the lookup is
+# rebuilt once there are more of them than this or than interactions in the lookup.
+_MIN_RECENT_INTERACTIONS = 1024
+
+
+class ArrayBinaryQuadraticModel(BinaryQuadraticModel):
+    """A binary quadratic model with its biases stored in arrays.
+
+    The variables are numbered by a label-to-index table. The linear biases
+    are held in a float64 vector and the quadratic biases in coordinate
+    (COO) form, as two index vectors and a float64 vector of biases. For a
+    model of 20000 variables and 100000 interactions this uses about a fifth
+    of the memory of a :class:`.BinaryQuadraticModel`, and over a third of
+    that is the label-to-index table. Construction does not build an
+    adjacency structure, a compressed sparse row (CSR) adjacency is built the
+    first time it is needed.
+
+    The :attr:`linear`, :attr:`quadratic` and :attr:`adj` attributes are
+    read-only dict-like views of the arrays, so an ArrayBinaryQuadraticModel
+    can be used anywhere a :class:`.BinaryQuadraticModel` is expected. The
+    model is changed with the methods of :class:`.BinaryQuadraticModel`, such
+    as :meth:`.add_interaction`. Additions grow the arrays geometrically,
+    removals compact them. Editing the arrays directly does not discard the
+    derived structures, call :meth:`.invalidate` afterwards.
+
+    Args:
+        linear (dict):
+            The linear biases, see :class:`.BinaryQuadraticModel`.
+
+        quadratic (dict):
+            The quadratic biases, see :class:`.BinaryQuadraticModel`.
+
+        offset (number):
+            The energy offset associated with the model.
+
+        vartype (:class:`.Vartype`/str/set):
+            The variable type desired for the penalty model.
+            Accepted input values:
+            :class:`.Vartype.SPIN`, ``'SPIN'``, ``{-1, 1}``
+            :class:`.Vartype.BINARY`, ``'BINARY'``, ``{0, 1}``
+
+    Attributes:
+        variables (list): The variable labels, in index order.
+
+        linear_biases (:class:`numpy.ndarray`): The linear bias of each variable.
+
+        row (:class:`numpy.ndarray`): The index of the first variable of each interaction.
+
+        col (:class:`numpy.ndarray`): The index of the second variable of each interaction.
+
+        quadratic_biases (:class:`numpy.ndarray`): The bias of each interaction.
+
+        offset (number): The energy offset associated with the model.
+
+        vartype (:class:`.Vartype`): The model's type.
+
+    Examples:
+        >>> model = pm.ArrayBinaryQuadraticModel({'a': 1, 'b': -1}, {('a', 'b'): .5}, 0.0, pm.SPIN)
+        >>> model.linear['b']
+        -1.0
+        >>> model.adj['b']['a']
+        0.5
+        >>> model == pm.BinaryQuadraticModel({'a': 1, 'b': -1}, {('a', 'b'): .5}, 0.0, pm.SPIN)
+        True
+
+    """
+    def __init__(self, linear, quadratic, offset, vartype):
+        vartype = _check_vartype(vartype)
+
+        if not isinstance(linear, Mapping):
+            raise TypeError("expected `linear` to be a dict")
+        if not isinstance(quadratic, Mapping):
+            raise TypeError("expected `quadratic` to be a dict")
+
+        variables = list(linear)
+        index = {v: idx for idx, v in enumerate(variables)}
+        linear_biases = np.fromiter(itervalues(linear), dtype=np.float64, count=len(variables))
+
+        try:
+            dtype = _index_dtype(len(variables))
+            row = np.fromiter((index[u] for u, __ in quadratic), dtype=dtype, count=len(quadratic))
+            col = np.fromiter((index[v] for __, v in quadratic), dtype=dtype, count=len(quadratic))
+        except KeyError:
+            raise ValueError("each u, v in `quadratic` must also be in `linear`")
+        except (ValueError, TypeError):
+            raise ValueError("keys of `quadratic` must be 2-tuples")
+        quadratic_biases = np.fromiter(itervalues(quadratic), dtype=np.float64, count=len(quadratic))
+
+        self._set(variables, linear_biases, row, col, quadratic_biases, offset, vartype, index)
+
+    def _set(self, variables, linear_biases, row, col, quadratic_biases, offset, vartype, index=None):
+        """Set the arrays, checking the interactions."""
+        if np.any(row == col):
+            u = variables[row[row == col][0]]
+            raise ValueError("bias ({}, {}) in `quadratic` is a linear bias".format(u, u))
+
+        self.variables = variables
+        self._index = {v: idx for idx, v in enumerate(variables)} if index is None else index
+        self.linear_biases = linear_biases
+        self.row = row
+        self.col = col
+        self.quadratic_biases = quadratic_biases
+        self.offset = offset
+        self.vartype = vartype
+        self._buffers = {}
+        self.invalidate()
+
+        if len(row):
+            # the lookup is not kept, it is built again if it is needed
+            keys = np.sort(_edge_keys(row, col))
+            if np.any(keys[1:] == keys[:-1]):
+                raise ValueError(("`quadratic` must be upper triangular. "
+                                  "That is if (u, v) in `quadratic`, (v, u) not in quadratic"))
+
+    _state_attributes = ('variables', '_index', 'linear_biases', 'row', 'col', 'quadratic_biases',
+                         '_offset', 'vartype', '_version', '_buffers', '_lookup', '_csr', '_cache', '_cache_stamp')
+
+    def invalidate(self):
+        """Discard the structures derived from the arrays, see :meth:`.BinaryQuadraticModel.invalidate`."""
+        self._lookup = None
+        self._csr = None
+        self._cache = {}
+        self._cache_stamp = None
+
+    def _stamp(self):
+        # the arrays are only tracked through the methods that change them, which invalidate
+        return self._version
+
+    @classmethod
+    def from_arrays(cls, linear_biases, row, col, quadratic_biases, offset, vartype, variables=None):
+        """Construct an ArrayBinaryQuadraticModel from arrays.
+
+        Args:
+            linear_biases (array-like): The linear bias of each variable.
+            row (array-like): The index of the first variable of each interaction.
+            col (array-like): The index of the second variable of each interaction.
+            quadratic_biases (array-like): The bias of each interaction.
+            offset (number): The energy offset.
+            vartype (:class:`.Vartype`/str/set): The variable type.
+            variables (iterable, optional): The variable labels, in index
+                order. Defaults to the indices themselves.
+
+        Returns:
+            :class:`.ArrayBinaryQuadraticModel`
+
+        Examples:
+            >>> model = pm.ArrayBinaryQuadraticModel.from_arrays([0, 0, 0], [0, 1], [1, 2], [-1, -1], 0.0, pm.SPIN)
+            >>> sorted(model.quadratic.items())
+            [((0, 1), -1.0), ((1, 2), -1.0)]
+
+        """
+        vartype = _check_vartype(vartype)
+
+        linear_biases = np.array(linear_biases, dtype=np.float64).reshape(-1)
+        quadratic_biases = np.array(quadratic_biases, dtype=np.float64).reshape(-1)
+
+        num_variables = len(linear_biases)
+        row = np.array(row, dtype=_index_dtype(num_variables)).reshape(-1)
+        col = np.array(col, dtype=_index_dtype(num_variables)).reshape(-1)
+        if variables is None:
+            variables = list(range(num_variables))
+        else:
+            variables = list(variables)
+            if len(variables) != num_variables:
+                raise ValueError("there should be one label for each linear bias")
+        if not (len(row) == len(col) == len(quadratic_biases)):
+            raise ValueError("row, col and quadratic_biases should all be the same length")
+        if len(row) and (min(row.min(), col.min()) < 0 or max(row.max(), col.max()) >= num_variables):
+            raise ValueError("each u, v in `quadratic` must also be in `linear`")
+
+        index = {v: idx for idx, v in enumerate(variables)}
+        if len(index) != num_variables:
+            raise ValueError("the variable labels should be unique")
+
+        model = cls.__new__(cls)
+        model._set(variables, linear_biases, row, col, quadratic_biases, offset, vartype, index)
+        return model
+
+    @classmethod
+    def from_model(cls, model):
+        """Construct an ArrayBinaryQuadraticModel from any :class:`.BinaryQuadraticModel`.
+
+        Args:
+            model (:class:`.BinaryQuadraticModel`)
+
+        Returns:
+            :class:`.ArrayBinaryQuadraticModel`
+
+        """
+        if isinstance(model, ArrayBinaryQuadraticModel):
+            return model.copy()
+        return cls(model.linear, model.quadratic, model.offset, model.vartype)
+
+    #
+    # views
+    #
+
+    @property
+    def index(self):
+        """dict: Maps each variable label to its index. It should not be modified."""
+        return self._index
+
+    @property
+    def linear(self):
+        """A read-only dict-like view of the linear biases."""
+        return _LinearView(self)
+
+    @property
+    def quadratic(self):
+        """A read-only dict-like view of the quadratic biases."""
+        return _QuadraticView(self)
+
+    @property
+    def adj(self):
+        """A read-only dict-like view of the adjacency, see :attr:`.BinaryQuadraticModel.adj`."""
+        return _AdjacencyView(self)
+
+    def _edge_lookup(self):
+        """A 3-tuple, the sorted keys of the interactions (min index << 32 | max index), the
+        position of each in the COO arrays, or -1 if it was removed, and a dict of the keys and
+        positions of the interactions added since."""
+        lookup = self._lookup
+        if lookup is None:
+            keys = _edge_keys(self.row, self.col)
+            order = np.argsort(keys, kind='mergesort')
+            self._lookup = lookup = (keys[order], order, {})
+        return lookup
+
+    def _edge_slot(self, key):
+        """Where the interaction with the given key is in the lookup, either ('recent', key),
+        ('sorted', idx) or None."""
+        keys, order, recent = self._edge_lookup()
+        if key in recent:
+            return recent, key
+        idx = int(np.searchsorted(keys, key))
+        if idx < len(keys) and keys[idx] == key and order[idx] >= 0:
+            return order, idx
+        return None
+
+    def _edge_position(self, i, j):
+        """The position of the interaction between the variables with indices i, j, or -1."""
+        slot = self._edge_slot((min(i, j) << 32) | max(i, j))
+        if slot is None:
+            return -1
+        table, key = slot
+        return int(table[key])
+
+    def _record_edges(self, keys, positions):
+        """Add new interactions to the lookup."""
+        lookup = self._lookup
+        if lookup is None:
+            return
+        recent = lookup[2]
+        recent.update(zip(keys, positions))
+        if len(recent) > max(_MIN_RECENT_INTERACTIONS, len(lookup[0])):
+            self._lookup = None
+
+    def _append(self, name, values):
+        """Append values to the named array, in a buffer that grows geometrically."""
+        array = getattr(self, name)
+        size = len(array) + len(values)
+        buffer = self._buffers.get(name)
+        if buffer is None or array.base is not buffer or len(buffer) < size:
+            buffer = np.empty(max(size, 2 * len(array), 16), dtype=array.dtype)
+            buffer[:len(array)] = array
+            self._buffers[name] = buffer
+        buffer[len(array):size] = values
+        setattr(self, name, buffer[:size])
+
+    def _adjacency(self):
+        """The CSR adjacency, a 3-tuple (indptr, neighbors, positions) where the neighbors of the
+        variable with index i are neighbors[indptr[i]:indptr[i + 1]] and positions gives the
+        position of each of those interactions in the COO arrays."""
+        csr = self._csr
+        if csr is None:
+            row, col = self.row, self.col
+            num_interactions = len(row)
+            endpoints = np.concatenate((row, col))
+            order = np.argsort(endpoints, kind='mergesort')
+            neighbors = np.concatenate((col, row))[order]
+            positions = np.concatenate((np.arange(num_interactions), np.arange(num_interactions)))[order]
+            indptr = np.zeros(len(self.variables) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(endpoints, minlength=len(self.variables)), out=indptr[1:])
+            self._csr = csr = (indptr, neighbors, positions)
+        return csr
+
+    #
+    # BinaryQuadraticModel methods with array implementations
+    #
+
+    def __repr__(self):
+        return 'ArrayBinaryQuadraticModel({}, {}, {}, {})'.format(dict(self.linear), dict(self.quadratic),
+                                                                  self.offset, self.vartype)
+
+    def __eq__(self, model):
+        if not isinstance(model, ArrayBinaryQuadraticModel):
+            return BinaryQuadraticModel.__eq__(self, model)
+
+        if (self.vartype != model.vartype or self.offset != model.offset or
+                len(self.variables) != len(model.variables) or len(self.row) != len(model.row)):
+            return False
+
+        # put the other model's arrays in the index order of this one
+        index = self._index
+        try:
+            relabel = np.fromiter((index[v] for v in model.variables), dtype=np.int64, count=len(model.variables))
+        except (KeyError, TypeError):
+            return False
+
+        linear_biases = np.empty_like(self.linear_biases)
+        linear_biases[relabel] = model.linear_biases
+        if not np.array_equal(self.linear_biases, linear_biases):
+            return False
+
+        keys = _edge_keys(self.row, self.col)
+        order = np.argsort(keys, kind='mergesort')
+        keys = keys[order]
+        other_keys = _edge_keys(relabel[model.row], relabel[model.col])
+        other_order = np.argsort(other_keys, kind='mergesort')
+        return (np.array_equal(keys, other_keys[other_order]) and
+                np.array_equal(self.quadratic_biases[order], model.quadratic_biases[other_order]))
+
+    def __ne__(self, model):
+        return not self.__eq__(model)
+
+    def __len__(self):
+        return len(self.variables)
+
+    def _sample_vector(self, sample):
+        return np.fromiter((sample[v] for v in self.variables), dtype=np.float64, count=len(self.variables))
+
+    def energy(self, sample):
+        """Determines the energy of the given sample, see :meth:`.BinaryQuadraticModel.energy`."""
+        values = self._sample_vector(sample)
+        return (self.offset + float(self.linear_biases.dot(values)) +
+                float(self.quadratic_biases.dot(values[self.row] * values[self.col])))
+
+    def _arrays(self):
+        return (self.variables, self._index, self.linear_biases, self.row, self.col, self.quadratic_biases)
+
+    def copy(self):
+        """Create a copy of the ArrayBinaryQuadraticModel.
+
+        Returns:
+            :class:`.ArrayBinaryQuadraticModel`
+
+        """
+        return self._derived(list(self.variables), self.linear_biases.copy(), self.quadratic_biases.copy(),
+                             self.offset, self.vartype, dict(self._index))
+
+    def _derived(self, variables, linear_biases, quadratic_biases, offset, vartype, index=None):
+        """A new model with the same interactions (copied) as this one and the given biases."""
+        model = ArrayBinaryQuadraticModel.__new__(ArrayBinaryQuadraticModel)
+        model.variables = variables
+        model._index = {v: idx for idx, v in enumerate(variables)} if index is None else index
+        model.linear_biases = linear_biases
+        model.row = self.row.copy()
+        model.col = self.col.copy()
+        model.quadratic_biases = quadratic_biases
+        model.offset = offset
+        model.vartype = vartype
+        model._buffers = {}
+        model.invalidate()
+        return model
+
+    def _variable_indices(self, variables):
+        """The index of each variable, adding the variables not in the model with a linear bias of 0."""
+        index = self._index
+        labels = self.variables
+        num_variables = len(labels)
+
+        indices = []
+        for v in variables:
+            idx = index.get(v)
+            if idx is None:
+                index[v] = idx = len(labels)
+                labels.append(v)
+            indices.append(idx)
+
+        if len(labels) > num_variables:
+            self._append('linear_biases', np.zeros(len(labels) - num_variables))
+            self._csr = None
+        return indices
+
+    def add_variable(self, v, bias):
+        """Add a variable, see :meth:`.BinaryQuadraticModel.add_variable`."""
+        idx, = self._variable_indices([v])
+        self.linear_biases[idx] += bias
+        self._cache = {}
+
+    def add_variables_from(self, linear, biases=None):
+        """Add variables, see :meth:`.BinaryQuadraticModel.add_variables_from`."""
+        variables, biases = _unzip(_pairs(linear, biases), 1)
+        indices = self._variable_indices(variables)
+        np.add.at(self.linear_biases, indices, biases)
+        self._cache = {}
+
+    def add_interaction(self, u, v, bias):
+        """Add an interaction, see :meth:`.BinaryQuadraticModel.add_interaction`."""
+        if u == v:
+            raise ValueError("bias ({}, {}) is a linear bias".format(u, v))
+
+        i, j = self._variable_indices((u, v))
+        pos = self._edge_position(i, j)
+        if pos >= 0:
+            self.quadratic_biases[pos] += bias
+        else:
+            self._append('row', (i,))
+            self._append('col', (j,))
+            self._append('quadratic_biases', (bias,))
+            self._csr = None
+            self._record_edges(((min(i, j) << 32) | max(i, j),), (len(self.row) - 1,))
+        self._cache = {}
+
+    def add_interactions_from(self, quadratic, biases=None):
+        """Add interactions, see :meth:`.BinaryQuadraticModel.add_interactions_from`.
+
+        The interactions are added with a few array operations.
+
+        """
+        if biases is None and not isinstance(quadratic, Mapping):
+            triples = quadratic.tolist() if isinstance(quadratic, np.ndarray) else quadratic
+            us, vs, biases = _unzip(((u, v, bias) for u, v, bias in triples), 2)
+        else:
+            us, vs, biases = _unzip(((u, v, bias) for (u, v), bias in _pairs(quadratic, biases)), 2)
+        if not len(biases):
+            return
+
+        for u, v in zip(us, vs):
+            if u == v:
+                raise ValueError("bias ({}, {}) is a linear bias".format(u, v))
+
+        dtype = self.row.dtype
+        row = np.array(self._variable_indices(us), dtype=dtype)
+        col = np.array(self._variable_indices(vs), dtype=dtype)
+
+        # combine repeated interactions, keeping the first orientation
+        keys, first, inverse = np.unique(_edge_keys(row, col), return_index=True, return_inverse=True)
+        biases = np.bincount(inverse.reshape(-1), biases, minlength=len(keys))
+
+        # the position of the interactions already in the model
+        sorted_keys, order, recent = self._edge_lookup()
+        idx = np.minimum(np.searchsorted(sorted_keys, keys), max(len(sorted_keys) - 1, 0))
+        if len(sorted_keys):
+            positions = np.where(sorted_keys[idx] == keys, order[idx], -1)
+        else:
+            positions = np.full(len(keys), -1, dtype=np.int64)
+        if recent:
+            positions = np.maximum(positions, [recent.get(key, -1) for key in keys.tolist()])
+
+        new = positions < 0
+        np.add.at(self.quadratic_biases, positions[~new], biases[~new])
+
+        if np.any(new):
+            start = len(self.row)
+            self._append('row', row[first[new]])
+            self._append('col', col[first[new]])
+            self._append('quadratic_biases', biases[new])
+            self._csr = None
+            self._record_edges(keys[new].tolist(), range(start, len(self.row)))
+        self._cache = {}
+
+    def remove_interaction(self, u, v):
+        """Remove an interaction, see :meth:`.BinaryQuadraticModel.remove_interaction`.
+
+        The last interaction takes the position of the removed one.
+
+        """
+        index = self._index
+        try:
+            i, j = index[u], index[v]
+        except KeyError:
+            i = j = None
+        slot = None if i is None else self._edge_slot((min(i, j) << 32) | max(i, j))
+        if slot is None:
+            raise ValueError("there is no interaction between {!r} and {!r}".format(u, v))
+
+        table, key = slot
+        pos = int(table[key])
+        if table is self._lookup[2]:
+            del table[key]
+        else:
+            table[key] = -1
+
+        last = len(self.row) - 1
+        if pos != last:
+            # move the last interaction into the gap
+            self.row[pos] = i = int(self.row[last])
+            self.col[pos] = j = int(self.col[last])
+            self.quadratic_biases[pos] = self.quadratic_biases[last]
+            table, key = self._edge_slot((min(i, j) << 32) | max(i, j))
+            table[key] = pos
+
+        self.row = self.row[:last]
+        self.col = self.col[:last]
+        self.quadratic_biases = self.quadratic_biases[:last]
+        self._csr = None
+        self._cache = {}
+
+    def remove_variable(self, v):
+        """Remove a variable, see :meth:`.BinaryQuadraticModel.remove_variable`.
+
+        The arrays are compacted, in O(len(model) + len(model.quadratic)), and
+        the last variable takes the index of the removed one.
+
+        """
+        index = self._index
+        if v not in index:
+            raise ValueError("{!r} is not a variable of the model".format(v))
+        i = index.pop(v)
+
+        row, col = self.row, self.col
+        keep = (row != i) & (col != i)
+        row, col = row[keep], col[keep]
+        self.quadratic_biases = self.quadratic_biases[keep]
+
+        variables = self.variables
+        last = len(variables) - 1
+        if i != last:
+            # move the last variable into the gap
+            variables[i] = w = variables[last]
+            index[w] = i
+            self.linear_biases[i] = self.linear_biases[last]
+            row[row == last] = i
+            col[col == last] = i
+        variables.pop()
+        self.linear_biases = self.linear_biases[:last]
+        self.row, self.col = row, col
+        self.invalidate()
+
+    def scale(self, scalar):
+        """Multiply the biases and the offset, see :meth:`.BinaryQuadraticModel.scale`."""
+        self.linear_biases *= scalar
+        self.quadratic_biases *= scalar
+        self.offset *= scalar
+        self._cache = {}
+
+    def relabel_variables(self, mapping, copy=True):
+        """Relabel the variables according to the given mapping.
+
+        See :meth:`.BinaryQuadraticModel.relabel_variables`. Only the
+        label-to-index table changes, the arrays are untouched.
+
+        """
+        try:
+            old_labels = set(iterkeys(mapping))
+            new_labels = set(itervalues(mapping))
+        except TypeError:
+            raise ValueError("mapping targets must be hashable objects")
+
+        index = self._index
+        for v in new_labels:
+            if v in index and v not in old_labels:
+                raise ValueError(('A variable cannot be relabeled "{}" without also relabeling '
+                                  "the existing variable of the same name").format(v))
+
+        variables = [mapping.get(v, v) for v in self.variables]
+        new_index = {v: idx for idx, v in enumerate(variables)}
+        if len(new_index) != len(variables):
+            raise ValueError("the mapping would give two variables the same label")
+
+        if copy:
+            return self._derived(variables, self.linear_biases.copy(), self.quadratic_biases.copy(),
+                                 self.offset, self.vartype, new_index)
+
+        self.variables = variables
+        self._index = new_index
+        self._cache = {}
+        return self
+
+    def flip_variables(self, variables):
+        """Create a new ArrayBinaryQuadraticModel with the given variables flipped.
+
+        See :meth:`.BinaryQuadraticModel.flip_variables`.
+
+        """
+        index = self._index
+        flipped = np.zeros(len(self.variables), dtype=bool)
+        flipped[[index[v] for v in variables if v in index]] = True
+
+        row, col = self.row, self.col
+        linear_biases = self.linear_biases.copy()
+        quadratic_biases = self.quadratic_biases.copy()
+        offset = self.offset
+
+        if self.vartype is Vartype.SPIN:
+            linear_biases[flipped] *= -1
+            quadratic_biases[flipped[row] != flipped[col]] *= -1
+        else:
+            # x -> 1 - x moves part of each bias into the lower order terms
+            num_variables = len(linear_biases)
+            offset += float(linear_biases[flipped].sum())
+            linear_biases[flipped] *= -1
+
+            both = flipped[row] & flipped[col]
+            offset += float(quadratic_biases[both].sum())
+            linear_biases -= (np.bincount(row[both], quadratic_biases[both], minlength=num_variables) +
+                              np.bincount(col[both], quadratic_biases[both], minlength=num_variables))
+
+            only_row = flipped[row] & ~flipped[col]
+            only_col = flipped[col] & ~flipped[row]
+            linear_biases += (np.bincount(col[only_row], quadratic_biases[only_row], minlength=num_variables) +
+                              np.bincount(row[only_col], quadratic_biases[only_col], minlength=num_variables))
+            quadratic_biases[only_row | only_col] *= -1
+
+        return self._derived(list(self.variables), linear_biases, quadratic_biases, offset, self.vartype,
+                             dict(index))
+
+    def _converted(self):
+        linear_biases, quadratic_biases, offset = self._converted_arrays()
+        vartype = Vartype.BINARY if self.vartype is Vartype.SPIN else Vartype.SPIN
+        return self._derived(list(self.variables), linear_biases, quadratic_biases, offset, vartype,
+                             dict(self._index))
+
+    def _converted_arrays(self):
+        """The linear biases, quadratic biases and offset for the other vartype."""
+        num_variables = len(self.variables)
+        linear_biases = self.linear_biases
+        quadratic_biases = self.quadratic_biases
+
+        # the sum of the quadratic biases of the interactions of each variable
+        incident = (np.bincount(self.row, quadratic_biases, minlength=num_variables) +
+                    np.bincount(self.col, quadratic_biases, minlength=num_variables))
+
+        if self.vartype is Vartype.SPIN:
+            return (2. * linear_biases - 2. * incident,
+                    4. * quadratic_biases,
+                    self.offset + float(quadratic_biases.sum()) - float(linear_biases.sum()))
+        else:
+            return (.5 * linear_biases + .25 * incident,
+                    .25 * quadratic_biases,
+                    self.offset + .5 * float(linear_biases.sum()) + .25 * float(quadratic_biases.sum()))
+
+
+def _unzip(items, num_labels):
+    """Split an iterable of tuples into lists of the first num_labels fields and an array of the
+    last one."""
+    columns = list(zip(*items))
+    if not columns:
+        return tuple([] for __ in range(num_labels)) + (np.zeros(0),)
+    return tuple(list(column) for column in columns[:-1]) + (np.array(columns[-1], dtype=np.float64),)
+
+
+def _index_dtype(num_variables):
+    return np.int32 if num_variables < 2 ** 31 else np.int64
+
+
+def _edge_keys(row, col):
+    """A key for each interaction, independent of the order of its variables."""
+    row = row.astype(np.int64)
+    col = col.astype(np.int64)
+    return (np.minimum(row, col) << 32) | np.maximum(row, col)
+
+
+class _LinearView(Mapping):
+    """The linear biases of an ArrayBinaryQuadraticModel, as a dict-like view."""
+    def __init__(self, model):
+        self._model = model
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getitem__(self, v):
+        model = self._model
+        try:
+            return float(model.linear_biases[model._index[v]])
+        except TypeError:
+            raise KeyError(v)
+
+    def __iter__(self):
+        return iter(self._model.variables)
+
+    def __len__(self):
+        return len(self._model.variables)
+
+    def __contains__(self, v):
+        try:
+            return v in self._model._index
+        except TypeError:
+            return False
+
+    def items(self):
+        model = self._model
+        return list(zip(model.variables, model.linear_biases.tolist()))
+
+    def values(self):
+        return self._model.linear_biases.tolist()
+
+    def copy(self):
+        return dict(self.items())
+
+
+class _QuadraticView(Mapping):
+    """The quadratic biases of an ArrayBinaryQuadraticModel, as a dict-like view. Like a dict
+    of the quadratic biases, each interaction is keyed in one direction only."""
+    def __init__(self, model):
+        self._model = model
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def _position(self, key):
+        model = self._model
+        index = model._index
+        try:
+            u, v = key
+            i, j = index[u], index[v]
+        except (KeyError, TypeError, ValueError):
+            return -1
+        pos = model._edge_position(i, j)
+        if pos >= 0 and model.row[pos] != i:
+            # stored the other way around
+            return -1
+        return pos
+
+    def __getitem__(self, key):
+        pos = self._position(key)
+        if pos < 0:
+            raise KeyError(key)
+        return float(self._model.quadratic_biases[pos])
+
+    def __contains__(self, key):
+        return self._position(key) >= 0
+
+    def __iter__(self):
+        model = self._model
+        variables = model.variables
+        for i, j in zip(model.row.tolist(), model.col.tolist()):
+            yield variables[i], variables[j]
+
+    def __len__(self):
+        return len(self._model.row)
+
+    def items(self):
+        return list(zip(self, self._model.quadratic_biases.tolist()))
+
+    def values(self):
+        return self._model.quadratic_biases.tolist()
+
+    def copy(self):
+        return dict(self.items())
+
+
+class _AdjacencyView(Mapping):
+    """The adjacency of an ArrayBinaryQuadraticModel, as a dict-like view."""
+    def __init__(self, model):
+        self._model = model
+
+    def __repr__(self):
+        return repr({v: dict(neighbors) for v, neighbors in iteritems(self)})
+
+    def __getitem__(self, v):
+        try:
+            return _NeighborView(self._model, self._model._index[v])
+        except TypeError:
+            raise KeyError(v)
+
+    def __iter__(self):
+        return iter(self._model.variables)
+
+    def __len__(self):
+        return len(self._model.variables)
+
+
+class _NeighborView(Mapping):
+    """The neighbors of one variable of an ArrayBinaryQuadraticModel, and the biases of their
+    interactions."""
+    def __init__(self, model, i):
+        self._model = model
+        self._i = i
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getitem__(self, v):
+        model = self._model
+        try:
+            pos = model._edge_position(self._i, model._index[v])
+        except (KeyError, TypeError):
+            raise KeyError(v)
+        if pos < 0:
+            raise KeyError(v)
+        return float(model.quadratic_biases[pos])
+
+    def _slice(self):
+        indptr, neighbors, positions = self._model._adjacency()
+        return neighbors[indptr[self._i]:indptr[self._i + 1]], positions[indptr[self._i]:indptr[self._i + 1]]
+
+    def __iter__(self):
+        variables = self._model.variables
+        for j in self._slice()[0].tolist():
+            yield variables[j]
+
+    def __len__(self):
+        indptr = self._model._adjacency()[0]
+        return int(indptr[self._i + 1] - indptr[self._i])
+
+    def items(self):
+        neighbors, positions = self._slice()
+        variables = self._model.variables
+        return list(zip([variables[j] for j in neighbors.tolist()],
+                        self._model.quadratic_biases[positions].tolist()))
@@ -6,12 +6,58 @@ from __future__ import absolute_import
 
 import itertools
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    # python 2
+    from collections import Mapping
+
+import numpy as np
+
 from six import itervalues, iteritems, iterkeys
 
-from penaltymodel.classes.vartypes import Vartype
+from penaltymodel.classes.flip_evaluator import FlipEvaluator
+from penaltymodel.classes.vartypes import Vartype, _check_vartype
 
 __all__ = ['BinaryQuadraticModel']
 
+# The number of (sample, interaction) products evaluated at a time by BinaryQuadraticModel.energies.
+_ENERGIES_CHUNK_ELEMENTS = 2 ** 22
+
+
+class _TrackedDict(dict):
+    """A dict that counts the changes made to it, so that the caches derived from it can be checked
+    in constant time."""
+    version = 0
+
+    def __setitem__(self, key, value):
+        self.version += 1
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.version += 1
+        dict.__delitem__(self, key)
+
+    def clear(self):
+        self.version += 1
+        dict.clear(self)
+
+    def pop(self, *args):
+        self.version += 1
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self.version += 1
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        self.version += 1
+        dict.update(self, *args, **kwargs)
+
 
 class BinaryQuadraticModel(object):
     """Encodes a binary quadratic model.
@@ -52,6 +98,15 @@ class BinaryQuadraticModel(object):
         and the offset, but most applications that use BinaryQuadraticModel
         will assume that they are numeric.
 
+        The model caches derived representations, such as the model of the
+        other vartype used by :meth:`.change_vartype`, :meth:`.as_ising` and
+        :meth:`.as_qubo`. The methods of the model that change it discard the
+        caches. Each time a cached representation is used, `linear`,
+        `quadratic` and `offset` count the changes made to them, and the
+        caches are discarded if any were made since they were filled, so
+        editing them directly also discards the caches. `linear` and
+        `quadratic` are copied on assignment.
+
     Examples:
         >>> model = pm.BinaryQuadraticModel({0: 1, 1: -1, 2: .5},
         ...                                 {(0, 1): .5, (1, 2): 1.5},
@@ -113,19 +168,15 @@ class BinaryQuadraticModel(object):
     SPIN = Vartype.SPIN
     BINARY = Vartype.BINARY
 
+    # the attributes exchanged with the cached dual model by an in-place change_vartype
+    _state_attributes = ('_linear', '_quadratic', 'adj', '_offset', 'vartype', '_version', '_cache', '_cache_stamp')
+
+    # counts the assignments to linear, quadratic and offset
+    _version = 0
+
     def __init__(self, linear, quadratic, offset, vartype):
         # make sure that we are dealing with a known vartype.
-        try:
-            if isinstance(vartype, str):
-                vartype = Vartype[vartype]
-            else:
-                vartype = Vartype(vartype)
-            if not (vartype is Vartype.SPIN or vartype is Vartype.BINARY):
-                raise ValueError
-        except (ValueError, KeyError):
-            raise TypeError(("expected input vartype to be one of: "
-                             "Vartype.SPIN, 'SPIN', {-1, 1}, "
-                             "Vartype.BINARY, 'BINARY', or {0, 1}."))
+        vartype = _check_vartype(vartype)
         self.vartype = vartype
 
         # We want the linear terms to be a dict.
@@ -171,6 +222,36 @@ class BinaryQuadraticModel(object):
         # we will also be agnostic to the offset type, the user can determine what makes sense
         self.offset = offset
 
+        # derived representations, see _checked_cache
+        self.invalidate()
+
+    @property
+    def linear(self):
+        return self._linear
+
+    @linear.setter
+    def linear(self, linear):
+        self._version += 1
+        self._linear = _TrackedDict(linear)
+
+    @property
+    def quadratic(self):
+        return self._quadratic
+
+    @quadratic.setter
+    def quadratic(self, quadratic):
+        self._version += 1
+        self._quadratic = _TrackedDict(quadratic)
+
+    @property
+    def offset(self):
+        return self._offset
+
+    @offset.setter
+    def offset(self, offset):
+        self._version += 1
+        self._offset = offset
+
     def __repr__(self):
         return 'BinaryQuadraticModel({}, {}, {}, {})'.format(self.linear, self.quadratic, self.offset, self.vartype)
 
@@ -200,6 +281,9 @@ class BinaryQuadraticModel(object):
 
         If the model type is not spin, it is converted.
 
+        The conversion is cached, so repeated calls only copy it. If the
+        model is spin-valued its own dicts are returned.
+
         Returns:
             tuple: A 3-tuple:
 
@@ -217,13 +301,16 @@ class BinaryQuadraticModel(object):
         if self.vartype != self.BINARY:
             raise RuntimeError('converting from unknown vartype')
 
-        return self._binary_to_spin()
+        dual = self._dual()
+        return dict(dual.linear), dict(dual.quadratic), dual.offset
 
     def as_qubo(self):
         """Converts the model into the (Q, offset) QUBO format.
 
         If the model type is not binary, it is converted.
 
+        The conversion is cached, so repeated calls only copy it.
+
         Returns:
             tuple: A 2-tuple:
 
@@ -233,22 +320,23 @@ class BinaryQuadraticModel(object):
 
         """
         if self.vartype == self.BINARY:
+            model = self
+        elif self.vartype == self.SPIN:
+            model = self._dual()
+        else:
+            raise RuntimeError('converting from unknown vartype')
+
+        cache = model._checked_cache()
+        if 'qubo' not in cache:
             # need to dump the linear biases into quadratic
             qubo = {}
-            for v, bias in iteritems(self.linear):
+            for v, bias in iteritems(model.linear):
                 qubo[(v, v)] = bias
-            for edge, bias in iteritems(self.quadratic):
+            for edge, bias in iteritems(model.quadratic):
                 qubo[edge] = bias
-            return qubo, self.offset
-
-        if self.vartype != self.SPIN:
-            raise RuntimeError('converting from unknown vartype')
-
-        linear, quadratic, offset = self._spin_to_binary()
+            cache['qubo'] = qubo
 
-        quadratic.update({(v, v): bias for v, bias in iteritems(linear)})
-
-        return quadratic, offset
+        return dict(cache['qubo']), model.offset
 
     def energy(self, sample):
         """Determines the energy of the given sample.
@@ -293,6 +381,319 @@ class BinaryQuadraticModel(object):
         en += sum(quadratic[(u, v)] * sample[u] * sample[v] for u, v in quadratic)
         return en
 
+    def energies(self, samples, variable_order=None):
+        """Determines the energies of the given samples.
+
+        The samples are evaluated in chunks, each chunk as a few array
+        operations. The quadratic part is the sparse product of the
+        interactions, in coordinate form, with the sample values.
+
+        Args:
+            samples (array-like/iterable[dict]): Either a 2D array-like with
+                one row per sample and one column per variable, or an iterable
+                of samples as dicts, see :meth:`.energy`.
+
+            variable_order (list, optional): The variable of each column of
+                `samples`. It must contain every variable of the model, other
+                columns are ignored. Defaults to the order of :attr:`.linear`.
+                For samples given as dicts it is only used to lay them out.
+
+        Returns:
+            :class:`numpy.ndarray`: The energy of each sample, as float64.
+
+        Raises:
+            ValueError: If `variable_order` is missing a variable of the model
+                or the samples are not 2D.
+
+        Examples:
+            >>> model = pm.BinaryQuadraticModel({'a': 1, 'b': -1}, {('a', 'b'): .5}, 0.0, pm.SPIN)
+            >>> model.energies([[1, 1], [-1, 1]], variable_order=['a', 'b']).tolist()
+            [0.5, -2.5]
+            >>> model.energies([{'a': 1, 'b': 1}, {'a': 1, 'b': -1}]).tolist()
+            [0.5, 1.5]
+
+        """
+        variables, index, linear_biases, row, col, quadratic_biases = self._arrays()
+
+        if variable_order is None:
+            variable_order = variables
+            columns = np.arange(len(variables))
+        else:
+            variable_order = list(variable_order)
+            columns = np.full(len(variables), -1, dtype=np.int64)
+            for column, v in enumerate(variable_order):
+                if v in index:
+                    columns[index[v]] = column
+            if np.any(columns < 0):
+                raise ValueError("variable_order must contain every variable of the model")
+
+        # the biases by column
+        num_columns = len(variable_order)
+        linear_biases = np.bincount(columns, linear_biases, minlength=num_columns)
+        row = columns[row]
+        col = columns[col]
+
+        rows_per_chunk = max(1, _ENERGIES_CHUNK_ELEMENTS // max(len(quadratic_biases), num_columns, 1))
+
+        if isinstance(samples, np.ndarray):
+            chunks = (samples[start:start + rows_per_chunk] for start in range(0, len(samples), rows_per_chunk))
+        else:
+            chunks = _chunks(samples, rows_per_chunk, variable_order)
+
+        energies = []
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float64)
+            if chunk.ndim != 2 or chunk.shape[1] != num_columns:
+                raise ValueError("expected samples to be 2D with a column for each variable in variable_order")
+            energies.append(chunk.dot(linear_biases) + (chunk[:, row] * chunk[:, col]).dot(quadratic_biases))
+
+        if not energies:
+            return np.zeros(0, dtype=np.float64)
+        return np.concatenate(energies) + self.offset
+
+    def flip_evaluator(self, sample):
+        """A :class:`.FlipEvaluator` for local search starting from the given sample.
+
+        Args:
+            sample (dict): The starting sample.
+
+        Returns:
+            :class:`.FlipEvaluator`
+
+        Examples:
+            >>> model = pm.BinaryQuadraticModel({'a': 1, 'b': 0}, {('a', 'b'): -1}, 0.0, pm.BINARY)
+            >>> model.flip_evaluator({'a': 1, 'b': 0}).deltas() == {'a': -1.0, 'b': -1.0}
+            True
+
+        """
+        return FlipEvaluator(self, sample)
+
+    def _arrays(self):
+        """The model as arrays, cached.
+
+        Returns:
+            tuple: A 6-tuple, the variables as a list, a dict mapping each variable
+            to its index, the linear biases, the indices of the two variables of
+            each interaction, and the quadratic biases.
+
+        """
+        cache = self._checked_cache()
+        if 'arrays' not in cache:
+            linear = self.linear
+            quadratic = self.quadratic
+
+            variables = list(linear)
+            index = {v: idx for idx, v in enumerate(variables)}
+            linear_biases = np.fromiter((linear[v] for v in variables), dtype=np.float64, count=len(variables))
+            row = np.fromiter((index[u] for u, __ in quadratic), dtype=np.int64, count=len(quadratic))
+            col = np.fromiter((index[v] for __, v in quadratic), dtype=np.int64, count=len(quadratic))
+            quadratic_biases = np.fromiter(itervalues(quadratic), dtype=np.float64, count=len(quadratic))
+            cache['arrays'] = variables, index, linear_biases, row, col, quadratic_biases
+        return cache['arrays']
+
+    def invalidate(self):
+        """Discard the cached representations of the model.
+
+        This is done by the methods of the model that change it, and when
+        `linear`, `quadratic` or `offset` are found to have been edited
+        directly. It can be called to release the memory of the caches.
+
+        Examples:
+            >>> model = pm.BinaryQuadraticModel({'a': 1}, {}, 0.0, pm.SPIN)
+            >>> model.as_qubo()
+            ({('a', 'a'): 2.0}, -1.0)
+            >>> model.linear['a'] = 2
+            >>> model.as_qubo()
+            ({('a', 'a'): 4.0}, -2.0)
+
+        """
+        self._cache = {}
+        self._cache_stamp = None
+
+    def _checked_cache(self):
+        """The cache of derived representations, discarded first if the model was edited directly
+        since the cache was filled."""
+        stamp = self._stamp()
+        if stamp != self._cache_stamp:
+            self.invalidate()
+            self._cache_stamp = stamp
+        return self._cache
+
+    def _stamp(self):
+        """The change counts of the state that the cached representations are derived from."""
+        return self._version, self._linear.version, self._quadratic.version
+
+    def add_variable(self, v, bias):
+        """Add a variable to the model, or add to its linear bias if it is already in the model.
+
+        Args:
+            v (variable): The variable.
+            bias (number): The linear bias.
+
+        Examples:
+            >>> model = pm.BinaryQuadraticModel({'a': 1}, {}, 0.0, pm.SPIN)
+            >>> model.add_variable('a', .5)
+            >>> model.add_variable('b', -1)
+            >>> model.linear == {'a': 1.5, 'b': -1}
+            True
+
+        """
+        linear = self.linear
+        if v in linear:
+            linear[v] += bias
+        else:
+            linear[v] = bias
+            self.adj[v] = {}
+        self._cache = {}
+
+    def add_variables_from(self, linear, biases=None):
+        """Add variables and their linear biases, see :meth:`.add_variable`.
+
+        Args:
+            linear (dict/iterable): Either a dict of linear biases, or an
+                iterable of (variable, bias) pairs, or, if `biases` is given,
+                the variables as an iterable or array.
+            biases (array-like, optional): The bias of each variable.
+
+        """
+        for v, bias in _pairs(linear, biases):
+            self.add_variable(v, bias)
+
+    def add_interaction(self, u, v, bias):
+        """Add an interaction to the model, or add to its quadratic bias if it is already in the model.
+
+        Variables of the interaction that are not in the model are added with
+        a linear bias of 0.
+
+        Args:
+            u (variable): One variable of the interaction.
+            v (variable): The other variable of the interaction.
+            bias (number): The quadratic bias.
+
+        Raises:
+            ValueError: If u == v.
+
+        Examples:
+            >>> model = pm.BinaryQuadraticModel({'a': 0, 'b': 0}, {('a', 'b'): -1}, 0.0, pm.SPIN)
+            >>> model.add_interaction('b', 'a', .5)
+            >>> model.add_interaction('b', 'c', 1)
+            >>> model.adj['b'] == {'a': -.5, 'c': 1}
+            True
+
+        """
+        if u == v:
+            raise ValueError("bias ({}, {}) is a linear bias".format(u, v))
+
+        linear = self.linear
+        adj = self.adj
+        quadratic = self.quadratic
+        for w in (u, v):
+            if w not in linear:
+                linear[w] = 0
+                adj[w] = {}
+
+        if v in adj[u]:
+            if (u, v) not in quadratic:
+                u, v = v, u
+            quadratic[(u, v)] = adj[u][v] = adj[v][u] = quadratic[(u, v)] + bias
+        else:
+            quadratic[(u, v)] = adj[u][v] = adj[v][u] = bias
+        self._cache = {}
+
+    def add_interactions_from(self, quadratic, biases=None):
+        """Add interactions and their quadratic biases, see :meth:`.add_interaction`.
+
+        Args:
+            quadratic (dict/iterable): Either a dict of quadratic biases, or an
+                iterable of (u, v, bias) triples, or, if `biases` is given, the
+                interactions as an iterable of (u, v) pairs or an array with two
+                columns.
+            biases (array-like, optional): The bias of each interaction.
+
+        Examples:
+            >>> import numpy as np
+            >>> model = pm.BinaryQuadraticModel({}, {}, 0.0, pm.SPIN)
+            >>> model.add_interactions_from(np.array([[0, 1], [1, 2]]), np.array([-1., 1.]))
+            >>> model.quadratic == {(0, 1): -1, (1, 2): 1}
+            True
+
+        """
+        if biases is None and not isinstance(quadratic, Mapping):
+            triples = quadratic.tolist() if isinstance(quadratic, np.ndarray) else quadratic
+            for u, v, bias in triples:
+                self.add_interaction(u, v, bias)
+        else:
+            for (u, v), bias in _pairs(quadratic, biases):
+                self.add_interaction(u, v, bias)
+
+    def remove_variable(self, v):
+        """Remove a variable and its interactions from the model.
+
+        Args:
+            v (variable): The variable.
+
+        Raises:
+            ValueError: If v is not in the model.
+
+        """
+        adj = self.adj
+        if v not in adj:
+            raise ValueError("{!r} is not a variable of the model".format(v))
+
+        quadratic = self.quadratic
+        for u in adj[v]:
+            if (u, v) in quadratic:
+                del quadratic[(u, v)]
+            else:
+                del quadratic[(v, u)]
+            del adj[u][v]
+        del adj[v]
+        del self.linear[v]
+        self._cache = {}
+
+    def remove_interaction(self, u, v):
+        """Remove an interaction from the model. The variables stay in the model.
+
+        Args:
+            u (variable): One variable of the interaction.
+            v (variable): The other variable of the interaction.
+
+        Raises:
+            ValueError: If there is no interaction between u and v.
+
+        """
+        adj = self.adj
+        if u not in adj or v not in adj[u]:
+            raise ValueError("there is no interaction between {!r} and {!r}".format(u, v))
+
+        quadratic = self.quadratic
+        if (u, v) in quadratic:
+            del quadratic[(u, v)]
+        else:
+            del quadratic[(v, u)]
+        del adj[u][v]
+        del adj[v][u]
+        self._cache = {}
+
+    def scale(self, scalar):
+        """Multiply all of the biases and the offset by the given scalar.
+
+        Args:
+            scalar (number)
+
+        """
+        linear = self.linear
+        for v in linear:
+            linear[v] *= scalar
+
+        quadratic = self.quadratic
+        adj = self.adj
+        for (u, v), bias in iteritems(quadratic):
+            quadratic[(u, v)] = adj[u][v] = adj[v][u] = bias * scalar
+
+        self.offset *= scalar
+        self._cache = {}
+
     def relabel_variables(self, mapping, copy=True):
         """Relabel the variables according to the given mapping.
 
@@ -337,6 +738,8 @@ class BinaryQuadraticModel(object):
                                          for (u, v), bias in iteritems(self.quadratic)},
                                         self.offset, self.vartype)
         else:
+            self.invalidate()
+
             shared = old_labels & new_labels
             if shared:
                 # in this case relabel to a new intermediate labeling, then map from the intermediate
@@ -427,42 +830,129 @@ class BinaryQuadraticModel(object):
             :class:`.BinaryQuadraticModel`
 
         """
-        return BinaryQuadraticModel(self.linear.copy(), self.quadratic.copy(), self.offset, vartype=self.vartype)
+        # the model is known to be valid, so the adjacency is copied rather than built again
+        model = BinaryQuadraticModel.__new__(BinaryQuadraticModel)
+        model.linear = self.linear
+        model.quadratic = self.quadratic
+        model.adj = {v: neighbors.copy() for v, neighbors in iteritems(self.adj)}
+        model.offset = self.offset
+        model.vartype = self.vartype
+        model.invalidate()
+        return model
+
+    def flip_variables(self, variables):
+        """Create a new BinaryQuadraticModel with the given variables flipped.
+
+        Flipping a variable replaces s with -s for spin-valued models and x with
+        1 - x for binary-valued models. The energy of any sample in the new model
+        is the energy of the sample with the given variables flipped in this one.
+
+        Args:
+            variables (iterable): The variables to flip. Variables that are not
+                in the model are ignored.
+
+        Returns:
+            :class:`.BinaryQuadraticModel`
+
+        Examples:
+            >>> model = pm.BinaryQuadraticModel({0: 1, 1: .5}, {(0, 1): -1}, 0.0, pm.SPIN)
+            >>> flipped = model.flip_variables([0])
+            >>> flipped.energy({0: 1, 1: 1}) == model.energy({0: -1, 1: 1})
+            True
+
+        """
+        flipped = set(v for v in variables if v in self.linear)
+
+        linear = {v: -bias if v in flipped else bias for v, bias in iteritems(self.linear)}
+        quadratic = {}
+        offset = self.offset
+
+        if self.vartype is Vartype.SPIN:
+            for (u, v), bias in iteritems(self.quadratic):
+                quadratic[(u, v)] = -bias if (u in flipped) != (v in flipped) else bias
+        else:
+            # x -> 1 - x moves part of each bias into the lower order terms
+            for v in flipped:
+                offset += self.linear[v]
+
+            for (u, v), bias in iteritems(self.quadratic):
+                if u in flipped and v in flipped:
+                    offset += bias
+                    linear[u] -= bias
+                    linear[v] -= bias
+                    quadratic[(u, v)] = bias
+                elif u in flipped:
+                    linear[v] += bias
+                    quadratic[(u, v)] = -bias
+                elif v in flipped:
+                    linear[u] += bias
+                    quadratic[(u, v)] = -bias
+                else:
+                    quadratic[(u, v)] = bias
+
+        return BinaryQuadraticModel(linear, quadratic, offset, vartype=self.vartype)
 
-    def change_vartype(self, vartype):
+    def change_vartype(self, vartype, inplace=False):
         """Creates a new BinaryQuadraticModel with the given vartype.
 
+        The model of the other vartype is built once and cached. Converting in
+        place swaps the model with the cached one, and keeps the current
+        representation as the new cache, so switching back and forth in place
+        is free after the first conversion.
+
         Args:
             vartype (:class:`.Vartype`/str/set, optional):
                 The variable type desired for the penalty model. Accepted input values:
                 :class:`.Vartype.SPIN`, ``'SPIN'``, ``{-1, 1}``
                 :class:`.Vartype.BINARY`, ``'BINARY'``, ``{0, 1}``
 
+            inplace (bool, optional, default=False): If True, change the
+                vartype of this model rather than creating a new one.
+
         Returns:
             :class:`.BinaryQuadraticModel`. A new BinaryQuadraticModel with
-            vartype matching input 'vartype'.
+            vartype matching input 'vartype'. If inplace=True, returns itself.
+
+        Examples:
+            >>> model = pm.BinaryQuadraticModel({'a': 1}, {}, 0.0, pm.SPIN)
+            >>> model.change_vartype(pm.BINARY, inplace=True) is model
+            True
+            >>> model.linear, model.offset
+            ({'a': 2.0}, -1.0)
 
         """
-        try:
-            if isinstance(vartype, str):
-                vartype = Vartype[vartype]
-            else:
-                vartype = Vartype(vartype)
-            if not (vartype is Vartype.SPIN or vartype is Vartype.BINARY):
-                raise ValueError
-        except (ValueError, KeyError):
-            raise TypeError(("expected input vartype to be one of: "
-                             "Vartype.SPIN, 'SPIN', {-1, 1}, "
-                             "Vartype.BINARY, 'BINARY', or {0, 1}."))
+        vartype = _check_vartype(vartype)
 
         # vartype matches so we are done
         if vartype is self.vartype:
-            return self.copy()
-
-        if self.vartype is Vartype.SPIN and vartype is Vartype.BINARY:
+            return self if inplace else self.copy()
+
+        dual = self._dual()
+        if not inplace:
+            return dual.copy()
+
+        # swap the state of the two models, each keeps the caches that match its new state
+        for name in self._state_attributes:
+            value = getattr(self, name)
+            setattr(self, name, getattr(dual, name))
+            setattr(dual, name, value)
+        dual._cache.pop('dual', None)
+        self._checked_cache()['dual'] = dual
+        return self
+
+    def _dual(self):
+        """The model with the other vartype, cached. It should not be modified."""
+        cache = self._checked_cache()
+        if 'dual' not in cache:
+            cache['dual'] = self._converted()
+        return cache['dual']
+
+    def _converted(self):
+        """A new model with the other vartype."""
+        if self.vartype is Vartype.SPIN:
             linear, quadratic, offset = self._spin_to_binary()
             return BinaryQuadraticModel(linear, quadratic, offset, vartype=Vartype.BINARY)
-        elif self.vartype is Vartype.BINARY and vartype is Vartype.SPIN:
+        elif self.vartype is Vartype.BINARY:
             linear, quadratic, offset = self._binary_to_spin()
             return BinaryQuadraticModel(linear, quadratic, offset, vartype=Vartype.SPIN)
         else:
@@ -559,3 +1049,34 @@ class BinaryQuadraticModel(object):
         BQM.offset = self.offset
 
         return BQM
+
+
+def _chunks(samples, size, variable_order):
+    """Lay out an iterable of samples, as dicts or as rows, in lists of at most size rows."""
+    iterator = iter(samples)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield [[sample[v] for v in variable_order] if isinstance(sample, Mapping) else sample
+               for sample in chunk]
+
+
+def _pairs(items, values=None):
+    """The (key, value) pairs of a dict, an iterable of pairs, or keys and values given separately."""
+    if values is None:
+        if isinstance(items, Mapping):
+            return iteritems(items)
+        return items.tolist() if isinstance(items, np.ndarray) else items
+
+    if isinstance(items, np.ndarray):
+        items = items.tolist()
+    else:
+        items = list(items)
+    values = np.asarray(values).tolist()
+    if len(items) != len(values):
+        raise ValueError("expected one bias for each item")
+    if items and isinstance(items[0], list):
+        # rows of an array of pairs
+        items = [tuple(item) for item in items]
+    return zip(items, values)
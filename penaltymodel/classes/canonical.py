@@ -0,0 +1,177 @@
+"""
+Canonical Labelling
+-------------------
+
+Canonical labelling of small vertex- and edge-coloured graphs, used by
+:meth:`.Specification.canonical`.
+
+The labelling is found by individualization-refinement: the vertices are
+partitioned by colour, the partition is refined until it is equitable, and
+then each vertex of a non-singleton cell is individualized in turn until every
+cell is a singleton. Each such leaf gives an ordering of the vertices, and the
+ordering whose relabelled graph is lexicographically smallest is canonical.
+Branches that are known to lead to the same graph (twin vertices, or vertices
+in the same orbit of an automorphism found earlier) are skipped.
+"""
+from __future__ import absolute_import
+
+from six import iteritems
+
+__all__ = []
+
+
+def _refine(partition, adj):
+    """Refine an ordered partition (list of lists) until it is equitable.
+
+    A cell is split by the multiset of (neighbour cell, edge colour) of its vertices.
+    The new cells are ordered by that multiset so the result does not depend on the
+    vertex labels.
+    """
+    while True:
+        cell_of = {v: idx for idx, cell in enumerate(partition) for v in cell}
+
+        refined = []
+        for cell in partition:
+            if len(cell) == 1:
+                refined.append(cell)
+                continue
+
+            groups = {}
+            for v in cell:
+                signature = tuple(sorted((cell_of[u], colour) for u, colour in iteritems(adj[v])))
+                groups.setdefault(signature, []).append(v)
+
+            refined.extend(groups[signature] for signature in sorted(groups))
+
+        if len(refined) == len(partition):
+            return refined
+        partition = refined
+
+
+def _certificate(order, adj, colours):
+    """The graph relabelled according to order, in a comparable form."""
+    position = {v: idx for idx, v in enumerate(order)}
+    return (tuple(colours[v] for v in order),
+            tuple(sorted((position[u], position[v], colour)
+                         for u in order for v, colour in iteritems(adj[u])
+                         if position[u] < position[v])))
+
+
+def _twin_classes(adj, colours):
+    """Map each vertex to a representative of its twins. Two vertices are twins if they
+    have the same colour and the same coloured neighbourhood (apart from each other), in
+    which case swapping them is an automorphism."""
+    representative = {}
+
+    # non-adjacent twins, N(u) == N(v)
+    by_key = {}
+    for v in adj:
+        key = (colours[v], frozenset(iteritems(adj[v])))
+        by_key.setdefault(key, []).append(v)
+
+    for group in by_key.values():
+        for v in group:
+            representative[v] = group[0]
+
+    # adjacent twins, u ~ v with N(u) - v == N(v) - u
+    for u in adj:
+        for v, colour in iteritems(adj[u]):
+            if representative[u] == representative[v] or colours[u] != colours[v]:
+                continue
+            nu = dict(adj[u])
+            del nu[v]
+            nv = dict(adj[v])
+            del nv[u]
+            if nu == nv:
+                ru, rv = representative[u], representative[v]
+                for w, r in list(iteritems(representative)):
+                    if r == rv:
+                        representative[w] = ru
+
+    return representative
+
+
+def _orbit(vertices, automorphisms):
+    """The union of the orbits of vertices under the group generated by automorphisms."""
+    orbit = set(vertices)
+    frontier = list(vertices)
+    while frontier:
+        v = frontier.pop()
+        for automorphism in automorphisms:
+            u = automorphism.get(v, v)
+            if u not in orbit:
+                orbit.add(u)
+                frontier.append(u)
+    return orbit
+
+
+def canonical_order(adj, colours):
+    """Determine a canonical ordering of the vertices of a coloured graph.
+
+    Args:
+        adj (dict): The adjacency of the graph, {v: {u: edge_colour, ...}, ...},
+            symmetric in u, v. Every vertex must be a key.
+
+        colours (dict): The colour of each vertex. Vertex colours and edge
+            colours must be orderable and must not depend on the vertex labels.
+
+    Returns:
+        list: The vertices in canonical order. Isomorphic coloured graphs give
+        orderings that map them to the same relabelled graph.
+
+    """
+    # the initial partition is by colour, ordered by colour
+    cells = {}
+    for v in adj:
+        cells.setdefault(colours[v], []).append(v)
+    partition = [cells[colour] for colour in sorted(cells)]
+
+    twins = _twin_classes(adj, colours)
+
+    best = {}  # holds 'certificate' and 'order' of the best leaf so far
+    automorphisms = []
+
+    def search(partition, prefix):
+        partition = _refine(partition, adj)
+
+        target_idx = None
+        for idx, cell in enumerate(partition):
+            if len(cell) > 1 and (target_idx is None or len(cell) < len(partition[target_idx])):
+                target_idx = idx
+
+        if target_idx is None:
+            # leaf
+            order = [cell[0] for cell in partition]
+            certificate = _certificate(order, adj, colours)
+            if not best or certificate < best['certificate']:
+                best['certificate'] = certificate
+                best['order'] = order
+            elif certificate == best['certificate']:
+                automorphisms.append({u: v for u, v in zip(best['order'], order) if u != v})
+            return
+
+        target = partition[target_idx]
+
+        explored = []
+        explored_twins = set()
+        for v in target:
+            if twins[v] in explored_twins:
+                continue
+
+            if explored:
+                # automorphisms that fix the prefix map this node of the search tree to itself
+                fixing = [a for a in automorphisms if all(a.get(p, p) == p for p in prefix)]
+                if fixing and v in _orbit(explored, fixing):
+                    continue
+
+            individualized = (partition[:target_idx] +
+                              [[v], [u for u in target if u != v]] +
+                              partition[target_idx + 1:])
+            search(individualized, prefix + [v])
+
+            explored.append(v)
+            explored_twins.add(twins[v])
+
+    search(partition, [])
+
+    return best['order']
@@ -0,0 +1,454 @@
+"""
+FeasibleConfigurations
+----------------------
+"""
+from __future__ import absolute_import
+
+import itertools
+
+from numbers import Number
+
+try:
+    from collections.abc import Mapping, ItemsView, ValuesView
+except ImportError:
+    # python 2
+    from collections import Mapping, ItemsView, ValuesView
+
+import numpy as np
+
+from penaltymodel.classes.vartypes import Vartype, _check_vartype
+
+__all__ = ['FeasibleConfigurations']
+
+# the number of rows unpacked at a time when iterating
+_CHUNK_SIZE = 4096
+
+# the number of rows of the 2^n configurations generated at a time when enumerating
+_ENUMERATION_CHUNK_SIZE = 2 ** 16
+
+# configurations are enumerated by their index, a 64 bit unsigned integer
+_MAX_ENUMERATION_VARIABLES = 63
+
+
+class FeasibleConfigurations(Mapping):
+    """A compact, read-only mapping from feasible configurations to their energies.
+
+    The configurations are held as a matrix of bits, one row per configuration
+    packed eight variables to a byte, along with a vector of energies. For
+    constraints with many decision variables and many feasible configurations
+    this uses a small fraction of the memory of a dict of tuples, and it is
+    validated with a few array operations rather than one configuration at a
+    time.
+
+    It can be used anywhere a dict of feasible configurations is accepted, in
+    particular as the `feasible_configurations` of a :class:`.Specification`.
+
+    Args:
+        configurations (array-like/dict[tuple[int], number]):
+            The feasible configurations, as a 2D array-like with one row per
+            configuration, or as a dict mapping each configuration to its energy.
+            Each value must match `vartype`.
+
+        vartype (:class:`.Vartype`/str/set):
+            The variable type of the configurations.
+            Accepted input values:
+            :class:`.Vartype.SPIN`, ``'SPIN'``, ``{-1, 1}``
+            :class:`.Vartype.BINARY`, ``'BINARY'``, ``{0, 1}``
+
+        energies (array-like, optional):
+            The relative energy of each row of `configurations`. If not provided,
+            the energies are all 0 (or taken from `configurations` if it is a
+            dict).
+
+    Attributes:
+        bits (:class:`numpy.ndarray`):
+            The packed configurations, a read-only uint8 array with one row per
+            configuration. Bit j of a row (in the order used by
+            :func:`numpy.packbits`) is set if variable j has value 1.
+
+        energies (:class:`numpy.ndarray`):
+            The read-only float64 array of relative energies, one for each
+            row of `bits`.
+
+        num_variables (int): The length of each configuration.
+
+        vartype (:class:`.Vartype`): The variable type of the configurations.
+
+    Notes:
+        Repeated configurations are stored once, keeping the energy of the last
+        one, as they would be in a dict. The rows are kept in sorted order.
+
+    Examples:
+        >>> configurations = pm.FeasibleConfigurations([[-1, -1, -1], [1, 1, 1]], pm.SPIN, energies=[0, .5])
+        >>> configurations[(1, 1, 1)]
+        0.5
+        >>> spec = pm.Specification(nx.path_graph(3), (0, 1, 2), configurations, pm.SPIN)
+
+    """
+    def __init__(self, configurations, vartype, energies=None):
+        self.vartype = vartype = _check_vartype(vartype)
+
+        if isinstance(configurations, Mapping):
+            if energies is not None:
+                raise ValueError("energies cannot be given when configurations is a dict")
+            energies = list(configurations.values())
+            configurations = list(configurations)
+
+        array = np.asarray(configurations)
+        if array.ndim == 1 and not len(array):
+            array = array.reshape(0, 0)
+        if array.ndim != 2:
+            raise ValueError("expected configurations to be a 2D array-like or a dict")
+        num_configurations, self.num_variables = array.shape
+
+        if energies is None:
+            energies = np.zeros(num_configurations)
+        else:
+            if not isinstance(energies, np.ndarray):
+                energies = list(energies)
+                # np.asarray would also convert numeric strings
+                if not all(isinstance(en, Number) for en in energies):
+                    raise ValueError("the energy of each configuration should be numeric")
+            elif not np.issubdtype(energies.dtype, np.number):
+                raise ValueError("the energy of each configuration should be numeric")
+            try:
+                energies = np.asarray(energies, dtype=np.float64)
+            except (ValueError, TypeError):
+                raise ValueError("the energy of each configuration should be numeric")
+            if energies.shape != (num_configurations,):
+                raise ValueError("there should be exactly one energy for each configuration")
+
+        self._set(_pack(array, vartype), energies)
+
+    def _set(self, bits, energies):
+        num_configurations = len(bits)
+        if num_configurations and self.num_variables:
+            # drop repeated configurations, keeping the last as a dict would. np.unique keeps the
+            # first of each so we search the reversed rows
+            bits, index = np.unique(bits[::-1], axis=0, return_index=True)
+            energies = energies[::-1][index]
+        elif num_configurations:
+            # every row is the empty configuration
+            bits = bits[-1:]
+            energies = energies[-1:]
+
+        bits.flags.writeable = False
+        energies.flags.writeable = False
+        self.bits = bits
+        self.energies = energies
+
+        # built on first lookup, maps the bytes of each row to its index
+        self._index = None
+
+    @classmethod
+    def from_predicate(cls, predicate, num_variables, vartype):
+        """Construct FeasibleConfigurations from a vectorized predicate.
+
+        The :math:`2^n` configurations of `num_variables` variables are
+        enumerated a chunk at a time. Only the packed feasible configurations
+        are kept, so the full truth table is never held in memory.
+
+        Args:
+            predicate (function):
+                Called with a 2D int8 :class:`numpy.ndarray`, one configuration
+                per row, and should return a boolean array-like with one
+                value per row, True for the feasible configurations.
+
+            num_variables (int): The number of variables in each configuration.
+
+            vartype (:class:`.Vartype`/str/set): The variable type of the configurations.
+
+        Returns:
+            :class:`.FeasibleConfigurations`: The feasible configurations, each
+            with energy 0.
+
+        Examples:
+            >>> def parity(configs):
+            ...     return configs.sum(axis=1) % 2 == 0
+            >>> configurations = pm.FeasibleConfigurations.from_predicate(parity, 3, pm.BINARY)
+            >>> sorted(configurations)
+            [(0, 0, 0), (0, 1, 1), (1, 0, 1), (1, 1, 0)]
+
+        """
+        vartype = _check_vartype(vartype)
+
+        parts = [np.zeros((0, (num_variables + 7) // 8), dtype=np.uint8)]
+        for __, configs in _enumerate(num_variables, vartype):
+            feasible = np.asarray(predicate(configs), dtype=bool)
+            if feasible.shape != (len(configs),):
+                raise ValueError("predicate should return one boolean for each configuration")
+            parts.append(np.packbits(configs[feasible] == 1, axis=1))
+        bits = np.concatenate(parts)
+
+        configurations = cls.__new__(cls)
+        configurations.vartype = vartype
+        configurations.num_variables = num_variables
+        configurations._set(bits, np.zeros(len(bits)))
+        return configurations
+
+    @classmethod
+    def from_iterable(cls, configurations, num_variables, vartype):
+        """Construct FeasibleConfigurations from an iterable of configurations.
+
+        The configurations are consumed and packed a chunk at a time, so a
+        generator of configurations is never materialised in full.
+
+        Args:
+            configurations (iterable[tuple[int]]): The feasible configurations.
+
+            num_variables (int): The length of each configuration.
+
+            vartype (:class:`.Vartype`/str/set): The variable type of the configurations.
+
+        Returns:
+            :class:`.FeasibleConfigurations`: The feasible configurations, each
+            with energy 0.
+
+        """
+        vartype = _check_vartype(vartype)
+
+        iterator = iter(configurations)
+        parts = [np.zeros((0, (num_variables + 7) // 8), dtype=np.uint8)]
+        while True:
+            chunk = list(itertools.islice(iterator, _CHUNK_SIZE))
+            if not chunk:
+                break
+            if not all(len(config) == num_variables for config in chunk):
+                raise ValueError("the feasible configurations should all match the length of decision_variables")
+            parts.append(_pack(np.asarray(chunk).reshape(len(chunk), num_variables), vartype))
+        bits = np.concatenate(parts)
+
+        configurations = cls.__new__(cls)
+        configurations.vartype = vartype
+        configurations.num_variables = num_variables
+        configurations._set(bits, np.zeros(len(bits)))
+        return configurations
+
+    def __repr__(self):
+        return 'FeasibleConfigurations({!r}, {})'.format(self.to_array().tolist(), self.vartype)
+
+    def __len__(self):
+        return len(self.bits)
+
+    def __iter__(self):
+        for chunk in self._chunks():
+            for config in chunk:
+                yield tuple(config)
+
+    def __getitem__(self, config):
+        return float(self.energies[self._row(config)])
+
+    def _row(self, config):
+        """The index of the row holding config, raises KeyError if it is not feasible."""
+        index = self._index
+        if index is None:
+            self._index = index = {row.tobytes(): idx for idx, row in enumerate(self.bits)}
+
+        try:
+            array = np.asarray(config)
+            if array.shape != (self.num_variables,):
+                raise KeyError(config)
+            key = np.packbits(array == 1).tobytes()
+        except (ValueError, TypeError):
+            raise KeyError(config)
+
+        try:
+            idx = index[key]
+        except KeyError:
+            raise KeyError(config)
+
+        # check the values as well as the bits, for instance 0 is not a spin
+        if self.vartype is Vartype.SPIN:
+            valid = ((array == 1) | (array == -1)).all()
+        else:
+            valid = ((array == 1) | (array == 0)).all()
+        if not valid:
+            raise KeyError(config)
+
+        return idx
+
+    def __eq__(self, other):
+        if (isinstance(other, FeasibleConfigurations) and self.vartype is other.vartype and
+                self.num_variables == other.num_variables):
+            # the rows are sorted so equal mappings have equal arrays
+            return np.array_equal(self.bits, other.bits) and np.array_equal(self.energies, other.energies)
+        return Mapping.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
+
+    def _chunks(self):
+        """Yield the configurations as lists of lists, a chunk of rows at a time."""
+        for start in range(0, len(self.bits), _CHUNK_SIZE):
+            yield self._unpack(self.bits[start:start + _CHUNK_SIZE]).tolist()
+
+    def _unpack(self, bits):
+        values = np.unpackbits(bits, axis=1)[:, :self.num_variables].astype(np.int8)
+        if self.vartype is Vartype.SPIN:
+            values = 2 * values - 1
+        return values
+
+    def to_array(self):
+        """The configurations as an array.
+
+        Returns:
+            :class:`numpy.ndarray`: An int8 array with one row per configuration,
+            in the same order as :attr:`.energies`.
+
+        """
+        return self._unpack(self.bits)
+
+    def chunks(self, size=_CHUNK_SIZE):
+        """Iterate over the feasible configurations a chunk at a time.
+
+        Args:
+            size (int, optional): The maximum number of rows in each chunk.
+
+        Yields:
+            tuple: A 2-tuple of an int8 array with one configuration per row
+            and the vector of their energies.
+
+        """
+        bits = self.bits
+        energies = self.energies
+        for start in range(0, len(bits), size):
+            yield self._unpack(bits[start:start + size]), energies[start:start + size]
+
+    def infeasible_chunks(self, size=_ENUMERATION_CHUNK_SIZE):
+        """Iterate over the infeasible configurations a chunk at a time.
+
+        The :math:`2^n` configurations are enumerated in order and the
+        feasible ones skipped, the infeasible configurations are never all
+        held in memory.
+
+        Args:
+            size (int, optional): The number of configurations enumerated for
+                each chunk. The chunks can be smaller, or empty.
+
+        Yields:
+            :class:`numpy.ndarray`: An int8 array with one infeasible
+            configuration per row.
+
+        """
+        feasible = self._enumeration_index()
+        for index, configs in _enumerate(self.num_variables, self.vartype, size):
+            yield configs[~np.isin(index, feasible)]
+
+    def _enumeration_index(self):
+        """The position of each configuration in the order of :func:`_enumerate`, as uint64."""
+        num_variables = self.num_variables
+        if num_variables > _MAX_ENUMERATION_VARIABLES:
+            raise ValueError("too many variables to enumerate")
+
+        # the first variable is the most significant bit, so the packed bytes (padded on the left
+        # to 8) are the big-endian index shifted left by the padding bits
+        bits = self.bits
+        num_bytes = bits.shape[1]
+        padded = np.zeros((len(bits), 8), dtype=np.uint8)
+        padded[:, 8 - num_bytes:] = bits
+        return padded.view('>u8').ravel().astype(np.uint64) >> np.uint64(8 * num_bytes - num_variables)
+
+    def _derived(self, bits, energies):
+        """New FeasibleConfigurations with the same vartype and number of variables."""
+        configurations = FeasibleConfigurations.__new__(FeasibleConfigurations)
+        configurations.vartype = self.vartype
+        configurations.num_variables = self.num_variables
+        configurations._set(bits, energies)
+        return configurations
+
+    def _added(self, other):
+        """New FeasibleConfigurations with the rows of other added, they replace equal rows."""
+        return self._derived(np.concatenate((self.bits, other.bits)),
+                             np.concatenate((self.energies, other.energies)))
+
+    def _removed(self, rows):
+        """New FeasibleConfigurations without the given rows."""
+        return self._derived(np.delete(self.bits, rows, axis=0), np.delete(self.energies, rows))
+
+    def flip(self, columns):
+        """Create new FeasibleConfigurations with the values in the given columns flipped.
+
+        Flipping replaces s with -s for spin-valued configurations and x with
+        1 - x for binary-valued ones.
+
+        Args:
+            columns (iterable[bool]): For each variable, whether to flip it.
+
+        Returns:
+            :class:`.FeasibleConfigurations`
+
+        """
+        mask = np.packbits(np.asarray(columns, dtype=bool).reshape(1, self.num_variables), axis=1)
+        flipped = FeasibleConfigurations.__new__(FeasibleConfigurations)
+        flipped.vartype = self.vartype
+        flipped.num_variables = self.num_variables
+
+        bits = np.bitwise_xor(self.bits, mask)
+        if len(bits) and self.num_variables:
+            # restore the sorted order, there are no repeats to remove
+            bits, index = np.unique(bits, axis=0, return_index=True)
+            energies = self.energies[index]
+        else:
+            energies = self.energies.copy()
+        bits.flags.writeable = False
+        energies.flags.writeable = False
+        flipped.bits = bits
+        flipped.energies = energies
+        flipped._index = None
+        return flipped
+
+
+class _ItemsView(ItemsView):
+    def __iter__(self):
+        configurations = self._mapping
+        energies = configurations.energies.tolist()
+        idx = 0
+        for chunk in configurations._chunks():
+            for config in chunk:
+                yield tuple(config), energies[idx]
+                idx += 1
+
+
+class _ValuesView(ValuesView):
+    def __iter__(self):
+        return iter(self._mapping.energies.tolist())
+
+
+def _pack(array, vartype):
+    """Check the values of a 2D array of configurations and pack them into bits."""
+    up = array == 1
+    if vartype is Vartype.SPIN:
+        valid = up | (array == -1)
+    else:
+        valid = up | (array == 0)
+    if not valid.all():
+        raise ValueError(("configurations type must match vartype. "
+                          "values permitted by vartype are {}.").format(vartype.value))
+    return np.packbits(up, axis=1)
+
+
+def _enumerate(num_variables, vartype, size=_ENUMERATION_CHUNK_SIZE):
+    """Yield (index, configurations) for all 2^num_variables configurations, a chunk at a time.
+
+    The configurations are in increasing order of their index, with the first variable as the
+    most significant bit.
+    """
+    if num_variables > _MAX_ENUMERATION_VARIABLES:
+        raise ValueError("too many variables to enumerate")
+
+    shifts = np.arange(num_variables - 1, -1, -1, dtype=np.uint64)
+    total = 2 ** num_variables
+    for start in range(0, total, size):
+        index = np.arange(start, min(start + size, total), dtype=np.uint64)
+        configs = ((index[:, np.newaxis] >> shifts) & np.uint64(1)).astype(np.int8)
+        if vartype is Vartype.SPIN:
+            configs = 2 * configs - 1
+        yield index, configs
@@ -0,0 +1,120 @@
+"""
+Fingerprints
+------------
+
+Deterministic digests of specifications and penalty models.
+
+Python's built-in :func:`hash` is randomized per process for strings, so it
+cannot be used by caches shared between processes. Instead each value is
+encoded as text in a canonical way, unordered collections are sorted by their
+encoding, and the result is hashed with SHA-256. Equal numbers encode the same
+regardless of type, so ``0``, ``0.0`` and ``False`` all give the same digest,
+matching Python's equality.
+"""
+from __future__ import absolute_import
+
+import hashlib
+
+from binascii import hexlify
+from numbers import Integral, Real
+
+from six import text_type, binary_type, iteritems
+
+__all__ = []
+
+
+def encode(obj):
+    """Encode a variable label, configuration or number as canonical text.
+
+    Labels of types other than numbers, strings, bytes, tuples and frozensets
+    are encoded using their :func:`repr`, which must therefore be deterministic.
+
+    """
+    if obj is None:
+        return u'n'
+    if isinstance(obj, Integral):
+        return u'i{}'.format(int(obj))
+    if isinstance(obj, Real):
+        if float(obj).is_integer():
+            return u'i{}'.format(int(obj))
+        return u'f{!r}'.format(float(obj))
+    if isinstance(obj, text_type):
+        return u's{}:{}'.format(len(obj), obj)
+    if isinstance(obj, binary_type):
+        # in python 2, str is bytes, we assume it is ascii like any other str label
+        try:
+            text = obj.decode('ascii')
+        except UnicodeDecodeError:
+            return u'b{}:{}'.format(len(obj), hexlify(obj).decode('ascii'))
+        return u's{}:{}'.format(len(text), text)
+    if isinstance(obj, (tuple, list)):
+        return u't{}({})'.format(len(obj), u''.join(encode(v) for v in obj))
+    if isinstance(obj, (frozenset, set)):
+        return u'z{}({})'.format(len(obj), u''.join(sorted(encode(v) for v in obj)))
+    r = repr(obj)
+    return u'r{}:{}'.format(len(r), r)
+
+
+def encode_range(range_):
+    """Encode a [min, max] range."""
+    min_, max_ = range_
+    return u'[{},{}]'.format(encode(min_), encode(max_))
+
+
+def encode_edge(u, v):
+    """Encode an undirected edge, independent of the order of u, v."""
+    return u'e({})'.format(u''.join(sorted((encode(u), encode(v)))))
+
+
+def digest(*sections):
+    """SHA-256 hex digest of the given named sections.
+
+    Args:
+        *sections: 2-tuples (name, iterable[text]). The iterables are hashed
+            in the order given, each entry is length-prefixed so the encoding
+            is unambiguous.
+
+    """
+    return digest_state(None, *sections).hexdigest()
+
+
+def digest_state(state, *sections):
+    """Hash the given named sections, see :func:`digest`, after those already in state.
+
+    Args:
+        state (hash object/None): A SHA-256 hash object holding earlier sections,
+            it is copied and not changed. If None, a new hash is started.
+        *sections: As for :func:`digest`.
+
+    Returns:
+        hash object: The hash of the earlier sections followed by the given ones.
+        Its hex digest is the same as that of :func:`digest` for all of the
+        sections.
+
+    """
+    h = hashlib.sha256() if state is None else state.copy()
+    for name, entries in sections:
+        h.update(u'#{}\n'.format(name).encode('utf-8'))
+        for entry in entries:
+            data = entry.encode('utf-8')
+            h.update(u'{}:'.format(len(data)).encode('ascii'))
+            h.update(data)
+    return h
+
+
+def graph_sections(nodes, edges):
+    """The digest sections for the nodes and edges of a graph."""
+    return [('nodes', sorted(encode(v) for v in nodes)),
+            ('edges', sorted(set(encode_edge(u, v) for u, v in edges)))]
+
+
+def linear_range_sections(ising_linear_ranges):
+    """The digest section for linear ranges."""
+    return [('linear_ranges', sorted(encode(v) + encode_range(r) for v, r in iteritems(ising_linear_ranges)))]
+
+
+def quadratic_range_sections(ising_quadratic_ranges):
+    """The digest section for quadratic ranges, each interaction is included once."""
+    return [('quadratic_ranges', sorted(set(encode_edge(u, v) + encode_range(r)
+                                            for u, neighbors in iteritems(ising_quadratic_ranges)
+                                            for v, r in iteritems(neighbors))))]
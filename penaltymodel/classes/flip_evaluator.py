@@ -0,0 +1,118 @@
+"""
+FlipEvaluator
+-------------
+"""
+from __future__ import absolute_import
+
+from six import iteritems
+
+from penaltymodel.classes.vartypes import Vartype
+
+__all__ = ['FlipEvaluator']
+
+
+class FlipEvaluator(object):
+    """Tracks a sample of a binary quadratic model and the energy change of flipping each variable.
+
+    The evaluator keeps the local field of each variable,
+
+    .. math::
+
+        f_v = h_v + \\sum_u J_{u,v} s_u
+
+    from which the energy change of flipping `v` is :math:`-2 s_v f_v` for
+    spin-valued models and :math:`(1 - 2 x_v) f_v` for binary-valued models.
+    Reading a delta is constant time and accepting a flip updates the fields
+    of the neighbors of the flipped variable, in O(degree).
+
+    The model is read once, on construction. Changes made to the model
+    afterwards are not seen by the evaluator.
+
+    Args:
+        model (:class:`.BinaryQuadraticModel`): The model.
+
+        sample (dict): The starting sample, with a value for each variable of
+            the model. It is copied.
+
+    Attributes:
+        sample (dict): The current sample. It should only be changed with :meth:`.flip`.
+
+        energy (float): The energy of the current sample.
+
+    Examples:
+        >>> model = pm.BinaryQuadraticModel({'a': 0, 'b': 0}, {('a', 'b'): -1}, 0.0, pm.SPIN)
+        >>> evaluator = pm.FlipEvaluator(model, {'a': 1, 'b': -1})
+        >>> evaluator.energy
+        1.0
+        >>> evaluator.delta('a')
+        -2.0
+        >>> evaluator.flip('a')
+        -2.0
+        >>> evaluator.sample == {'a': -1, 'b': -1}, evaluator.energy
+        (True, -1.0)
+
+    """
+    def __init__(self, model, sample):
+        self.vartype = vartype = model.vartype
+        self.adj = adj = {v: dict(iteritems(neighbors)) for v, neighbors in iteritems(model.adj)}
+
+        try:
+            self.sample = sample = {v: sample[v] for v in adj}
+        except KeyError as err:
+            raise ValueError("sample is missing variable {!r}".format(err.args[0]))
+        if not all(value in vartype.value for value in sample.values()):
+            raise ValueError("sample values should be in {}".format(vartype.value))
+
+        self.fields = fields = {}
+        for v, bias in iteritems(model.linear):
+            fields[v] = bias + sum(b * sample[u] for u, b in iteritems(adj[v]))
+
+        self.energy = float(model.energy(sample))
+
+    def delta(self, v):
+        """The change in energy from flipping v.
+
+        Args:
+            v (variable): A variable of the model.
+
+        Returns:
+            float
+
+        """
+        if self.vartype is Vartype.SPIN:
+            return float(-2 * self.sample[v] * self.fields[v])
+        return float((1 - 2 * self.sample[v]) * self.fields[v])
+
+    def deltas(self):
+        """The change in energy from flipping each variable.
+
+        Returns:
+            dict: Maps each variable to the change in energy from flipping it.
+
+        """
+        return {v: self.delta(v) for v in self.sample}
+
+    def flip(self, v):
+        """Flip v in the current sample and update the local fields of its neighbors.
+
+        Args:
+            v (variable): A variable of the model.
+
+        Returns:
+            float: The change in energy.
+
+        """
+        delta = self.delta(v)
+
+        sample = self.sample
+        old = sample[v]
+        new = -old if self.vartype is Vartype.SPIN else 1 - old
+        sample[v] = new
+
+        change = new - old
+        fields = self.fields
+        for u, bias in iteritems(self.adj[v]):
+            fields[u] += bias * change
+
+        self.energy += delta
+        return delta
@@ -0,0 +1,274 @@
+"""
+CompactGraph
+------------
+"""
+from __future__ import absolute_import
+
+import networkx as nx
+import numpy as np
+
+__all__ = ['CompactGraph']
+
+
+class CompactGraph(object):
+    """An immutable graph stored as a tuple of nodes and an array of edges.
+
+    This is the native graph storage of :class:`.Specification` and
+    :class:`.PenaltyModel`. It supports the parts of the :class:`networkx.Graph`
+    interface needed to read a specification (membership, iteration, neighbors,
+    :meth:`.has_edge`), and a :class:`networkx.Graph` can be built from it on
+    demand with :meth:`.to_networkx`.
+
+    Args:
+        nodes (iterable, optional): The nodes, in order.
+
+        edges (iterable[(node, node)], optional): The edges. Nodes of the edges
+            that are not in `nodes` are added after them, in the order they are
+            first seen, as :meth:`networkx.Graph.add_edges_from` would.
+
+    Attributes:
+        nodes (tuple): The nodes of the graph.
+
+        edge_index (:class:`numpy.ndarray`): A read-only array with one row
+            (i, j), i <= j, for each edge between ``nodes[i]`` and ``nodes[j]``.
+            The rows are sorted.
+
+    Examples:
+        >>> graph = pm.CompactGraph(edges=[('a', 'b'), ('b', 'c')])
+        >>> graph.nodes
+        ('a', 'b', 'c')
+        >>> graph.has_edge('c', 'b')
+        True
+        >>> sorted(graph.to_networkx().edges)
+        [('a', 'b'), ('b', 'c')]
+
+    """
+    def __init__(self, nodes=(), edges=()):
+        index = {}
+        node_list = []
+        for v in nodes:
+            if v not in index:
+                index[v] = len(node_list)
+                node_list.append(v)
+
+        pairs = []
+        for u, v in edges:
+            for w in (u, v):
+                if w not in index:
+                    index[w] = len(node_list)
+                    node_list.append(w)
+            i, j = index[u], index[v]
+            pairs.append((i, j) if i <= j else (j, i))
+
+        self._set(tuple(node_list), _edge_array(pairs, len(node_list)), index)
+
+    def _set(self, nodes, edge_index, index=None):
+        self.nodes = nodes
+        self.edge_index = edge_index
+
+        # the node indices, kept from construction if available
+        self._index = index
+
+        # built on demand
+        self._adj = None
+        self._networkx = None
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """Construct a CompactGraph from a :class:`networkx.Graph`.
+
+        Args:
+            graph (:class:`networkx.Graph`)
+
+        Returns:
+            :class:`.CompactGraph`
+
+        """
+        return cls(graph.nodes, graph.edges)
+
+    def __getstate__(self):
+        # the derived structures are not pickled
+        return {'nodes': self.nodes, 'edge_index': self.edge_index}
+
+    def __setstate__(self, state):
+        self._set(state['nodes'], state['edge_index'])
+
+    def __repr__(self):
+        return 'CompactGraph({!r}, {!r})'.format(self.nodes, self.edges)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __contains__(self, v):
+        try:
+            return v in self.index
+        except TypeError:
+            # unhashable
+            return False
+
+    def __getitem__(self, v):
+        """The neighbors of v, as a frozenset."""
+        return self.adj[v]
+
+    def __eq__(self, graph):
+        """Graphs are equal if they have the same nodes and edges, in any order."""
+        if not isinstance(graph, CompactGraph):
+            return False
+        if self.nodes == graph.nodes:
+            return np.array_equal(self.edge_index, graph.edge_index)
+        return (len(self.nodes) == len(graph.nodes) and
+                len(self.edge_index) == len(graph.edge_index) and
+                set(self.nodes) == set(graph.nodes) and
+                all(graph.has_edge(u, v) for u, v in self.edges))
+
+    def __ne__(self, graph):
+        return not self.__eq__(graph)
+
+    __hash__ = None
+
+    @property
+    def index(self):
+        """dict: Maps each node to its position in :attr:`.nodes`."""
+        index = self._index
+        if index is None:
+            self._index = index = {v: idx for idx, v in enumerate(self.nodes)}
+        return index
+
+    @property
+    def adj(self):
+        """dict: Maps each node to the frozenset of its neighbors."""
+        adj = self._adj
+        if adj is None:
+            nodes = self.nodes
+            neighbors = [set() for __ in nodes]
+            for i, j in self.edge_index.tolist():
+                neighbors[i].add(nodes[j])
+                neighbors[j].add(nodes[i])
+            self._adj = adj = {v: frozenset(nbrs) for v, nbrs in zip(nodes, neighbors)}
+        return adj
+
+    @property
+    def edges(self):
+        """list[tuple]: The edges of the graph as pairs of nodes."""
+        nodes = self.nodes
+        return [(nodes[i], nodes[j]) for i, j in self.edge_index.tolist()]
+
+    def has_edge(self, u, v):
+        """Return True if there is an edge between u and v."""
+        try:
+            return v in self.adj[u]
+        except (KeyError, TypeError):
+            return False
+
+    def connected_components(self):
+        """The connected components of the graph.
+
+        Returns:
+            list[list]: The nodes of each component, ordered as in :attr:`.nodes`.
+            The components are ordered by their first node.
+
+        """
+        nodes = self.nodes
+        num_nodes = len(nodes)
+
+        # union-find over the node indices
+        parent = list(range(num_nodes))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = i = parent[parent[i]]
+            return i
+
+        for i, j in self.edge_index.tolist():
+            i, j = find(i), find(j)
+            if i != j:
+                parent[max(i, j)] = min(i, j)
+
+        components = {}
+        for i, v in enumerate(nodes):
+            components.setdefault(find(i), []).append(v)
+        return [components[root] for root in sorted(components)]
+
+    def subgraph(self, nodes):
+        """Create a new CompactGraph induced by the given nodes.
+
+        Args:
+            nodes (iterable): The nodes to keep, they must all be in the graph.
+
+        Returns:
+            :class:`.CompactGraph`: The nodes in the same relative order as in
+            this graph, and the edges between them.
+
+        """
+        index = self.index
+        keep = np.zeros(len(self.nodes), dtype=bool)
+        keep[[index[v] for v in nodes]] = True
+
+        # the new index of each kept node, the order is unchanged so the edges stay sorted
+        position = np.cumsum(keep) - 1
+
+        edge_index = self.edge_index
+        rows = keep[edge_index[:, 0]] & keep[edge_index[:, 1]] if len(edge_index) else np.zeros(0, dtype=bool)
+        edge_index = position[edge_index[rows]].astype(edge_index.dtype).reshape(-1, 2)
+        edge_index.flags.writeable = False
+
+        graph = CompactGraph.__new__(CompactGraph)
+        graph._set(tuple(v for v, k in zip(self.nodes, keep) if k), edge_index)
+        return graph
+
+    def relabel(self, mapping):
+        """Create a new CompactGraph with the nodes relabeled.
+
+        The edges are shared with this graph.
+
+        Args:
+            mapping (dict): Maps current node labels to new ones. A partial
+                mapping is allowed.
+
+        Returns:
+            :class:`.CompactGraph`
+
+        Raises:
+            ValueError: If two nodes would have the same label.
+
+        """
+        nodes = tuple(mapping.get(v, v) for v in self.nodes)
+        index = {v: idx for idx, v in enumerate(nodes)}
+        if len(index) != len(nodes):
+            raise ValueError("the mapping would give two nodes the same label")
+
+        graph = CompactGraph.__new__(CompactGraph)
+        graph._set(nodes, self.edge_index, index)
+        return graph
+
+    def to_networkx(self):
+        """A :class:`networkx.Graph` with the same nodes and edges.
+
+        The networkx graph is built on the first call and is frozen, see
+        :func:`networkx.freeze`, because changes to it would not be reflected
+        in this graph.
+
+        Returns:
+            :class:`networkx.Graph`
+
+        """
+        graph = self._networkx
+        if graph is None:
+            graph = nx.Graph()
+            graph.add_nodes_from(self.nodes)
+            graph.add_edges_from(self.edges)
+            self._networkx = graph = nx.freeze(graph)
+        return graph
+
+
+def _edge_array(pairs, num_nodes):
+    """The sorted, unique, read-only edge index array for the given (i, j), i <= j, pairs."""
+    dtype = np.int32 if num_nodes < 2 ** 31 else np.int64
+    array = np.array(pairs, dtype=dtype).reshape(-1, 2)
+    if len(array):
+        array = np.unique(array, axis=0)
+    array.flags.writeable = False
+    return array
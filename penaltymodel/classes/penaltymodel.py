@@ -11,6 +11,7 @@ from six import itervalues, iteritems
 import networkx as nx
 
 
+from penaltymodel.classes.fingerprint import digest, encode, encode_edge
 from penaltymodel.classes.specification import Specification
 from penaltymodel.classes.binary_quadratic_model import BinaryQuadraticModel
 from penaltymodel.classes.vartypes import Vartype
@@ -30,7 +31,7 @@ class PenaltyModel(Specification):
     PenaltyModel is a subclass of :class:`.Specification`.
 
     Args:
-        graph (:class:`networkx.Graph`/iterable[edge]):
+        graph (:class:`networkx.Graph`/:class:`.CompactGraph`/iterable[edge]):
             Defines the structure of the desired binary quadratic model. Each
             node in the graph represents a variable and each edge defines an
             interaction between two variables.
@@ -112,10 +113,12 @@ class PenaltyModel(Specification):
         feasible_configurations (dict[tuple[int], number]):
             The set of feasible configurations. The value is the (relative)
             energy of each of the feasible configurations.
-        graph (:class:`networkx.Graph`): The graph that defines the relation
+        compact_graph (:class:`.CompactGraph`): The graph that defines the relation
             between variables in the penaltymodel.
             The node labels will be used as the variable labels in the
             binary quadratic model.
+        graph (:class:`networkx.Graph`): A read-only networkx view of
+            `compact_graph`, built the first time it is accessed.
         ground_energy (numeric): The minimum energy of all possible configurations.
         ising_linear_ranges (dict[node, (number, number)]):
             Defines the energy ranges available for the linear
@@ -171,6 +174,9 @@ class PenaltyModel(Specification):
             raise TypeError("expected ground_energy to be numeric")
         self.ground_energy = ground_energy
 
+        # computed on demand, see fingerprint
+        self._model_fingerprint = None
+
     @classmethod
     def from_specification(cls, specification, model, classical_gap, ground_energy):
         """Construct a PenaltyModel from a Specification.
@@ -191,7 +197,7 @@ class PenaltyModel(Specification):
 
         # Author note: there might be a way that avoids rechecking all of the values without
         # side-effects or lots of repeated code, but this seems simpler and more explicit
-        return cls(specification.graph,
+        return cls(specification.compact_graph,
                    specification.decision_variables,
                    specification.feasible_configurations,
                    specification.vartype,
@@ -201,6 +207,50 @@ class PenaltyModel(Specification):
                    ising_linear_ranges=specification.ising_linear_ranges,
                    ising_quadratic_ranges=specification.ising_quadratic_ranges)
 
+    @classmethod
+    def from_parts(cls, specification, penalty_models):
+        """Construct a PenaltyModel by joining PenaltyModels for the parts of a specification.
+
+        The models are added together. The classical gap is the smallest of the
+        gaps of the parts and the ground energy is the sum of their ground energies.
+
+        Args:
+            specification (:class:`.Specification`): The specification that
+                was split, see :meth:`.Specification.decompose`.
+            penalty_models (iterable[:class:`.PenaltyModel`]): A PenaltyModel
+                for each of the parts.
+
+        Returns:
+            :class:`.PenaltyModel`
+
+        Examples:
+            >>> parts = spec.decompose()  # doctest: +SKIP
+            >>> penalty_models = [pm.get_penalty_model(part) for part in parts]  # doctest: +SKIP
+            >>> widget = pm.PenaltyModel.from_parts(spec, penalty_models)  # doctest: +SKIP
+
+        """
+        vartype = specification.vartype
+
+        linear = {}
+        quadratic = {}
+        offset = 0.0
+        classical_gaps = []
+        ground_energies = []
+        for penalty_model in penalty_models:
+            model = penalty_model.model
+            if model.vartype is not vartype:
+                model = model.change_vartype(vartype)
+
+            linear.update(model.linear)
+            quadratic.update(model.quadratic)
+            offset += model.offset
+
+            classical_gaps.append(penalty_model.classical_gap)
+            ground_energies.append(penalty_model.ground_energy)
+
+        model = BinaryQuadraticModel(linear, quadratic, offset, vartype)
+        return cls.from_specification(specification, model, min(classical_gaps), sum(ground_energies))
+
     def __eq__(self, penalty_model):
         # other values are derived
         return (isinstance(penalty_model, PenaltyModel) and
@@ -210,6 +260,90 @@ class PenaltyModel(Specification):
     def __ne__(self, penalty_model):
         return not self.__eq__(penalty_model)
 
+    # defining __eq__ removes the inherited __hash__. Equal penalty models have equal
+    # specifications so we can use the specification's
+    __hash__ = Specification.__hash__
+
+    @property
+    def fingerprint(self):
+        """str: A deterministic digest of the penalty model.
+
+        Covers everything in :attr:`.Specification.fingerprint` as well as the
+        linear and quadratic biases, offset and vartype of the model. See
+        :attr:`.Specification.fingerprint`.
+
+        """
+        fingerprint = self._model_fingerprint
+        if fingerprint is None:
+            model = self.model
+            fingerprint = digest(('specification', [Specification.fingerprint.fget(self)]),
+                                 ('vartype', [model.vartype.name]),
+                                 ('offset', [encode(model.offset)]),
+                                 ('linear', sorted(encode(v) + u'=' + encode(bias)
+                                                   for v, bias in iteritems(model.linear))),
+                                 ('quadratic', sorted(encode_edge(u, v) + u'=' + encode(bias)
+                                                      for (u, v), bias in iteritems(model.quadratic))))
+            self._model_fingerprint = fingerprint
+        return fingerprint
+
+    def copy(self):
+        """Create a copy of the PenaltyModel.
+
+        The model, the energy ranges and feasible configurations given as a dict
+        are copied. The immutable parts, such as the graph and the cached
+        fingerprints and numeric views, are shared. Nothing is checked again.
+
+        Returns:
+            :class:`.PenaltyModel`
+
+        """
+        penalty_model = PenaltyModel.__new__(type(self))
+        penalty_model.__dict__.update(self.__dict__)
+
+        penalty_model.model = self.model.copy()
+        penalty_model.ising_linear_ranges = self.ising_linear_ranges.copy()
+        penalty_model.ising_quadratic_ranges = self.ising_quadratic_ranges.copy()
+        if isinstance(self.feasible_configurations, dict):
+            penalty_model.feasible_configurations = dict(self.feasible_configurations)
+        penalty_model._views = dict(self._views)
+        return penalty_model
+
+    def clear_fingerprint(self):
+        """Discard the cached fingerprint, it will be computed again when next needed."""
+        Specification.clear_fingerprint(self)
+        self._model_fingerprint = None
+
+    def flip_variables(self, variables):
+        """Create a new PenaltyModel with the given variables flipped.
+
+        Both the feasible configurations (see :meth:`.Specification.flip_variables`)
+        and the model (see :meth:`.BinaryQuadraticModel.flip_variables`) are
+        flipped, so the classical gap and ground energy do not change.
+
+        Args:
+            variables (iterable): The variables to flip.
+
+        Returns:
+            :class:`.PenaltyModel`
+
+        Raises:
+            ValueError: If the flipped biases are outside of the energy ranges,
+                which can only happen if the ranges are not symmetric.
+
+        Examples:
+            >>> spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> model = pm.BinaryQuadraticModel({0: 0, 1: 0, 2: 0}, {(0, 1): -1, (1, 2): -1}, 0.0, pm.SPIN)
+            >>> penalty_model = pm.PenaltyModel.from_specification(spec, model, 2., -2.)
+            >>> flipped = penalty_model.flip_variables([2])
+            >>> flipped.model.quadratic[(1, 2)]
+            1
+
+        """
+        variables = list(variables)
+        spec = Specification.flip_variables(self, variables)
+        model = self.model.flip_variables(variables)
+        return PenaltyModel.from_specification(spec, model, self.classical_gap, self.ground_energy)
+
     def relabel_variables(self, mapping, copy=True):
         """Relabel the variables and nodes according to the given mapping.
 
@@ -249,4 +383,5 @@ class PenaltyModel(Specification):
         else:
             Specification.relabel_variables(self, mapping, copy=False)
             self.model.relabel_variables(mapping, copy=False)
+            self.clear_fingerprint()
             return self
@@ -0,0 +1,263 @@
+"""
+Energy Ranges
+-------------
+
+The energy ranges of a :class:`.Specification` are held as a default range
+plus the ranges that were given explicitly. Most variables and interactions
+use the default, so only the explicit ranges are stored and validated, the
+default is returned for everything else.
+"""
+from __future__ import absolute_import
+
+from numbers import Number
+
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:
+    # python 2
+    from collections import Mapping, MutableMapping
+
+from six import iteritems
+
+__all__ = ['LinearRanges', 'QuadraticRanges']
+
+
+class _DefaultRange(list):
+    """A [min, max] list that cannot be modified, it is shared by every variable or
+    interaction that uses the default range."""
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("the default range cannot be modified, assign a new range instead")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    __setslice__ = __delslice__ = _immutable  # python 2
+    append = extend = insert = pop = remove = reverse = sort = _immutable
+
+    def __reduce__(self):
+        # the default pickling of list subclasses appends the items
+        return (_DefaultRange, (list(self),))
+
+
+DEFAULT_LINEAR_RANGE = _DefaultRange([-2, 2])
+DEFAULT_QUADRATIC_RANGE = _DefaultRange([-1, 1])
+
+
+def check_range(range_):
+    """Check that a range is in the format we expect [min, max] and return"""
+    try:
+        if not isinstance(range_, list):
+            range_ = list(range_)
+        min_, max_ = range_
+    except (ValueError, TypeError):
+        raise TypeError("each range in ising_linear_ranges should be a list of length 2.")
+    if not isinstance(min_, Number) or not isinstance(max_, Number) or min_ > max_:
+        raise ValueError(("each range in ising_linear_ranges should be a 2-tuple "
+                          "(min, max) where min <= max"))
+    return range_
+
+
+class LinearRanges(MutableMapping):
+    """The ranges of the linear biases of a specification.
+
+    Behaves like a dict {v: [min, max], ...} with an entry for every node of
+    `graph`, but only the ranges that differ from the default are stored.
+
+    Args:
+        graph (:class:`.CompactGraph`): The graph of the specification. Any
+            object with the same container interface as :class:`networkx.Graph`
+            can be used.
+
+        ranges (dict[node, [number, number]], optional): The explicit ranges.
+            Each is checked.
+
+        default (list, optional, default=[-2, 2]): The range of every node
+            without an explicit range.
+
+    Attributes:
+        overrides (dict): The explicit ranges.
+
+    Notes:
+        The default range is shared and cannot be modified in place. Assign
+        a new range instead. Deleting an entry restores the default.
+
+    """
+    def __init__(self, graph, ranges=None, default=DEFAULT_LINEAR_RANGE):
+        self.graph = graph
+        self.default = default
+
+        self.overrides = overrides = {}
+        if ranges is not None:
+            for v, range_ in iteritems(ranges):
+                overrides[v] = check_range(range_)
+
+    def __repr__(self):
+        return 'LinearRanges({!r})'.format(dict(self))
+
+    def __getitem__(self, v):
+        try:
+            return self.overrides[v]
+        except KeyError:
+            pass
+        if v in self.graph:
+            return self.default
+        raise KeyError(v)
+
+    def __setitem__(self, v, range_):
+        self.overrides[v] = check_range(range_)
+
+    def __delitem__(self, v):
+        del self.overrides[v]
+
+    def __iter__(self):
+        graph = self.graph
+        for v in graph:
+            yield v
+        for v in self.overrides:
+            if v not in graph:
+                yield v
+
+    def __len__(self):
+        graph = self.graph
+        return len(graph) + sum(1 for v in self.overrides if v not in graph)
+
+    def copy(self, graph=None):
+        """A copy of the ranges, for `graph` if given. The explicit ranges are copied."""
+        return self.relabeled({}, self.graph if graph is None else graph)
+
+    def relabeled(self, mapping, graph):
+        """A copy of the ranges for `graph` with the explicit ranges relabeled according to `mapping`."""
+        ranges = LinearRanges(graph, default=self.default)
+        ranges.overrides = {mapping.get(v, v): list(range_) for v, range_ in iteritems(self.overrides)}
+        return ranges
+
+
+class QuadraticRanges(Mapping):
+    """The ranges of the quadratic biases of a specification.
+
+    Behaves like a dict {u: {v: [min, max], ...}, ...} with an entry in both
+    directions for every edge of `graph`, but only the ranges that differ from
+    the default are stored. Setting ``ranges[u][v]`` also sets
+    ``ranges[v][u]``.
+
+    Args:
+        graph (:class:`.CompactGraph`): The graph of the specification. Any
+            object with the same container interface as :class:`networkx.Graph`
+            can be used.
+
+        ranges (dict[node, dict[node, [number, number]]], optional): The
+            explicit ranges. Each is checked, and if a range is given in both
+            directions they must match.
+
+        default (list, optional, default=[-1, 1]): The range of every edge
+            without an explicit range.
+
+    Attributes:
+        overrides (dict): The explicit ranges, as a dict of dicts with each
+            range in both directions.
+
+    """
+    def __init__(self, graph, ranges=None, default=DEFAULT_QUADRATIC_RANGE):
+        self.graph = graph
+        self.default = default
+
+        self.overrides = overrides = {}
+        if ranges is not None:
+            for u, neighbors in iteritems(ranges):
+                for v, range_ in iteritems(neighbors):
+                    range_ = check_range(range_)
+
+                    if u in overrides.get(v, ()) and overrides[v][u] != range_:
+                        raise ValueError("mismatched ranges for ising_quadratic_ranges")
+
+                    self._set(u, v, range_)
+
+    def __repr__(self):
+        return 'QuadraticRanges({!r})'.format({u: dict(neighbors) for u, neighbors in iteritems(self)})
+
+    def __getitem__(self, u):
+        if u in self.graph or u in self.overrides:
+            return _NeighborRanges(self, u)
+        raise KeyError(u)
+
+    def __iter__(self):
+        graph = self.graph
+        for v in graph:
+            yield v
+        for v in self.overrides:
+            if v not in graph:
+                yield v
+
+    def __len__(self):
+        graph = self.graph
+        return len(graph) + sum(1 for v in self.overrides if v not in graph)
+
+    def _get(self, u, v):
+        try:
+            return self.overrides[u][v]
+        except KeyError:
+            pass
+        if self.graph.has_edge(u, v):
+            return self.default
+        raise KeyError(v)
+
+    def _set(self, u, v, range_):
+        overrides = self.overrides
+        overrides.setdefault(u, {})[v] = overrides.setdefault(v, {})[u] = range_
+
+    def _del(self, u, v):
+        overrides = self.overrides
+        del overrides[u][v]
+        del overrides[v][u]
+        for w in (u, v):
+            if not overrides[w]:
+                del overrides[w]
+
+    def copy(self, graph=None):
+        """A copy of the ranges, for `graph` if given. The explicit ranges are copied."""
+        return self.relabeled({}, self.graph if graph is None else graph)
+
+    def relabeled(self, mapping, graph):
+        """A copy of the ranges for `graph` with the explicit ranges relabeled according to `mapping`."""
+        ranges = QuadraticRanges(graph, default=self.default)
+        for u, neighbors in iteritems(self.overrides):
+            for v, range_ in iteritems(neighbors):
+                ranges._set(mapping.get(u, u), mapping.get(v, v), list(range_))
+        return ranges
+
+
+class _NeighborRanges(MutableMapping):
+    """The ranges of the interactions of one variable, a view of QuadraticRanges."""
+    def __init__(self, ranges, u):
+        self._ranges = ranges
+        self._u = u
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getitem__(self, v):
+        return self._ranges._get(self._u, v)
+
+    def __setitem__(self, v, range_):
+        self._ranges._set(self._u, v, check_range(range_))
+
+    def __delitem__(self, v):
+        try:
+            self._ranges._del(self._u, v)
+        except KeyError:
+            raise KeyError(v)
+
+    def _neighbors(self):
+        graph = self._ranges.graph
+        u = self._u
+        return graph[u] if u in graph else {}
+
+    def __iter__(self):
+        neighbors = self._neighbors()
+        for v in neighbors:
+            yield v
+        for v in self._ranges.overrides.get(self._u, ()):
+            if v not in neighbors:
+                yield v
+
+    def __len__(self):
+        neighbors = self._neighbors()
+        return len(neighbors) + sum(1 for v in self._ranges.overrides.get(self._u, ()) if v not in neighbors)
@@ -5,19 +5,50 @@ Specification
 from __future__ import absolute_import
 
 from numbers import Number
-import itertools
+import functools
+
+try:
+    from collections.abc import Iterator
+except ImportError:
+    # python 2
+    from collections import Iterator
 
 import networkx as nx
+import numpy as np
 
 from six import itervalues, iteritems, iterkeys
 
+from penaltymodel.classes.canonical import canonical_order
+from penaltymodel.classes.fingerprint import (digest, digest_state, encode, encode_range, graph_sections,
+                                              linear_range_sections, quadratic_range_sections)
 from penaltymodel.classes.binary_quadratic_model import BinaryQuadraticModel
-from penaltymodel.classes.vartypes import Vartype
+from penaltymodel.classes.feasible_configurations import FeasibleConfigurations
+from penaltymodel.classes.graph import CompactGraph
+from penaltymodel.classes.ranges import LinearRanges, QuadraticRanges, check_range
+from penaltymodel.classes.vartypes import Vartype, _check_vartype
 
 
 __all__ = ['Specification']
 
 
+def _cached_view(build):
+    """A property computed by build the first time it is accessed and kept until
+    Specification.clear_fingerprint is called."""
+    name = build.__name__
+
+    @functools.wraps(build)
+    def view(self):
+        views = self._views
+        try:
+            return views[name]
+        except KeyError:
+            pass
+        views[name] = value = build(self)
+        return value
+
+    return property(view)
+
+
 class Specification(object):
     """Specification for a PenaltyModel.
 
@@ -26,26 +57,35 @@ class Specification(object):
     penalty model.
 
     Args:
-        graph (:class:`networkx.Graph`/iterable[edge]):
+        graph (:class:`networkx.Graph`/:class:`.CompactGraph`/iterable[edge]):
             Defines the structure of the desired binary quadratic model. Each
             node in the graph represents a variable and each edge defines an
             interaction between two variables.
             If given as an iterable of edges, the graph will be constructed
-            by adding each edge to an (initially) empty graph.
+            by adding each edge to an (initially) empty graph. The graph is
+            stored as a :class:`.CompactGraph`, a networkx graph is not kept.
 
         decision_variables (iterable):
             The labels of the penalty model's decision variables. Each variable label
             in `decision_variables` must correspond to a node in `graph`.
             Should be an ordered iterable of hashable labels.
 
-        feasible_configurations (dict[tuple[int], number]/iterable[tuple[int]]):
-            The set of feasible configurations. Defines the allowed configurations
+        feasible_configurations (dict/iterable/:class:`.FeasibleConfigurations`/function):
+            The set of feasible configurations, as a dict[tuple[int], number],
+            an iterable[tuple[int]], a :class:`.FeasibleConfigurations`, an
+            array or a function. Defines the allowed configurations
             of the decision variables allowed by the constraint.
             Each feasible configuration should be a tuple, each element of which
             must be of a value matching `vartype`. If given as a dict, the key
             is the feasible configuration and the value is the desired relative
             energy. If given as an iterable, it will be case to a dict where
-            the relative energies are all 0.
+            the relative energies are all 0. If given as a
+            :class:`.FeasibleConfigurations` or as a 2D :class:`numpy.ndarray`
+            with one row per configuration, the configurations are kept in a
+            compact packed form instead. A generator of configurations, or a
+            vectorized predicate as accepted by
+            :meth:`.FeasibleConfigurations.from_predicate`, is also packed,
+            a chunk at a time.
 
         vartype (:class:`.Vartype`/str/set):
             The variable type desired for the penalty model.
@@ -92,30 +132,36 @@ class Specification(object):
             The labels of the penalty model's decision variables. Each variable label
             in `decision_variables` must correspond to a node in `graph`.
 
-        feasible_configurations (dict[tuple[int], number]):
+        feasible_configurations (dict[tuple[int], number]/:class:`.FeasibleConfigurations`):
             The set of feasible configurations. Defines the allowed configurations
             of the decision variables allowed by the constraint. The key is the
             allowed configuration, the value is the relative energy of each
             configuration.
 
-        graph (:class:`networkx.Graph`):
+        compact_graph (:class:`.CompactGraph`):
             Defines the structure of the desired binary quadratic model. Each
             node in the graph represents a variable and each edge defines an
             interaction between two variables.
 
-        ising_linear_ranges (dict[node, [number, number], optional, default=None):
+        graph (:class:`networkx.Graph`):
+            A read-only networkx view of `compact_graph`, built the first time
+            it is accessed.
+
+        ising_linear_ranges (:class:`.LinearRanges`):
             When the penalty model is spin-valued, specifies the allowed range
             for each of the linear biases.
-            A dict of the form {v: [min, max], ...} where v is
+            A dict-like of the form {v: [min, max], ...} where v is
             a variable in the desired penalty model and [min, max] defines
             the acceptable range for the linear bias associated with v.
+            Only the ranges that were given are stored, see :class:`.LinearRanges`.
 
-        ising_quadratic_ranges (dict[node, dict[node, [number, number]]], optional, default=None):
+        ising_quadratic_ranges (:class:`.QuadraticRanges`):
             When the penalty model is spin-valued, specifies the allowed range
             for each of the quadratic biases.
-            A dict of the form {v: {u: [min, max], ...}, u: {v: [min, max], ...}, ...} where
+            A dict-like of the form {v: {u: [min, max], ...}, u: {v: [min, max], ...}, ...} where
             u and v are variables in the desired penalty model and u, v have an
             interaction - there is an edge between nodes u, v in `graph`.
+            Only the ranges that were given are stored, see :class:`.QuadraticRanges`.
 
     """
     def __init__(self, graph, decision_variables, feasible_configurations, vartype,
@@ -125,14 +171,14 @@ class Specification(object):
         #
         # graph
         #
-        if not isinstance(graph, nx.Graph):
+        if isinstance(graph, nx.Graph):
+            graph = CompactGraph.from_networkx(graph)
+        elif not isinstance(graph, CompactGraph):
             try:
-                edges = graph
-                graph = nx.Graph()
-                graph.add_edges_from(edges)
-            except TypeError:
+                graph = CompactGraph(edges=graph)
+            except (TypeError, ValueError):
                 raise TypeError("expected graph to be a networkx Graph or an iterable of edges")
-        self.graph = graph
+        self.compact_graph = graph
 
         #
         # decision_variables
@@ -147,9 +193,55 @@ class Specification(object):
         self.decision_variables = decision_variables
         num_dv = len(decision_variables)
 
+        #
+        # vartype
+        #
+        vartype = _check_vartype(vartype)
+        self.vartype = vartype
+
         #
         # feasible_configurations
         #
+        if isinstance(feasible_configurations, np.ndarray):
+            feasible_configurations = FeasibleConfigurations(feasible_configurations, vartype)
+        elif callable(feasible_configurations):
+            feasible_configurations = FeasibleConfigurations.from_predicate(feasible_configurations, num_dv, vartype)
+        elif isinstance(feasible_configurations, Iterator):
+            # generators are packed as they are consumed rather than built into a dict
+            feasible_configurations = FeasibleConfigurations.from_iterable(feasible_configurations, num_dv, vartype)
+
+        if isinstance(feasible_configurations, FeasibleConfigurations):
+            # the values and energies were checked on construction
+            if feasible_configurations.num_variables != num_dv and len(feasible_configurations):
+                raise ValueError("the feasible configurations should all match the length of decision_variables")
+            if feasible_configurations.vartype is not vartype:
+                raise ValueError(("feasible_configurations type must match vartype. "
+                                  "feasible_configurations have vartype {}, "
+                                  "expected {}.").format(feasible_configurations.vartype, vartype))
+        else:
+            feasible_configurations = self._check_feasible_configurations(feasible_configurations, num_dv, vartype)
+        self.feasible_configurations = feasible_configurations
+
+        #
+        # energy ranges
+        #
+        self.ising_linear_ranges = self._check_ising_linear_ranges(ising_linear_ranges, graph)
+        self.ising_quadratic_ranges = self._check_ising_quadratic_ranges(ising_quadratic_ranges, graph)
+
+        # computed on demand, see fingerprint, canonical and the numeric views
+        self._fingerprints = None
+        self._canonical = None
+        self._views = {}
+
+    def __getstate__(self):
+        # the cached views are rebuilt when needed rather than pickled, some of them cannot be
+        state = self.__dict__.copy()
+        state['_views'] = {}
+        return state
+
+    @staticmethod
+    def _check_feasible_configurations(feasible_configurations, num_dv, vartype):
+        """check correctness of feasible_configurations given as a dict or an iterable, returns a dict."""
         try:
             if not isinstance(feasible_configurations, dict):
                 feasible_configurations = {config: 0.0 for config in feasible_configurations}
@@ -160,98 +252,43 @@ class Specification(object):
             raise TypeError("expected decision_variables to be an iterable")
         if not all(len(config) == num_dv for config in feasible_configurations):
             raise ValueError("the feasible configurations should all match the length of decision_variables")
-        self.feasible_configurations = feasible_configurations
-
-        #
-        # energy ranges
-        #
-        self.ising_linear_ranges = self._check_ising_linear_ranges(ising_linear_ranges, graph)
-        self.ising_quadratic_ranges = self._check_ising_quadratic_ranges(ising_quadratic_ranges, graph)
 
-        #
-        # vartype
-        #
-        try:
-            if isinstance(vartype, str):
-                vartype = Vartype[vartype]
-            else:
-                vartype = Vartype(vartype)
-            if not (vartype is Vartype.SPIN or vartype is Vartype.BINARY):
-                raise ValueError
-        except (ValueError, KeyError):
-            raise TypeError(("expected input vartype to be one of: "
-                             "Vartype.SPIN, 'SPIN', {-1, 1}, "
-                             "Vartype.BINARY, 'BINARY', or {0, 1}."))
         # check that our feasible configurations match
         seen_variable_types = set().union(*feasible_configurations)
         if not seen_variable_types.issubset(vartype.value):
             raise ValueError(("feasible_configurations type must match vartype. "
                               "feasible_configurations have values {}, "
                               "values permitted by vartype are {}.").format(seen_variable_types, vartype.value))
-        self.vartype = vartype
+        return feasible_configurations
 
     @staticmethod
     def _check_ising_linear_ranges(linear_ranges, graph):
-        """check correctness/populate defaults for ising_linear_ranges."""
-        if linear_ranges is None:
-            linear_ranges = {}
-
-        for v in graph:
-            if v in linear_ranges:
-                # check
-                linear_ranges[v] = Specification._check_range(linear_ranges[v])
-            else:
-                # set default
-                linear_ranges[v] = [-2, 2]
-
-        return linear_ranges
+        """check correctness of the given ising_linear_ranges, the defaults are filled in lazily."""
+        if isinstance(linear_ranges, LinearRanges):
+            # already checked, e.g. from_specification. The ranges are mutable so they are copied
+            # rather than shared between specifications
+            return linear_ranges.copy(graph)
+        return LinearRanges(graph, linear_ranges)
 
     @staticmethod
     def _check_ising_quadratic_ranges(quad_ranges, graph):
-        """check correctness/populate defaults for ising_quadratic_ranges."""
-        if quad_ranges is None:
-            quad_ranges = {}
-
-        # first just populate the top level so we can rely on the structure
-        for u in graph:
-            if u not in quad_ranges:
-                quad_ranges[u] = {}
-
-        # next let's propgate and check what is already present
-        for u, neighbors in iteritems(quad_ranges):
-            for v, rang in iteritems(neighbors):
-                # check the range
-                rang = Specification._check_range(rang)
-
-                if u in quad_ranges[v]:
-                    # it's symmetric
-                    if quad_ranges[u][v] != quad_ranges[v][u]:
-                        raise ValueError("mismatched ranges for ising_quadratic_ranges")
-                quad_ranges[v][u] = quad_ranges[u][v] = rang
-
-        # finally fill in the missing stuff
-        for u, v in graph.edges:
-            if u not in quad_ranges[v]:
-                quad_ranges[u][v] = quad_ranges[v][u] = [-1, 1]
-
-        return quad_ranges
+        """check correctness of the given ising_quadratic_ranges, the defaults are filled in lazily."""
+        if isinstance(quad_ranges, QuadraticRanges):
+            # already checked, e.g. from_specification. The ranges are mutable so they are copied
+            # rather than shared between specifications
+            return quad_ranges.copy(graph)
+        return QuadraticRanges(graph, quad_ranges)
 
-    @staticmethod
-    def _check_range(range_):
-        """Check that a range is in the format we expect [min, max] and return"""
-        try:
-            if not isinstance(range_, list):
-                range_ = list(range_)
-            min_, max_ = range_
-        except (ValueError, TypeError):
-            raise TypeError("each range in ising_linear_ranges should be a list of length 2.")
-        if not isinstance(min_, Number) or not isinstance(max_, Number) or min_ > max_:
-            raise ValueError(("each range in ising_linear_ranges should be a 2-tuple "
-                              "(min, max) where min <= max"))
-        return range_
+    _check_range = staticmethod(check_range)
+
+    @property
+    def graph(self):
+        """:class:`networkx.Graph`: A read-only networkx view of :attr:`.compact_graph`,
+        built the first time it is needed."""
+        return self.compact_graph.to_networkx()
 
     def __len__(self):
-        return len(self.graph)
+        return len(self.compact_graph)
 
     def __eq__(self, specification):
         """Implemented equality checking. """
@@ -259,14 +296,696 @@ class Specification(object):
         # for specification, graph is considered equal if it has the same nodes
         # and edges
         return (isinstance(specification, Specification) and
-                self.graph.edges == specification.graph.edges and
-                self.graph.nodes == specification.graph.nodes and
+                self.compact_graph == specification.compact_graph and
                 self.decision_variables == specification.decision_variables and
                 self.feasible_configurations == specification.feasible_configurations)
 
     def __ne__(self, specification):
         return not self.__eq__(specification)
 
+    def __hash__(self):
+        # only the attributes compared by __eq__ can be used
+        return int(self._digests()[0][:16], 16)
+
+    @property
+    def fingerprint(self):
+        """str: A deterministic digest of the specification.
+
+        Covers the nodes and edges of the graph, the decision variables, the
+        feasible configurations, the vartype and both of the energy ranges.
+        Specifications with the same fingerprint describe the same penalty
+        model. Unlike :func:`hash`, the fingerprint is the same in every
+        process, so it can be used as a key by caches shared between processes.
+
+        The fingerprint is computed once. If the specification is modified in
+        place, other than with :meth:`.relabel_variables`, call
+        :meth:`.clear_fingerprint` afterwards.
+
+        Examples:
+            >>> spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> spec.fingerprint == pm.Specification([(1, 0)], [0, 1], {(1, 1): 0., (-1, -1): 0.}, pm.SPIN).fingerprint
+            True
+
+        """
+        return self._digests()[1]
+
+    def _digests(self):
+        """Compute and cache the (equality, full) digests of the specification."""
+        digests = self._fingerprints
+        if digests is None:
+            # the digest of everything compared by __eq__
+            eq_digest = self._views.get('eq_digest')
+            if eq_digest is None:
+                eq_digest = digest_state(self._digest_prefix,
+                                         ('feasible_configurations', sorted(encode(config) + u'=' + encode(en)
+                                                                            for config, en in
+                                                                            iteritems(self.feasible_configurations)))
+                                         ).hexdigest()
+                self._views['eq_digest'] = eq_digest
+
+            full_digest = digest(*[('specification', [eq_digest]), ('vartype', [self.vartype.name])] +
+                                 linear_range_sections(self.ising_linear_ranges) +
+                                 quadratic_range_sections(self.ising_quadratic_ranges))
+
+            self._fingerprints = digests = (eq_digest, full_digest)
+        return digests
+
+    @_cached_view
+    def _digest_prefix(self):
+        # the hash of the graph and decision variables, shared by the specifications made by
+        # the edit methods that only change the feasible configurations
+        graph = self.compact_graph
+        return digest_state(None, *graph_sections(graph.nodes, graph.edges) +
+                            [('decision_variables', [encode(v) for v in self.decision_variables])])
+
+    def clear_fingerprint(self):
+        """Discard the cached fingerprint, canonical form and numeric views, they will be
+        computed again when next needed."""
+        self._fingerprints = None
+        self._canonical = None
+        self._views = {}
+
+    #
+    # numeric views, for factories. Each is computed once and shared by everything that uses the
+    # specification. The arrays are read-only
+    #
+
+    @property
+    def variable_index(self):
+        """dict: Maps each variable to its index, the position of its node in
+        :attr:`.compact_graph`. Shared with the graph, it should not be modified."""
+        return self.compact_graph.index
+
+    @property
+    def edge_index(self):
+        """:class:`numpy.ndarray`: One row (i, j), i <= j, of variable indices for
+        each edge of the graph, see :attr:`.CompactGraph.edge_index`."""
+        return self.compact_graph.edge_index
+
+    @_cached_view
+    def decision_index(self):
+        """:class:`numpy.ndarray`: The index of each of the decision variables, see
+        :attr:`.variable_index`."""
+        index = self.compact_graph.index
+        array = np.array([index[v] for v in self.decision_variables], dtype=self.compact_graph.edge_index.dtype)
+        array.flags.writeable = False
+        return array
+
+    @_cached_view
+    def _feasible_arrays(self):
+        feasible_configurations = self.feasible_configurations
+        if isinstance(feasible_configurations, FeasibleConfigurations):
+            configurations = feasible_configurations.to_array()
+            energies = feasible_configurations.energies
+        else:
+            # filled row by row, so that there can be no decision variables
+            configurations = np.empty((len(feasible_configurations), len(self.decision_variables)), dtype=np.int8)
+            for row, config in enumerate(feasible_configurations):
+                configurations[row] = config
+            energies = np.array(list(itervalues(feasible_configurations)), dtype=np.float64)
+        configurations.flags.writeable = False
+        energies.flags.writeable = False
+        return configurations, energies
+
+    @property
+    def configuration_matrix(self):
+        """:class:`numpy.ndarray`: The feasible configurations as an int8 array
+        with one row per configuration and one column per decision variable."""
+        return self._feasible_arrays[0]
+
+    @property
+    def energy_vector(self):
+        """:class:`numpy.ndarray`: The float64 energy of each row of
+        :attr:`.configuration_matrix`."""
+        return self._feasible_arrays[1]
+
+    @_cached_view
+    def _linear_range_array(self):
+        index = self.compact_graph.index
+        ranges = np.empty((len(index), 2), dtype=np.float64)
+        ranges[:] = self.ising_linear_ranges.default
+        for v, range_ in iteritems(self.ising_linear_ranges.overrides):
+            if v in index:
+                ranges[index[v]] = range_
+        ranges.flags.writeable = False
+        return ranges
+
+    @property
+    def linear_min(self):
+        """:class:`numpy.ndarray`: The lower bound of the linear bias of each
+        variable, ordered by :attr:`.variable_index`."""
+        return self._linear_range_array[:, 0]
+
+    @property
+    def linear_max(self):
+        """:class:`numpy.ndarray`: The upper bound of the linear bias of each
+        variable, ordered by :attr:`.variable_index`."""
+        return self._linear_range_array[:, 1]
+
+    @_cached_view
+    def _quadratic_range_array(self):
+        graph = self.compact_graph
+        index = graph.index
+        edge_index = graph.edge_index
+
+        ranges = np.empty((len(edge_index), 2), dtype=np.float64)
+        ranges[:] = self.ising_quadratic_ranges.default
+
+        overrides = [(index[u], index[v], range_)
+                     for u, neighbors in iteritems(self.ising_quadratic_ranges.overrides) if u in index
+                     for v, range_ in iteritems(neighbors) if v in index]
+        rows = _edge_rows(edge_index, len(index), [(i, j) for i, j, __ in overrides])
+        for (i, j, range_), row in zip(overrides, rows):
+            if row >= 0:
+                ranges[row] = range_
+        ranges.flags.writeable = False
+        return ranges
+
+    @property
+    def quadratic_min(self):
+        """:class:`numpy.ndarray`: The lower bound of the quadratic bias of each
+        interaction, ordered as the rows of :attr:`.edge_index`."""
+        return self._quadratic_range_array[:, 0]
+
+    @property
+    def quadratic_max(self):
+        """:class:`numpy.ndarray`: The upper bound of the quadratic bias of each
+        interaction, ordered as the rows of :attr:`.edge_index`."""
+        return self._quadratic_range_array[:, 1]
+
+    def canonical(self):
+        """The canonical form of the specification.
+
+        Specifications that differ only in the labels of their variables have
+        the same canonical form, so looking up the canonical form lets a single
+        cached PenaltyModel answer all of them. The order of the decision
+        variables, the feasible configurations, the vartype and the energy
+        ranges are all respected: two specifications have the same canonical
+        form only if one can be turned into the other by relabelling its
+        variables.
+
+        In the canonical form the variables are labelled 0, ..., n-1. The
+        labelling is found by partition refinement with a search over the
+        remaining ties, which is fast for the small graphs used by penalty
+        models.
+
+        The canonical form is computed once, see :attr:`.fingerprint`.
+
+        Returns:
+            tuple: A 2-tuple:
+
+                :class:`.Specification`: The canonical form.
+
+                dict: A mapping from the labels of the canonical form to the
+                labels of this specification. A PenaltyModel for the canonical
+                form can be relabeled with it to give a PenaltyModel for this
+                specification.
+
+        Examples:
+            >>> spec0 = pm.Specification([(0, 1), (1, 2)], (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> spec1 = pm.Specification([('a', 'b'), ('b', 'c')], ('a', 'c'), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> canonical0, _ = spec0.canonical()
+            >>> canonical1, mapping = spec1.canonical()
+            >>> canonical0 == canonical1
+            True
+            >>> widget = pm.get_penalty_model(canonical1).relabel_variables(mapping)  # doctest: +SKIP
+
+        """
+        canonical = self._canonical
+        if canonical is None:
+            graph = self.compact_graph
+            ising_linear_ranges = self.ising_linear_ranges
+            ising_quadratic_ranges = self.ising_quadratic_ranges
+
+            # decision variables are distinguished by their position(s), the other variables only by
+            # their ranges
+            positions = {}
+            for idx, v in enumerate(self.decision_variables):
+                positions.setdefault(v, []).append(idx)
+
+            colours = {v: (0, tuple(positions[v]), encode_range(ising_linear_ranges[v])) if v in positions
+                       else (1, (), encode_range(ising_linear_ranges[v]))
+                       for v in graph}
+            adj = {v: {u: encode_range(ising_quadratic_ranges[v][u]) for u in graph[v] if u != v}
+                   for v in graph}
+
+            order = canonical_order(adj, colours)
+            relabel = {v: idx for idx, v in enumerate(order)}
+
+            canonical_graph = CompactGraph(range(len(order)), ((relabel[u], relabel[v]) for u, v in graph.edges))
+
+            specification = Specification(canonical_graph,
+                                          tuple(relabel[v] for v in self.decision_variables),
+                                          self.feasible_configurations,  # does not change
+                                          self.vartype,
+                                          ising_linear_ranges={relabel[v]: r
+                                                               for v, r in iteritems(ising_linear_ranges.overrides)
+                                                               if v in relabel},
+                                          ising_quadratic_ranges={relabel[v]: {relabel[u]: r
+                                                                               for u, r in iteritems(neighbors)
+                                                                               if graph.has_edge(v, u)}
+                                                                  for v, neighbors in
+                                                                  iteritems(ising_quadratic_ranges.overrides)
+                                                                  if v in relabel})
+
+            self._canonical = canonical = (specification, dict(enumerate(order)))
+
+        specification, mapping = canonical
+        return specification, dict(mapping)
+
+    #
+    # copy-on-write editing
+    #
+
+    def _edited(self, feasible_configurations=None, ising_linear_ranges=None, ising_quadratic_ranges=None):
+        """A new Specification with the given parts, which must already be checked, replaced. Everything
+        else, including the cached values that do not depend on the replaced parts, is shared, except
+        for the mutable energy ranges which are copied."""
+        specification = Specification.__new__(Specification)
+        specification.compact_graph = self.compact_graph
+        specification.decision_variables = self.decision_variables
+        specification.vartype = self.vartype
+
+        keep = ['decision_index', '_digest_prefix']
+        if feasible_configurations is None:
+            feasible_configurations = self.feasible_configurations
+            keep.extend(['_feasible_arrays', 'eq_digest'])
+        if ising_linear_ranges is None:
+            # the ranges are mutable, so only the explicit ranges are shared, and those by value
+            ising_linear_ranges = self.ising_linear_ranges.copy()
+            keep.append('_linear_range_array')
+        if ising_quadratic_ranges is None:
+            ising_quadratic_ranges = self.ising_quadratic_ranges.copy()
+            keep.append('_quadratic_range_array')
+        specification.feasible_configurations = feasible_configurations
+        specification.ising_linear_ranges = ising_linear_ranges
+        specification.ising_quadratic_ranges = ising_quadratic_ranges
+
+        specification._fingerprints = None
+        specification._canonical = None
+        views = self._views
+        specification._views = {name: views[name] for name in keep if name in views}
+        return specification
+
+    def add_feasible_configurations(self, feasible_configurations):
+        """Create a new Specification with more feasible configurations.
+
+        Only the added configurations are checked. The graph and the decision
+        variables are shared with this specification, along with the cached
+        values that do not depend on the configurations. The energy ranges are
+        copied without being checked again.
+
+        Args:
+            feasible_configurations (dict[tuple[int], number]/iterable[tuple[int]]):
+                The configurations to add. If given as an iterable, the
+                relative energies are all 0. Configurations that are already
+                feasible have their energy replaced.
+
+        Returns:
+            :class:`.Specification`
+
+        Examples:
+            >>> spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> sorted(spec.add_feasible_configurations([(-1, 1)]).feasible_configurations)
+            [(-1, -1), (-1, 1), (1, 1)]
+
+        """
+        num_dv = len(self.decision_variables)
+        vartype = self.vartype
+        added = self._check_feasible_configurations(feasible_configurations, num_dv, vartype)
+        if not added:
+            return self._edited()
+
+        current = self.feasible_configurations
+        if isinstance(current, FeasibleConfigurations):
+            specification = self._edited(current._added(FeasibleConfigurations(added, vartype)))
+        else:
+            new = dict(current)
+            new.update(added)
+            specification = self._edited(new)
+
+            arrays = self._views.get('_feasible_arrays')
+            if arrays is not None and not any(config in current for config in added):
+                # the new configurations are appended to the dict, and so to the arrays
+                configurations, energies = arrays
+                configurations = np.concatenate((configurations, np.array(list(added), dtype=np.int8)))
+                energies = np.concatenate((energies, np.array(list(itervalues(added)), dtype=np.float64)))
+                configurations.flags.writeable = False
+                energies.flags.writeable = False
+                specification._views['_feasible_arrays'] = (configurations, energies)
+
+        return specification
+
+    def remove_feasible_configurations(self, configurations):
+        """Create a new Specification with fewer feasible configurations.
+
+        The graph and the decision variables are shared with this
+        specification, along with the cached values that do not depend on the
+        configurations. The energy ranges are copied without being checked
+        again.
+
+        Args:
+            configurations (iterable[tuple[int]]): The configurations to remove.
+
+        Returns:
+            :class:`.Specification`
+
+        Raises:
+            ValueError: If one of the configurations is not feasible.
+
+        """
+        current = self.feasible_configurations
+        configurations = list(configurations)
+
+        if isinstance(current, FeasibleConfigurations):
+            try:
+                rows = [current._row(config) for config in configurations]
+            except KeyError as e:
+                raise ValueError("{} is not a feasible configuration".format(e.args[0]))
+
+            specification = self._edited(current._removed(rows))
+
+            arrays = self._views.get('_feasible_arrays')
+            if arrays is not None:
+                # the rows stay in the same order
+                configurations, energies = (np.delete(arrays[0], rows, axis=0), np.delete(arrays[1], rows))
+                configurations.flags.writeable = False
+                energies.flags.writeable = False
+                specification._views['_feasible_arrays'] = (configurations, energies)
+        else:
+            new = dict(current)
+            for config in configurations:
+                try:
+                    del new[config]
+                except (KeyError, TypeError):
+                    raise ValueError("{} is not a feasible configuration".format(config))
+            specification = self._edited(new)
+
+        return specification
+
+    def set_linear_range(self, v, range_):
+        """Create a new Specification with a different range for the linear bias of v.
+
+        Only the new range is checked. Everything else is shared with this
+        specification, along with the cached values that do not depend on the
+        linear ranges.
+
+        Args:
+            v (node): A variable in the graph.
+            range_ (list/tuple): The new [min, max] range.
+
+        Returns:
+            :class:`.Specification`
+
+        Examples:
+            >>> spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> spec.set_linear_range(1, [-1, 1]).ising_linear_ranges[1]
+            [-1, 1]
+
+        """
+        graph = self.compact_graph
+        if v not in graph:
+            raise ValueError("{} does not have a corresponding node in graph".format(v))
+        range_ = check_range(range_)
+
+        ranges = self.ising_linear_ranges.copy()
+        ranges.overrides[v] = range_
+
+        specification = self._edited(ising_linear_ranges=ranges)
+
+        array = self._views.get('_linear_range_array')
+        if array is not None:
+            array = array.copy()
+            array[graph.index[v]] = range_
+            array.flags.writeable = False
+            specification._views['_linear_range_array'] = array
+
+        return specification
+
+    def set_quadratic_range(self, u, v, range_):
+        """Create a new Specification with a different range for the quadratic bias of u, v.
+
+        Only the new range is checked. Everything else is shared with this
+        specification, along with the cached values that do not depend on the
+        quadratic ranges.
+
+        Args:
+            u (node): A variable in the graph.
+            v (node): A neighbor of u in the graph.
+            range_ (list/tuple): The new [min, max] range.
+
+        Returns:
+            :class:`.Specification`
+
+        """
+        graph = self.compact_graph
+        if not graph.has_edge(u, v):
+            raise ValueError("{}, {} does not have a corresponding edge in graph".format(u, v))
+        range_ = check_range(range_)
+
+        ranges = self.ising_quadratic_ranges.copy()
+        ranges._set(u, v, range_)
+
+        specification = self._edited(ising_quadratic_ranges=ranges)
+
+        array = self._views.get('_quadratic_range_array')
+        if array is not None:
+            index = graph.index
+            row, = _edge_rows(graph.edge_index, len(index), [(index[u], index[v])])
+            array = array.copy()
+            array[row] = range_
+            array.flags.writeable = False
+            specification._views['_quadratic_range_array'] = array
+
+        return specification
+
+    def flip_variables(self, variables):
+        """Create a new Specification with the given variables flipped.
+
+        Flipping a decision variable replaces its value s with -s (or x with
+        1 - x for binary specifications) in each of the feasible configurations.
+        Flipping an auxiliary variable does not change the specification.
+
+        The new specification shares its graph with this one and has a copy of
+        its energy ranges.
+
+        Args:
+            variables (iterable): The variables to flip.
+
+        Returns:
+            :class:`.Specification`
+
+        Examples:
+            >>> spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> sorted(spec.flip_variables([2]).feasible_configurations)
+            [(-1, 1), (1, -1)]
+
+        """
+        variables = set(variables)
+        if not all(v in self.compact_graph for v in variables):
+            raise ValueError("some of the variables to flip do not have a corresponding node in graph")
+
+        mask = tuple(v in variables for v in self.decision_variables)
+
+        if isinstance(self.feasible_configurations, FeasibleConfigurations):
+            feasible_configurations = self.feasible_configurations.flip(mask)
+        elif self.vartype is Vartype.SPIN:
+            feasible_configurations = {tuple(-s if flip else s for s, flip in zip(config, mask)): en
+                                       for config, en in iteritems(self.feasible_configurations)}
+        else:
+            feasible_configurations = {tuple(1 - x if flip else x for x, flip in zip(config, mask)): en
+                                       for config, en in iteritems(self.feasible_configurations)}
+
+        # the flipped configurations are valid if these are, and the ranges are copied
+        return self._edited(feasible_configurations=feasible_configurations)
+
+    def gauge_canonical(self):
+        """The gauge-canonical representative of the specification.
+
+        Flipping a decision variable (see :meth:`.flip_variables`) gives a
+        specification whose penalty models are those of this one with the
+        biases of that variable negated, provided that the energy ranges of the
+        variable and of its interactions are symmetric. Of all of the
+        specifications that can be reached by flipping such decision variables,
+        one is chosen as the representative. Specifications that are related
+        by flips have the same representative, so a single PenaltyModel can
+        answer all of them.
+
+        Only spin-valued specifications are reduced.
+
+        Returns:
+            tuple: A 2-tuple:
+
+                :class:`.Specification`: The representative. If no variables
+                need to be flipped, this is the specification itself.
+
+                tuple: The decision variables that were flipped. A PenaltyModel
+                for the representative can be flipped back with
+                :meth:`.PenaltyModel.flip_variables` to give a PenaltyModel
+                for this specification.
+
+        Examples:
+            >>> spec0 = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+            >>> spec1 = pm.Specification(nx.path_graph(3), (0, 2), {(-1, 1), (1, -1)}, pm.SPIN)
+            >>> spec0.gauge_canonical()[0] == spec1.gauge_canonical()[0]
+            True
+            >>> representative, flipped = spec1.gauge_canonical()
+            >>> widget = pm.get_penalty_model(representative).flip_variables(flipped)  # doctest: +SKIP
+
+        """
+        feasible_configurations = self.feasible_configurations
+        if self.vartype is not Vartype.SPIN or not feasible_configurations:
+            return self, ()
+
+        ising_linear_ranges = self.ising_linear_ranges
+        ising_quadratic_ranges = self.ising_quadratic_ranges
+
+        def symmetric(range_):
+            min_, max_ = range_
+            return min_ == -max_
+
+        # the decision variables that can be flipped, and the position of each in the configurations
+        positions = {}
+        for idx, v in enumerate(self.decision_variables):
+            positions.setdefault(v, []).append(idx)
+        flippable = [v for v in positions
+                     if symmetric(ising_linear_ranges[v]) and
+                     all(symmetric(range_) for range_ in itervalues(ising_quadratic_ranges[v]))]
+        if not flippable:
+            return self, ()
+
+        # Flipping by each lowest energy configuration maps that configuration to all -1s on the
+        # flippable variables. Specifications related by flips give the same set of candidates, so
+        # the smallest of them is a representative
+        ground = min(itervalues(feasible_configurations))
+        best = None
+        for candidate, en in iteritems(feasible_configurations):
+            if en != ground:
+                continue
+
+            flipped = tuple(v for v in flippable if candidate[positions[v][0]] > 0)
+            mask = set(idx for v in flipped for idx in positions[v])
+            key = sorted((tuple(-s if idx in mask else s for idx, s in enumerate(config)), en)
+                         for config, en in iteritems(feasible_configurations))
+
+            if best is None or key < best[0]:
+                best = (key, flipped)
+
+        __, flipped = best
+        if not flipped:
+            return self, ()
+        return self.flip_variables(flipped), flipped
+
+    def decompose(self):
+        """Split the specification into independent specifications, one per group of
+        connected components of the graph.
+
+        A group of components is independent of the rest of the graph if the
+        feasible configurations are the product of the configurations of its
+        decision variables with those of the remaining decision variables, and
+        the energy of each feasible configuration is the sum of the energies of
+        the two parts. The penalty models of the parts can then be found
+        separately and added together, see :meth:`.PenaltyModel.from_parts`.
+
+        The components are considered in order and each part is made as small
+        as possible. Components without decision variables are put in the
+        first part.
+
+        Returns:
+            list[:class:`.Specification`]: The parts. If the specification does
+            not factor, a list holding only the specification itself.
+
+        Examples:
+            >>> graph = nx.Graph([(0, 1), (2, 3)])
+            >>> spec = pm.Specification(graph, (0, 2), {(-1, -1), (-1, 1), (1, -1), (1, 1)}, pm.SPIN)
+            >>> [part.decision_variables for part in spec.decompose()]
+            [(0,), (2,)]
+
+        """
+        decision_variables = self.decision_variables
+        feasible_configurations = self.feasible_configurations
+        if not decision_variables or not feasible_configurations:
+            return [self]
+
+        graph = self.compact_graph
+        components = graph.connected_components()
+        if len(components) < 2:
+            return [self]
+
+        # the positions in the configurations of the decision variables of each component,
+        # components without decision variables are kept aside for the first part
+        component = {v: idx for idx, nodes in enumerate(components) for v in nodes}
+        columns = {}
+        for pos, v in enumerate(decision_variables):
+            columns.setdefault(component[v], []).append(pos)
+        auxiliary = [idx for idx in range(len(components)) if idx not in columns]
+        groups = [columns[idx] for idx in sorted(columns)]
+        if len(groups) < 2:
+            return [self]
+
+        if isinstance(feasible_configurations, FeasibleConfigurations):
+            configs = feasible_configurations.to_array()
+            energies = feasible_configurations.energies
+        else:
+            configs = np.array(list(feasible_configurations), dtype=np.int8).reshape(-1, len(decision_variables))
+            energies = np.array(list(itervalues(feasible_configurations)), dtype=np.float64)
+
+        # peel off the smallest leading run of groups that is independent of the rest
+        parts = []  # (component indices, columns, configs, energies)
+        remaining = np.arange(len(decision_variables))  # the columns of configs
+        pending_components = []
+        pending_columns = []
+        for idx, (cidx, cols) in enumerate(zip(sorted(columns), groups)):
+            pending_components.append(cidx)
+            pending_columns.extend(cols)
+            if idx == len(groups) - 1:
+                # the remaining columns all belong to the last part
+                parts.append((pending_components, [int(c) for c in remaining], configs, energies))
+                break
+
+            left = np.isin(remaining, pending_columns)
+            split = _split_configurations(configs, energies, left)
+            if split is None:
+                continue
+
+            (left_configs, left_energies), (configs, energies) = split
+            parts.append((pending_components, [int(c) for c in remaining[left]], left_configs, left_energies))
+            remaining = remaining[~left]
+            pending_components = []
+            pending_columns = []
+
+        if len(parts) < 2:
+            return [self]
+
+        parts[0][0].extend(auxiliary)
+
+        ising_linear_ranges = self.ising_linear_ranges
+        ising_quadratic_ranges = self.ising_quadratic_ranges
+        vartype = self.vartype
+
+        specifications = []
+        for component_indices, cols, part_configs, part_energies in parts:
+            nodes = set(v for cidx in component_indices for v in components[cidx])
+
+            if isinstance(feasible_configurations, FeasibleConfigurations):
+                part_feasible_configurations = FeasibleConfigurations(part_configs, vartype, part_energies)
+            else:
+                part_feasible_configurations = dict(zip(map(tuple, part_configs.tolist()),
+                                                        part_energies.tolist()))
+
+            specifications.append(
+                Specification(graph.subgraph(nodes),
+                              tuple(decision_variables[pos] for pos in cols),
+                              part_feasible_configurations,
+                              vartype,
+                              ising_linear_ranges={v: r for v, r in iteritems(ising_linear_ranges.overrides)
+                                                   if v in nodes},
+                              ising_quadratic_ranges={u: {v: r for v, r in iteritems(neighbors) if v in nodes}
+                                                      for u, neighbors in iteritems(ising_quadratic_ranges.overrides)
+                                                      if u in nodes}))
+
+        return specifications
+
     def relabel_variables(self, mapping, copy=True):
         """Relabel the variables and nodes according to the given mapping.
 
@@ -283,7 +1002,7 @@ class Specification(object):
             if copy=True returns a new Specification.
 
         """
-        graph = self.graph
+        graph = self.compact_graph
         ising_linear_ranges = self.ising_linear_ranges
         ising_quadratic_ranges = self.ising_quadratic_ranges
 
@@ -299,75 +1018,77 @@ class Specification(object):
                                   "the existing variable of the same name").format(v))
 
         if copy:
-            return Specification(nx.relabel_nodes(graph, mapping, copy=True),  # also checks the mapping
+            return Specification(graph.relabel(mapping),  # also checks the mapping
                                  tuple(mapping.get(v, v) for v in self.decision_variables),
                                  self.feasible_configurations,  # does not change
                                  vartype=self.vartype,  # does not change
-                                 ising_linear_ranges={mapping.get(v, v): ising_linear_ranges[v] for v in graph},
+                                 ising_linear_ranges={mapping.get(v, v): r
+                                                      for v, r in iteritems(ising_linear_ranges.overrides)},
                                  ising_quadratic_ranges={mapping.get(v, v): {mapping.get(u, u): r
                                                                              for u, r in iteritems(neighbors)}
-                                                         for v, neighbors in iteritems(ising_quadratic_ranges)})
+                                                         for v, neighbors in
+                                                         iteritems(ising_quadratic_ranges.overrides)})
         else:
-            # now we need the ising_linear_ranges and ising_quadratic_ranges
-            shared = old_labels & new_labels
-
-            if shared:
-                # in this case we need to transform to an intermediate state
-                # counter will be used to generate the intermediate labels, as an easy optimization
-                # we start the counter with a high number because often variables are labeled by
-                # integers starting from 0
-                counter = itertools.count(2 * len(self))
-
-                old_to_intermediate = {}
-                intermediate_to_new = {}
-
-                for old, new in iteritems(mapping):
-                    if old == new:
-                        # we can remove self-labels
-                        continue
+            # the labels are part of the fingerprint
+            Specification.clear_fingerprint(self)
 
-                    if old in new_labels or new in old_labels:
-
-                        # try to get a new unique label
-                        lbl = next(counter)
-                        while lbl in new_labels or lbl in old_labels:
-                            lbl = next(counter)
-
-                        # add it to the mapping
-                        old_to_intermediate[old] = lbl
-                        intermediate_to_new[lbl] = new
-
-                    else:
-                        old_to_intermediate[old] = new
-                        # don't need to add it to intermediate_to_new because it is a self-label
-
-                Specification.relabel_variables(self, old_to_intermediate, copy=False)
-                Specification.relabel_variables(self, intermediate_to_new, copy=False)
-                return self
-
-            # modifies graph in place
-            nx.relabel_nodes(self.graph, mapping, copy=False)
+            # the compact graph is immutable, the relabeled one shares its edges. The relabeling
+            # happens all at once so there is no need for intermediate labels
+            self.compact_graph = graph = graph.relabel(mapping)
 
             # this is always a new object
             self.decision_variables = tuple(mapping.get(v, v) for v in self.decision_variables)
 
-            # we can just relabel in-place without worrying about conflict
-            for v in old_labels:
-                if v in mapping:
-                    ising_linear_ranges[mapping[v]] = ising_linear_ranges[v]
-                    del ising_linear_ranges[v]
-
-            # need to do the deeper level first
-            for neighbors in itervalues(ising_quadratic_ranges):
-                for v in list(neighbors):
-                    if v in mapping:
-                        neighbors[mapping[v]] = neighbors[v]
-                        del neighbors[v]
-
-            # now the top level
-            for v in old_labels:
-                if v in mapping:
-                    ising_quadratic_ranges[mapping[v]] = ising_quadratic_ranges[v]
-                    del ising_quadratic_ranges[v]
+            # the range objects may be shared with the specifications this one was edited from,
+            # so they are replaced rather than relabeled in place
+            self.ising_linear_ranges = ising_linear_ranges.relabeled(mapping, graph)
+            self.ising_quadratic_ranges = ising_quadratic_ranges.relabeled(mapping, graph)
 
             return self
+
+
+def _split_configurations(configs, energies, left):
+    """Factor the configurations over the columns in left and the other columns.
+
+    Returns ((left configs, left energies), (right configs, right energies)), with the energies
+    of each feasible configuration the sum of its two parts, or None if they do not factor.
+    """
+    left_configs, left_inverse = np.unique(configs[:, left], axis=0, return_inverse=True)
+    right_configs, right_inverse = np.unique(configs[:, ~left], axis=0, return_inverse=True)
+    left_inverse = left_inverse.reshape(-1)
+    right_inverse = right_inverse.reshape(-1)
+
+    # the rows are unique, so they are the product exactly when the counts match
+    if len(left_configs) * len(right_configs) != len(configs):
+        return None
+
+    table = np.empty((len(left_configs), len(right_configs)))
+    table[left_inverse, right_inverse] = energies
+
+    # split the energies around a lowest energy configuration so that neither part is negative
+    # relative to the other
+    ground = np.argmin(energies)
+    left_energies = table[:, right_inverse[ground]]
+    right_energies = table[left_inverse[ground], :] - energies[ground]
+    if not np.allclose(left_energies[:, np.newaxis] + right_energies[np.newaxis, :], table):
+        return None
+
+    return (left_configs, left_energies), (right_configs, right_energies)
+
+
+def _edge_rows(edge_index, num_nodes, pairs):
+    """The row of edge_index for each (i, j) pair of node indices, -1 for the pairs that are
+    not edges."""
+    if not pairs:
+        return []
+    if not len(edge_index):
+        return [-1] * len(pairs)
+
+    # the rows are sorted, so they can be searched by i * n + j
+    keys = edge_index[:, 0].astype(np.int64) * num_nodes + edge_index[:, 1]
+    pairs = np.array(pairs, dtype=np.int64)
+    targets = pairs.min(axis=1) * num_nodes + pairs.max(axis=1)
+    rows = np.searchsorted(keys, targets)
+    found = rows < len(keys)
+    found[found] = keys[rows[found]] == targets[found]
+    return np.where(found, rows, -1).tolist()
@@ -0,0 +1,225 @@
+import unittest
+import random
+import itertools
+import pickle
+
+import numpy as np
+
+import penaltymodel as pm
+import penaltymodel.classes.array_binary_quadratic_model as abqm
+
+
+def random_models(vartype, num_variables=6, seed=12):
+    """A BinaryQuadraticModel and an ArrayBinaryQuadraticModel with the same biases."""
+    rnd = random.Random(seed)
+    linear = {v: rnd.uniform(-1, 1) for v in range(num_variables)}
+    quadratic = {(u, v): rnd.uniform(-1, 1)
+                 for u, v in itertools.combinations(range(num_variables), 2) if rnd.random() < .6}
+    offset = rnd.uniform(-1, 1)
+    return (pm.BinaryQuadraticModel(linear, quadratic, offset, vartype),
+            pm.ArrayBinaryQuadraticModel(linear, quadratic, offset, vartype))
+
+
+class TestArrayBinaryQuadraticModel(unittest.TestCase):
+
+    def assertSameEnergies(self, model, other):
+        variables = list(model.linear)
+        for config in itertools.product(sorted(model.vartype.value), repeat=len(variables)):
+            sample = dict(zip(variables, config))
+            self.assertAlmostEqual(model.energy(sample), other.energy(sample))
+
+    def test_construction_typical(self):
+        linear = {0: 1, 1: -1, 2: .5}
+        quadratic = {(0, 1): .5, (1, 2): 1.5}
+        m = pm.ArrayBinaryQuadraticModel(linear, quadratic, 1.4, pm.SPIN)
+
+        self.assertIsInstance(m, pm.BinaryQuadraticModel)
+        self.assertEqual(linear, m.linear)
+        self.assertEqual(quadratic, m.quadratic)
+        self.assertEqual(1.4, m.offset)
+        self.assertIs(m.vartype, pm.SPIN)
+        self.assertEqual(len(m), 3)
+
+        for (u, v), bias in quadratic.items():
+            self.assertEqual(m.adj[u][v], bias)
+            self.assertEqual(m.adj[v][u], bias)
+            # like the dict, the quadratic biases are keyed one way
+            self.assertNotIn((v, u), m.quadratic)
+        self.assertEqual(set(m.adj[1]), {0, 2})
+        self.assertEqual(len(m.adj[0]), 1)
+
+        np.testing.assert_array_equal(m.linear_biases, [1, -1, .5])
+        self.assertEqual(m.index, {0: 0, 1: 1, 2: 2})
+
+    def test_construction_bad(self):
+        with self.assertRaises(TypeError):
+            pm.ArrayBinaryQuadraticModel({0: 0}, {}, 0., 'ISING')
+        with self.assertRaises(TypeError):
+            pm.ArrayBinaryQuadraticModel([0], {}, 0., pm.SPIN)
+        with self.assertRaises(ValueError):
+            pm.ArrayBinaryQuadraticModel({0: 0}, {(0, 1): 1}, 0., pm.SPIN)
+        with self.assertRaises(ValueError):
+            pm.ArrayBinaryQuadraticModel({0: 0}, {(0, 0): 1}, 0., pm.SPIN)
+        with self.assertRaises(ValueError):
+            pm.ArrayBinaryQuadraticModel({0: 0, 1: 0}, {(0, 1): 1, (1, 0): 1}, 0., pm.SPIN)
+
+    def test_from_arrays(self):
+        m = pm.ArrayBinaryQuadraticModel.from_arrays([1, -1], [0], [1], [.5], 0., pm.BINARY, variables='ab')
+        self.assertEqual(m, pm.BinaryQuadraticModel({'a': 1, 'b': -1}, {('a', 'b'): .5}, 0., pm.BINARY))
+
+        with self.assertRaises(ValueError):
+            pm.ArrayBinaryQuadraticModel.from_arrays([1, -1], [0], [2], [.5], 0., pm.BINARY)
+        with self.assertRaises(ValueError):
+            pm.ArrayBinaryQuadraticModel.from_arrays([1, -1], [0], [1], [.5], 0., pm.BINARY, variables='aa')
+
+    def test_equality(self):
+        for vartype in (pm.SPIN, pm.BINARY):
+            model, array_model = random_models(vartype)
+            self.assertEqual(model, array_model)
+            self.assertEqual(array_model, model)
+            self.assertEqual(array_model, pm.ArrayBinaryQuadraticModel.from_model(model))
+
+            # the same model with the variables in another order
+            linear = dict(reversed(list(model.linear.items())))
+            quadratic = {(v, u): bias for (u, v), bias in model.quadratic.items()}
+            other = pm.ArrayBinaryQuadraticModel(linear, quadratic, model.offset, vartype)
+            self.assertEqual(array_model, other)
+
+            other = array_model.copy()
+            other.quadratic_biases[0] += 1
+            self.assertNotEqual(array_model, other)
+
+    def test_energy(self):
+        for vartype in (pm.SPIN, pm.BINARY):
+            model, array_model = random_models(vartype)
+            self.assertSameEnergies(model, array_model)
+
+    def test_change_vartype(self):
+        for vartype, other in ((pm.SPIN, pm.BINARY), (pm.BINARY, pm.SPIN)):
+            model, array_model = random_models(vartype)
+            converted = array_model.change_vartype(other)
+            self.assertIsInstance(converted, pm.ArrayBinaryQuadraticModel)
+            self.assertIs(converted.vartype, other)
+            self.assertSameEnergies(model.change_vartype(other), converted)
+
+        model, array_model = random_models(pm.SPIN)
+        h, J, offset = array_model.as_ising()
+        self.assertEqual((h, J, offset), model.as_ising())
+        Q, offset = array_model.as_qubo()
+        Q_, offset_ = model.as_qubo()
+        self.assertEqual(set(Q), set(Q_))
+        for key, bias in Q.items():
+            self.assertAlmostEqual(bias, Q_[key])
+        self.assertAlmostEqual(offset, offset_)
+
+    def test_flip_variables(self):
+        for vartype in (pm.SPIN, pm.BINARY):
+            model, array_model = random_models(vartype)
+            flipped = array_model.flip_variables([0, 3, 5])
+            self.assertIsInstance(flipped, pm.ArrayBinaryQuadraticModel)
+            self.assertSameEnergies(model.flip_variables([0, 3, 5]), flipped)
+
+    def test_relabel_variables(self):
+        model, array_model = random_models(pm.SPIN)
+        mapping = {0: 'a', 1: 0, 2: 1}
+
+        relabeled = array_model.relabel_variables(mapping)
+        self.assertEqual(relabeled, model.relabel_variables(mapping))
+        self.assertEqual(array_model, model)  # unchanged
+
+        array_model.relabel_variables(mapping, copy=False)
+        model.relabel_variables(mapping, copy=False)
+        self.assertEqual(array_model, model)
+
+        with self.assertRaises(ValueError):
+            array_model.relabel_variables({'a': 3})
+
+    def test_energies(self):
+        for vartype in (pm.SPIN, pm.BINARY):
+            model, array_model = random_models(vartype)
+            samples = np.random.RandomState(3).choice(sorted(vartype.value), size=(50, len(model)))
+            variable_order = list(model.linear)[::-1]
+
+            np.testing.assert_allclose(array_model.energies(samples, variable_order=variable_order),
+                                       model.energies(samples, variable_order=variable_order))
+
+    def test_pickle(self):
+        model, array_model = random_models(pm.BINARY)
+        self.assertEqual(pickle.loads(pickle.dumps(array_model)), array_model)
+
+    def test_change_vartype_inplace(self):
+        model, array_model = random_models(pm.SPIN)
+
+        self.assertIs(array_model.change_vartype(pm.BINARY, inplace=True), array_model)
+        self.assertIsInstance(array_model, pm.ArrayBinaryQuadraticModel)
+        self.assertSameEnergies(model.change_vartype(pm.BINARY), array_model)
+
+        array_model.change_vartype(pm.SPIN, inplace=True)
+        self.assertEqual(array_model, model)
+
+    def test_cache_direct_edits(self):
+        model, array_model = random_models(pm.SPIN)
+        array_model.as_qubo()
+
+        model.linear[0] = 2
+        array_model.linear_biases[0] = 2
+        array_model.invalidate()
+        self.assertAlmostEqual(array_model.as_qubo()[1], model.as_qubo()[1])
+
+        # the offset is tracked
+        model.offset += 1
+        array_model.offset += 1
+        self.assertAlmostEqual(array_model.as_qubo()[1], model.as_qubo()[1])
+        self.assertSameEnergies(model.change_vartype(pm.BINARY), array_model.change_vartype(pm.BINARY))
+
+    def test_mutation(self):
+        # apply the same random changes to both kinds of model
+        rnd = random.Random(3)
+        for min_recent in (0, 2, 1024):
+            original = abqm._MIN_RECENT_INTERACTIONS
+            abqm._MIN_RECENT_INTERACTIONS = min_recent
+            try:
+                model = pm.BinaryQuadraticModel({}, {}, 0.0, pm.SPIN)
+                array_model = pm.ArrayBinaryQuadraticModel({}, {}, 0.0, pm.SPIN)
+
+                for __ in range(200):
+                    op = rnd.random()
+                    if op < .2:
+                        args = (rnd.randrange(10), rnd.randint(-3, 3))
+                        model.add_variable(*args)
+                        array_model.add_variable(*args)
+                    elif op < .5:
+                        args = tuple(rnd.sample(range(10), 2)) + (rnd.randint(-3, 3),)
+                        model.add_interaction(*args)
+                        array_model.add_interaction(*args)
+                    elif op < .6:
+                        pairs = np.array([rnd.sample(range(10), 2) for __ in range(5)])
+                        biases = np.arange(5.)
+                        model.add_interactions_from(pairs, biases)
+                        array_model.add_interactions_from(pairs, biases)
+                    elif op < .75 and model.quadratic:
+                        u, v = rnd.choice(sorted(model.quadratic))
+                        model.remove_interaction(v, u)
+                        array_model.remove_interaction(v, u)
+                    elif op < .8 and model.linear:
+                        v = rnd.choice(sorted(model.linear))
+                        model.remove_variable(v)
+                        array_model.remove_variable(v)
+                    elif op < .85:
+                        model.scale(.5)
+                        array_model.scale(.5)
+                    else:
+                        # build the CSR adjacency between changes
+                        self.assertEqual(array_model.adj, model.adj)
+
+                    self.assertEqual(array_model, model)
+                    self.assertEqual(model, array_model)
+            finally:
+                abqm._MIN_RECENT_INTERACTIONS = original
+
+        with self.assertRaises(ValueError):
+            array_model.add_interaction(0, 0, 1)
+        with self.assertRaises(ValueError):
+            array_model.remove_variable('a')
+        with self.assertRaises(ValueError):
+            array_model.remove_interaction(0, 'a')
@@ -3,8 +3,10 @@ import random
 import itertools
 
 import networkx as nx
+import numpy as np
 
 import penaltymodel as pm
+import penaltymodel.classes.binary_quadratic_model as bqm
 
 
 class TestBinaryQuadraticModel(unittest.TestCase):
@@ -436,6 +438,28 @@ class TestBinaryQuadraticModel(unittest.TestCase):
             self.assertAlmostEqual(model.energy(spin_sample),
                                    new_model.energy(binary_sample))
 
+    def test_flip_variables(self):
+        linear = {0: 1, 1: -1, 2: .5}
+        quadratic = {(0, 1): .5, (1, 2): 1.5, (0, 2): -.75}
+
+        for vartype in (pm.SPIN, pm.BINARY):
+            model = pm.BinaryQuadraticModel(linear, quadratic, 1.4, vartype)
+
+            for flipped in ([], [0], [1, 2], [0, 1, 2], [0, 'a']):
+                new_model = model.flip_variables(flipped)
+
+                for values in itertools.product(sorted(vartype.value), repeat=len(linear)):
+                    sample = dict(enumerate(values))
+                    if vartype is pm.SPIN:
+                        flipped_sample = {v: -val if v in flipped else val for v, val in sample.items()}
+                    else:
+                        flipped_sample = {v: 1 - val if v in flipped else val for v, val in sample.items()}
+
+                    self.assertAlmostEqual(new_model.energy(sample), model.energy(flipped_sample))
+
+            # the original is unchanged
+            self.assertEqual(model.linear, linear)
+
     def test_to_networkx_graph(self):
         graph = nx.barbell_graph(7, 6)
 
@@ -526,3 +550,204 @@ class TestBinaryQuadraticModel(unittest.TestCase):
 
         self.assertFalse(model0 != model1)
         self.assertTrue(model0 == model1)
+
+    def test_energies(self):
+        for vartype in (pm.SPIN, pm.BINARY):
+            model = pm.BinaryQuadraticModel({'a': 1, 'b': -1, 'c': .5}, {('a', 'b'): .5, ('c', 'b'): 1.5},
+                                            1.4, vartype)
+            variables = ['c', 'a', 'b']
+            configs = list(itertools.product(sorted(vartype.value), repeat=3))
+            expected = [model.energy(dict(zip(variables, config))) for config in configs]
+
+            energies = model.energies(np.array(configs, dtype=np.int8), variable_order=variables)
+            self.assertEqual(energies.shape, (8,))
+            np.testing.assert_allclose(energies, expected)
+
+            # as dicts, from a generator
+            samples = (dict(zip(variables, config)) for config in configs)
+            np.testing.assert_allclose(model.energies(samples), expected)
+
+            # an extra column is ignored
+            np.testing.assert_allclose(model.energies([config + (7,) for config in configs],
+                                                      variable_order=variables + ['d']),
+                                       expected)
+
+        self.assertEqual(model.energies(np.zeros((0, 3))).shape, (0,))
+
+        with self.assertRaises(ValueError):
+            model.energies([[0, 1, 1]], variable_order=['a', 'b'])
+        with self.assertRaises(ValueError):
+            model.energies([0, 1, 1], variable_order=['a', 'b', 'c'])
+
+    def test_energies_chunked(self):
+        model = pm.BinaryQuadraticModel({v: .1 * v for v in range(10)},
+                                        {(u, v): -1 for u, v in itertools.combinations(range(10), 2)},
+                                        0.0, pm.SPIN)
+        samples = np.random.RandomState(5).choice([-1, 1], size=(100, 10))
+
+        original = bqm._ENERGIES_CHUNK_ELEMENTS
+        bqm._ENERGIES_CHUNK_ELEMENTS = 100  # two samples per chunk
+        try:
+            energies = model.energies(samples)
+            from_dicts = model.energies(dict(enumerate(sample)) for sample in samples.tolist())
+        finally:
+            bqm._ENERGIES_CHUNK_ELEMENTS = original
+
+        expected = [model.energy(dict(enumerate(sample))) for sample in samples.tolist()]
+        np.testing.assert_allclose(energies, expected)
+        np.testing.assert_allclose(from_dicts, expected)
+
+    def test_change_vartype_inplace(self):
+        spin = pm.BinaryQuadraticModel({0: 1, 1: -1, 2: .5}, {(0, 1): .5, (1, 2): 1.5}, 1.4, pm.SPIN)
+        binary = spin.change_vartype(pm.BINARY)
+
+        model = spin.copy()
+        self.assertIs(model.change_vartype(pm.BINARY, inplace=True), model)
+        self.assertEqual(model, binary)
+        self.assertIs(model.vartype, pm.BINARY)
+
+        self.assertIs(model.change_vartype(pm.SPIN, inplace=True), model)
+        self.assertEqual(model, spin)
+        self.assertEqual(model.adj, spin.adj)
+
+        # same vartype
+        self.assertIs(model.change_vartype(pm.SPIN, inplace=True), model)
+        self.assertEqual(model, spin)
+
+    def test_conversions_cached(self):
+        model = pm.BinaryQuadraticModel({0: 1, 1: -1, 2: .5}, {(0, 1): .5, (1, 2): 1.5}, 1.4, pm.SPIN)
+
+        Q, offset = model.as_qubo()
+        binary_linear = model._dual().linear
+        self.assertIs(model._dual().linear, binary_linear)
+
+        # switching back and forth in place reuses the same conversions
+        dual = model.change_vartype(pm.BINARY)
+        spin_linear = model.linear
+        model.change_vartype(pm.BINARY, inplace=True)
+        self.assertIs(model.linear, binary_linear)
+        self.assertEqual(model.as_qubo(), (Q, offset))
+        model.change_vartype(pm.SPIN, inplace=True)
+        self.assertIs(model.linear, spin_linear)
+
+        # copies are independent of the cache
+        dual.linear[0] = 100
+        self.assertNotEqual(model.change_vartype(pm.BINARY), dual)
+
+        # and so are the returned conversions
+        model.as_qubo()[0][(0, 0)] = 100
+        h, J, __ = model.change_vartype(pm.BINARY).as_ising()
+        h[0] = 100
+        self.assertEqual(model.as_qubo(), (Q, offset))
+        self.assertEqual(model.change_vartype(pm.BINARY).as_ising()[0], model.linear)
+
+    def test_cache_direct_edits(self):
+        model = pm.BinaryQuadraticModel({0: 1, 1: -1}, {(0, 1): .5}, 0.0, pm.SPIN)
+        model.as_qubo()
+        model.energies([[1, 1]])
+
+        model.linear[0] = 2
+        self.assertEqual(model.as_qubo(), ({(0, 0): 3., (1, 1): -3., (0, 1): 2.}, -.5))
+        self.assertEqual(model.change_vartype(pm.BINARY).linear, {0: 3., 1: -3.})
+        model.quadratic[(0, 1)] = 1
+        self.assertEqual(model.change_vartype(pm.BINARY).quadratic, {(0, 1): 4.})
+        model.offset = 1.
+        self.assertEqual(model.as_qubo()[1], 1.)
+        np.testing.assert_allclose(model.energies([[1, 1]]), [3.])
+
+        # in place conversions are checked the same way
+        model.change_vartype(pm.BINARY, inplace=True)
+        model.linear[0] = 0
+        model.change_vartype(pm.SPIN, inplace=True)
+        self.assertEqual(model.linear, {0: 1., 1: -1.})
+
+        # so are the other dict methods and assignments
+        model.linear.update({0: 3})
+        self.assertEqual(model.as_qubo()[0][(0, 0)], 4.)
+        model.linear = {0: 1, 1: -1}
+        self.assertEqual(model.as_qubo()[0][(0, 0)], 0.)
+
+    def test_copy_independent(self):
+        model = pm.BinaryQuadraticModel({0: 1, 1: -1}, {(0, 1): .5}, 0.0, pm.SPIN)
+        new = model.copy()
+        self.assertEqual(new, model)
+        self.assertEqual(new.adj, model.adj)
+
+        new.linear[0] = 2
+        new.add_interaction(0, 1, 1)
+        self.assertEqual(model.linear, {0: 1, 1: -1})
+        self.assertEqual(model.adj, {0: {1: .5}, 1: {0: .5}})
+
+        # the copies of the cached dual model are independent too
+        binary = model.change_vartype(pm.BINARY)
+        binary.linear[0] = 5
+        self.assertEqual(model.change_vartype(pm.BINARY).linear, {0: 1., 1: -3.})
+
+    def test_invalidate(self):
+        model = pm.BinaryQuadraticModel({0: 1, 1: -1}, {(0, 1): .5}, 0.0, pm.SPIN)
+        before = model.change_vartype(pm.BINARY)
+        model.energies([[1, 1]])
+
+        model.relabel_variables({0: 'a'}, copy=False)
+        self.assertEqual(model.change_vartype(pm.BINARY), before.relabel_variables({0: 'a'}))
+        np.testing.assert_allclose(model.energies([[1, 1]], variable_order=['a', 1]), [.5])
+
+        model.invalidate()
+        self.assertEqual(model._cache, {})
+        self.assertEqual(model.change_vartype(pm.BINARY).linear['a'], 1.)
+
+    def test_add_variable(self):
+        model = pm.BinaryQuadraticModel({'a': 1}, {}, 0.0, pm.SPIN)
+        model.change_vartype(pm.BINARY)  # fill the cache
+
+        model.add_variable('a', .5)
+        model.add_variable('b', -1)
+        self.assertEqual(model.linear, {'a': 1.5, 'b': -1})
+        self.assertEqual(model.adj, {'a': {}, 'b': {}})
+        self.assertEqual(model.change_vartype(pm.BINARY).linear, {'a': 3., 'b': -2.})
+
+        model.add_variables_from(['a', 'c'], np.array([1., 2.]))
+        model.add_variables_from({'b': 1})
+        self.assertEqual(model.linear, {'a': 2.5, 'b': 0, 'c': 2.})
+
+    def test_add_interaction(self):
+        model = pm.BinaryQuadraticModel({'a': 0, 'b': 0}, {('a', 'b'): -1}, 0.0, pm.SPIN)
+
+        model.add_interaction('b', 'a', .5)
+        model.add_interaction('b', 'c', 1)
+        self.assertEqual(model.quadratic, {('a', 'b'): -.5, ('b', 'c'): 1})
+        self.assertEqual(model.linear, {'a': 0, 'b': 0, 'c': 0})
+        self.assertEqual(model.adj, {'a': {'b': -.5}, 'b': {'a': -.5, 'c': 1}, 'c': {'b': 1}})
+
+        with self.assertRaises(ValueError):
+            model.add_interaction('a', 'a', 1)
+
+        expected = pm.BinaryQuadraticModel({'a': 0, 'b': 0, 'c': 0, 'd': 0},
+                                           {('a', 'b'): 0.5, ('b', 'c'): 1, ('c', 'd'): 2}, 0.0, pm.SPIN)
+        for interactions, biases in [({('b', 'a'): 1, ('c', 'd'): 2}, None),
+                                     ([('a', 'b', 1), ('c', 'd', 2)], None),
+                                     (np.array([['a', 'b'], ['c', 'd']]), np.array([1., 2.]))]:
+            other = model.copy()
+            other.add_interactions_from(interactions, biases)
+            self.assertEqual(other, expected)
+
+    def test_remove(self):
+        model = pm.BinaryQuadraticModel({'a': 0, 'b': 1, 'c': 2}, {('a', 'b'): -1, ('c', 'b'): 1}, 0.0, pm.SPIN)
+
+        model.remove_interaction('b', 'a')
+        self.assertEqual(model, pm.BinaryQuadraticModel({'a': 0, 'b': 1, 'c': 2}, {('c', 'b'): 1}, 0.0, pm.SPIN))
+        with self.assertRaises(ValueError):
+            model.remove_interaction('a', 'b')
+
+        model.remove_variable('b')
+        self.assertEqual(model, pm.BinaryQuadraticModel({'a': 0, 'c': 2}, {}, 0.0, pm.SPIN))
+        self.assertEqual(model.adj, {'a': {}, 'c': {}})
+        with self.assertRaises(ValueError):
+            model.remove_variable('b')
+
+    def test_scale(self):
+        model = pm.BinaryQuadraticModel({'a': 1, 'b': -1}, {('a', 'b'): .5}, 2.0, pm.BINARY)
+        model.scale(2)
+        self.assertEqual(model, pm.BinaryQuadraticModel({'a': 2, 'b': -2}, {('a', 'b'): 1}, 4.0, pm.BINARY))
+        self.assertEqual(model.adj['b']['a'], 1)
+        self.assertEqual(model.as_qubo(), ({('a', 'a'): 2, ('b', 'b'): -2, ('a', 'b'): 1}, 4.0))
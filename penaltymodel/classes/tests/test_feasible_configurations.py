@@ -0,0 +1,154 @@
+import unittest
+import itertools
+
+import networkx as nx
+import numpy as np
+
+import penaltymodel as pm
+
+
+class TestFeasibleConfigurations(unittest.TestCase):
+    def test_construction_array(self):
+        array = np.array([[-1, -1, 1], [1, 1, -1], [-1, 1, 1]])
+        configurations = pm.FeasibleConfigurations(array, pm.SPIN, energies=[0, .5, 1])
+
+        self.assertEqual(len(configurations), 3)
+        self.assertEqual(configurations.num_variables, 3)
+        self.assertEqual(dict(configurations), {(-1, -1, 1): 0., (1, 1, -1): .5, (-1, 1, 1): 1.})
+
+        # one byte per row
+        self.assertEqual(configurations.bits.shape, (3, 1))
+        self.assertEqual(configurations.bits.dtype, np.uint8)
+
+    def test_construction_dict(self):
+        feasible_configurations = {(0, 1): 0, (1, 1): .5}
+        configurations = pm.FeasibleConfigurations(feasible_configurations, 'BINARY')
+
+        self.assertEqual(configurations, feasible_configurations)
+        self.assertEqual(feasible_configurations, configurations)
+        self.assertIs(configurations.vartype, pm.BINARY)
+
+    def test_repeated(self):
+        configurations = pm.FeasibleConfigurations([(1, 1), (-1, 1), (1, 1)], pm.SPIN, energies=[0, 1, 2])
+        self.assertEqual(dict(configurations), {(1, 1): 2., (-1, 1): 1.})
+
+    def test_bad_values(self):
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations([(0, 1)], pm.SPIN)
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations([(-1, 1)], pm.BINARY)
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations([(1, 1), (1, 1, 1)], pm.BINARY)
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations([(1, 1)], pm.BINARY, energies=[0, 1])
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations([(1, 1)], pm.BINARY, energies=['a'])
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations({(1, 1): '1'}, pm.BINARY)  # numeric strings are not numbers
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations([(1, 1)], pm.BINARY, energies=np.array(['1']))
+        with self.assertRaises(TypeError):
+            pm.FeasibleConfigurations([(1, 1)], 'ternary')
+
+    def test_lookup(self):
+        configurations = pm.FeasibleConfigurations([(-1, 1, 1)], pm.SPIN, energies=[.25])
+
+        self.assertEqual(configurations[(-1, 1, 1)], .25)
+        self.assertIn((-1, 1, 1), configurations)
+        self.assertNotIn((0, 1, 1), configurations)  # packs the same as (-1, 1, 1)
+        self.assertNotIn((1, 1, 1), configurations)
+        self.assertNotIn((1, 1), configurations)
+        self.assertNotIn('abc', configurations)
+
+    def test_many_variables(self):
+        array = np.array(list(itertools.product((0, 1), repeat=10)))[::7]
+        configurations = pm.FeasibleConfigurations(array, pm.BINARY, energies=np.arange(len(array)))
+
+        self.assertEqual(configurations.bits.shape, (len(array), 2))
+        self.assertEqual(dict(configurations),
+                         {tuple(config): float(en) for en, config in enumerate(array.tolist())})
+
+        self.assertEqual(sorted(map(tuple, configurations.to_array().tolist())),
+                         sorted(map(tuple, array.tolist())))
+
+    def test_read_only(self):
+        configurations = pm.FeasibleConfigurations([(1, 1)], pm.SPIN)
+        with self.assertRaises(ValueError):
+            configurations.energies[0] = 1
+
+    def test_flip(self):
+        feasible_configurations = {(-1, -1, 1): 0., (1, 1, -1): .5, (-1, 1, 1): 1.}
+        configurations = pm.FeasibleConfigurations(feasible_configurations, pm.SPIN)
+
+        self.assertEqual(configurations.flip([True, False, True]),
+                         {(1, -1, -1): 0., (-1, 1, 1): .5, (1, 1, -1): 1.})
+
+    def test_specification(self):
+        graph = nx.complete_graph(4)
+        array = np.array(list(itertools.product((-1, 1), repeat=3)))[::2]
+
+        spec0 = pm.Specification(graph, (0, 1, 2), array, pm.SPIN)
+        spec1 = pm.Specification(graph, (0, 1, 2), set(map(tuple, array.tolist())), pm.SPIN)
+
+        self.assertIsInstance(spec0.feasible_configurations, pm.FeasibleConfigurations)
+        self.assertEqual(spec0, spec1)
+        self.assertEqual(spec0.fingerprint, spec1.fingerprint)
+        self.assertEqual(spec0.flip_variables([1]).fingerprint, spec1.flip_variables([1]).fingerprint)
+
+        # the number of variables and the vartype must match
+        with self.assertRaises(ValueError):
+            pm.Specification(graph, (0, 1), array, pm.SPIN)
+        with self.assertRaises(ValueError):
+            pm.Specification(graph, (0, 1, 2), pm.FeasibleConfigurations(array, pm.SPIN), pm.BINARY)
+
+    def test_from_predicate(self):
+        def parity(configs):
+            return configs.sum(axis=1) % 2 == 0
+
+        configurations = pm.FeasibleConfigurations.from_predicate(parity, 4, pm.BINARY)
+        expected = {config: 0. for config in itertools.product((0, 1), repeat=4) if sum(config) % 2 == 0}
+        self.assertEqual(configurations, expected)
+
+        # the predicate must return one value per row
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations.from_predicate(lambda configs: [True], 4, pm.BINARY)
+
+    def test_from_iterable(self):
+        generator = (config for config in itertools.product((-1, 1), repeat=12) if config[0] == config[-1])
+
+        configurations = pm.FeasibleConfigurations.from_iterable(generator, 12, pm.SPIN)
+        self.assertEqual(len(configurations), 2 ** 11)
+        self.assertIn((1,) * 12, configurations)
+        self.assertNotIn((1,) * 11 + (-1,), configurations)
+
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations.from_iterable(iter([(1, 1), (1,)]), 2, pm.SPIN)
+        with self.assertRaises(ValueError):
+            pm.FeasibleConfigurations.from_iterable(iter([(0, 1)]), 2, pm.SPIN)
+
+    def test_chunks(self):
+        def and_gate(configs):
+            return configs[:, 2] == configs[:, 0] * configs[:, 1]
+
+        configurations = pm.FeasibleConfigurations.from_predicate(and_gate, 3, pm.BINARY)
+
+        feasible = [tuple(config) for array, __ in configurations.chunks(size=3) for config in array.tolist()]
+        self.assertEqual(set(feasible), set(configurations))
+
+        infeasible = [tuple(config) for array in configurations.infeasible_chunks(size=3)
+                      for config in array.tolist()]
+        self.assertEqual(len(infeasible), 4)
+        self.assertEqual(set(infeasible) | set(feasible), set(itertools.product((0, 1), repeat=3)))
+
+    def test_specification_streaming(self):
+        graph = nx.complete_graph(4)
+
+        spec0 = pm.Specification(graph, (0, 1, 2), lambda configs: configs[:, 0] == configs[:, 2], pm.SPIN)
+        spec1 = pm.Specification(graph, (0, 1, 2), (config for config in itertools.product((-1, 1), repeat=3)
+                                                    if config[0] == config[2]), pm.SPIN)
+        spec2 = pm.Specification(graph, (0, 1, 2), {(-1, -1, -1), (-1, 1, -1), (1, -1, 1), (1, 1, 1)}, pm.SPIN)
+
+        self.assertIsInstance(spec0.feasible_configurations, pm.FeasibleConfigurations)
+        self.assertIsInstance(spec1.feasible_configurations, pm.FeasibleConfigurations)
+        self.assertEqual(spec0, spec2)
+        self.assertEqual(spec1, spec2)
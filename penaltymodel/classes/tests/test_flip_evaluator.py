@@ -0,0 +1,52 @@
+import unittest
+import random
+import itertools
+
+import penaltymodel as pm
+
+
+class TestFlipEvaluator(unittest.TestCase):
+
+    def random_model(self, vartype):
+        rnd = random.Random(7)
+        linear = {v: rnd.uniform(-1, 1) for v in 'abcdef'}
+        quadratic = {(u, v): rnd.uniform(-1, 1) for u, v in itertools.combinations('abcdef', 2) if rnd.random() < .5}
+        return pm.BinaryQuadraticModel(linear, quadratic, .5, vartype)
+
+    def test_local_search(self):
+        rnd = random.Random(11)
+        for vartype in (pm.SPIN, pm.BINARY):
+            model = self.random_model(vartype)
+            sample = {v: rnd.choice(sorted(vartype.value)) for v in model.linear}
+
+            evaluator = model.flip_evaluator(sample)
+            self.assertAlmostEqual(evaluator.energy, model.energy(sample))
+
+            for __ in range(30):
+                # every delta matches the energies computed from scratch
+                current = model.energy(evaluator.sample)
+                for v, delta in evaluator.deltas().items():
+                    flipped = dict(evaluator.sample)
+                    flipped[v] = -flipped[v] if vartype is pm.SPIN else 1 - flipped[v]
+                    self.assertAlmostEqual(delta, model.energy(flipped) - current)
+
+                v = rnd.choice(sorted(model.linear))
+                delta = evaluator.flip(v)
+                self.assertAlmostEqual(model.energy(evaluator.sample), current + delta)
+                self.assertAlmostEqual(evaluator.energy, current + delta)
+
+            # the starting sample was copied
+            self.assertIsNot(evaluator.sample, sample)
+
+    def test_bad_sample(self):
+        model = self.random_model(pm.SPIN)
+        with self.assertRaises(ValueError):
+            pm.FlipEvaluator(model, {'a': 1})
+        with self.assertRaises(ValueError):
+            pm.FlipEvaluator(model, {v: 0 for v in model.linear})
+
+    def test_array_model(self):
+        model = self.random_model(pm.BINARY)
+        array_model = pm.ArrayBinaryQuadraticModel.from_model(model)
+        sample = {v: 1 for v in model.linear}
+        self.assertEqual(model.flip_evaluator(sample).deltas(), array_model.flip_evaluator(sample).deltas())
@@ -0,0 +1,85 @@
+import unittest
+import pickle
+
+import networkx as nx
+import numpy as np
+
+import penaltymodel as pm
+
+
+class TestCompactGraph(unittest.TestCase):
+    def test_construction(self):
+        graph = pm.CompactGraph([3], [(0, 1), (1, 2), (2, 1), (1, 1)])
+
+        self.assertEqual(graph.nodes, (3, 0, 1, 2))
+        self.assertEqual(len(graph), 4)
+        self.assertEqual(len(graph.edge_index), 3)  # the repeated edge is stored once
+        self.assertEqual(graph[1], {0, 1, 2})
+        self.assertEqual(graph[3], set())
+        self.assertTrue(graph.has_edge(2, 1))
+        self.assertFalse(graph.has_edge(0, 2))
+        self.assertFalse(graph.has_edge('a', 2))
+        self.assertIn(3, graph)
+        self.assertNotIn([], graph)  # unhashable
+
+        with self.assertRaises(ValueError):
+            graph.edge_index[0, 0] = 1
+
+    def test_equality(self):
+        graph0 = pm.CompactGraph(edges=[(0, 1), (1, 2)])
+        graph1 = pm.CompactGraph([2, 1, 0], [(2, 1), (0, 1)])
+
+        self.assertEqual(graph0, graph1)
+        self.assertNotEqual(graph0, pm.CompactGraph(edges=[(0, 1), (0, 2)]))
+        self.assertNotEqual(graph0, pm.CompactGraph(edges=[(0, 1), (1, 2), (3, 3)]))
+
+    def test_networkx(self):
+        nxgraph = nx.barbell_graph(5, 3)
+        graph = pm.CompactGraph.from_networkx(nxgraph)
+
+        self.assertEqual(set(map(frozenset, graph.edges)), set(map(frozenset, nxgraph.edges)))
+
+        view = graph.to_networkx()
+        self.assertIs(view, graph.to_networkx())  # cached
+        self.assertEqual(set(view.nodes), set(nxgraph.nodes))
+        self.assertEqual(set(map(frozenset, view.edges)), set(map(frozenset, nxgraph.edges)))
+        with self.assertRaises(nx.NetworkXError):
+            view.add_edge(0, 'a')
+
+    def test_relabel(self):
+        graph = pm.CompactGraph(edges=[(0, 1), (1, 2)])
+
+        new = graph.relabel({0: 1, 1: 0, 2: 'a'})
+        self.assertEqual(new, pm.CompactGraph(edges=[(1, 0), (0, 'a')]))
+        self.assertIs(new.edge_index, graph.edge_index)
+        self.assertEqual(graph.nodes, (0, 1, 2))  # unchanged
+
+        with self.assertRaises(ValueError):
+            graph.relabel({0: 1})
+
+    def test_pickle(self):
+        graph = pm.CompactGraph(edges=[(0, 1), (1, 2)])
+        graph.to_networkx()
+
+        new = pickle.loads(pickle.dumps(graph))
+        self.assertEqual(new, graph)
+        self.assertIsNone(new._networkx)
+        self.assertTrue(np.array_equal(new.edge_index, graph.edge_index))
+
+    def test_specification(self):
+        graph = nx.complete_graph(4)
+        spec = pm.Specification(graph, (0, 1), {(-1, -1), (1, 1)}, pm.SPIN,
+                                ising_quadratic_ranges={0: {1: [-1, 0]}})
+
+        self.assertIsInstance(spec.compact_graph, pm.CompactGraph)
+
+        # in place relabeling does not need intermediate labels
+        spec.relabel_variables({0: 1, 1: 0}, copy=False)
+        self.assertEqual(spec.decision_variables, (1, 0))
+        self.assertEqual(spec.ising_quadratic_ranges[1][0], [-1, 0])
+        self.assertEqual(spec.ising_quadratic_ranges[2][3], [-1, 1])
+        self.assertEqual(spec, pm.Specification(graph, (1, 0), {(-1, -1), (1, 1)}, pm.SPIN))
+
+        # a specification can be built directly from a compact graph
+        new = pm.Specification(spec.compact_graph, (1, 0), {(-1, -1), (1, 1)}, pm.SPIN)
+        self.assertIs(new.compact_graph, spec.compact_graph)
@@ -121,3 +121,63 @@ class TestPenaltyModel(unittest.TestCase):
             copy_widget = widget.relabel_variables(mapping, copy=True)
             inv_copy = copy_widget.relabel_variables(inv_mapping, copy=True)
             self.assertEqual(inv_copy, original_widget)
+
+
+class TestPenaltyModelFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+
+    def widget(self, bias):
+        # penalty models built from a specification share its graph, so make a new one each time
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        model = pm.BinaryQuadraticModel({v: 0 for v in range(3)}, {(0, 1): bias, (1, 2): -1}, 0.0, pm.SPIN)
+        return pm.PenaltyModel.from_specification(spec, model, 2., -2)
+
+    def test_covers_model(self):
+        self.assertEqual(self.widget(-1).fingerprint, self.widget(-1.).fingerprint)
+        self.assertNotEqual(self.widget(-1).fingerprint, self.widget(-.5).fingerprint)
+        self.assertNotEqual(self.widget(-1).fingerprint, self.spec.fingerprint)
+
+        # the specification part is shared
+        self.assertEqual(pm.Specification.fingerprint.fget(self.widget(-1)), self.spec.fingerprint)
+
+    def test_hash(self):
+        self.assertEqual(len({self.widget(-1), self.widget(-1), self.widget(-.5)}), 2)
+
+    def test_relabel_inplace(self):
+        widget = self.widget(-1)
+        fingerprint = widget.fingerprint
+
+        widget.relabel_variables({0: 'a'}, copy=False)
+        self.assertNotEqual(widget.fingerprint, fingerprint)
+        self.assertEqual(widget.fingerprint, self.widget(-1).relabel_variables({0: 'a'}).fingerprint)
+
+
+class TestPenaltyModelFlip(unittest.TestCase):
+    def test_flip_variables(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        model = pm.BinaryQuadraticModel({0: 0, 1: 0, 2: 0}, {(0, 1): -1, (1, 2): -1}, 0.0, pm.SPIN)
+        widget = pm.PenaltyModel.from_specification(spec, model, 2., -2.)
+
+        flipped = widget.flip_variables([2])
+
+        self.assertEqual(flipped.feasible_configurations, {(-1, 1): 0., (1, -1): 0.})
+        self.assertEqual(flipped.model.adj, {0: {1: -1}, 1: {0: -1, 2: 1}, 2: {1: 1}})
+        self.assertEqual(flipped.classical_gap, widget.classical_gap)
+        self.assertEqual(flipped.ground_energy, widget.ground_energy)
+
+        # the ground states of the new model are the new feasible configurations
+        for config in flipped.feasible_configurations:
+            energy = min(flipped.model.energy({0: config[0], 1: s, 2: config[1]}) for s in (-1, 1))
+            self.assertEqual(energy, flipped.ground_energy)
+
+        self.assertEqual(flipped.flip_variables([2]), widget)
+
+    def test_asymmetric_range(self):
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN,
+                                ising_quadratic_ranges={0: {1: [-1, 0]}})
+        model = pm.BinaryQuadraticModel({0: 0, 1: 0}, {(0, 1): -1}, 0.0, pm.SPIN)
+        widget = pm.PenaltyModel.from_specification(spec, model, 2., -1)
+
+        with self.assertRaises(ValueError):
+            widget.flip_variables([0])
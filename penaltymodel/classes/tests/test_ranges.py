@@ -0,0 +1,118 @@
+import unittest
+import pickle
+
+import networkx as nx
+
+import penaltymodel as pm
+
+
+class TestLinearRanges(unittest.TestCase):
+    def test_defaults(self):
+        graph = nx.path_graph(3)
+        ranges = pm.LinearRanges(graph, {1: (-1, 1)})
+
+        self.assertEqual(dict(ranges), {0: [-2, 2], 1: [-1, 1], 2: [-2, 2]})
+        self.assertEqual(ranges.overrides, {1: [-1, 1]})
+        self.assertEqual(len(ranges), 3)
+
+        # nodes added to the graph get the default
+        graph.add_node('a')
+        self.assertEqual(ranges['a'], [-2, 2])
+
+        with self.assertRaises(KeyError):
+            ranges['b']
+
+    def test_assignment(self):
+        ranges = pm.LinearRanges(nx.path_graph(3))
+
+        with self.assertRaises(TypeError):
+            ranges[0][0] = -1  # the default is shared
+
+        ranges[0] = (-1, 2)
+        self.assertEqual(ranges[0], [-1, 2])
+        self.assertEqual(ranges[1], [-2, 2])
+
+        with self.assertRaises(ValueError):
+            ranges[0] = [1, -1]
+
+        del ranges[0]
+        self.assertEqual(ranges[0], [-2, 2])
+
+    def test_only_given_checked(self):
+        with self.assertRaises(ValueError):
+            pm.LinearRanges(nx.path_graph(3), {'not a node': [2, 1]})
+
+    def test_pickle(self):
+        ranges = pm.LinearRanges(nx.path_graph(3), {1: (-1, 1)})
+        self.assertEqual(pickle.loads(pickle.dumps(ranges)), ranges)
+
+
+class TestQuadraticRanges(unittest.TestCase):
+    def test_defaults(self):
+        graph = nx.path_graph(3)
+        ranges = pm.QuadraticRanges(graph, {0: {1: [-1, 0]}})
+
+        self.assertEqual(ranges, {0: {1: [-1, 0]}, 1: {0: [-1, 0], 2: [-1, 1]}, 2: {1: [-1, 1]}})
+        self.assertEqual(ranges.overrides, {0: {1: [-1, 0]}, 1: {0: [-1, 0]}})
+
+        graph.add_edge(2, 0)
+        self.assertEqual(ranges[0][2], [-1, 1])
+
+        with self.assertRaises(KeyError):
+            ranges[0]['a']
+
+    def test_symmetric_assignment(self):
+        ranges = pm.QuadraticRanges(nx.path_graph(3))
+
+        ranges[1][2] = (0, 1)
+        self.assertEqual(ranges[2][1], [0, 1])
+        self.assertIs(ranges[1][2], ranges[2][1])
+
+        del ranges[2][1]
+        self.assertEqual(ranges[1][2], [-1, 1])
+        self.assertEqual(ranges.overrides, {})
+
+    def test_mismatched(self):
+        with self.assertRaises(ValueError):
+            pm.QuadraticRanges(nx.path_graph(2), {0: {1: [-1, 0]}, 1: {0: [0, 1]}})
+
+    def test_relabel(self):
+        graph = nx.path_graph(3)
+        ranges = pm.QuadraticRanges(graph, {0: {1: [-1, 0]}})
+
+        relabeled = ranges.relabeled({0: 'a'}, nx.relabel_nodes(graph, {0: 'a'}))
+
+        self.assertEqual(relabeled, {'a': {1: [-1, 0]}, 1: {'a': [-1, 0], 2: [-1, 1]}, 2: {1: [-1, 1]}})
+        self.assertEqual(ranges, {0: {1: [-1, 0]}, 1: {0: [-1, 0], 2: [-1, 1]}, 2: {1: [-1, 1]}})
+
+    def test_copy(self):
+        ranges = pm.QuadraticRanges(nx.path_graph(3), {0: {1: [-1, 0]}})
+        copied = ranges.copy()
+        self.assertEqual(copied, ranges)
+
+        copied[1][2] = [0, 1]
+        copied[0][1][0] = -.5
+        self.assertEqual(ranges.overrides, {0: {1: [-1, 0]}, 1: {0: [-1, 0]}})
+        self.assertEqual(copied.overrides, {0: {1: [-.5, 0]}, 1: {0: [-.5, 0], 2: [0, 1]}, 2: {1: [0, 1]}})
+
+
+class TestSpecificationRanges(unittest.TestCase):
+    def test_sparse(self):
+        spec = pm.Specification(nx.grid_2d_graph(50, 50), [(0, 0)], {(1,)}, pm.SPIN,
+                                ising_linear_ranges={(0, 0): [-1, 1]})
+
+        self.assertEqual(spec.ising_linear_ranges.overrides, {(0, 0): [-1, 1]})
+        self.assertEqual(spec.ising_quadratic_ranges.overrides, {})
+        self.assertEqual(spec.ising_linear_ranges[(1, 1)], [-2, 2])
+
+    def test_shared_with_penalty_model(self):
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN)
+        model = pm.BinaryQuadraticModel({0: 0, 1: 0}, {(0, 1): -1}, 0.0, pm.SPIN)
+        widget = pm.PenaltyModel.from_specification(spec, model, 2, -1)
+
+        self.assertEqual(widget.ising_linear_ranges, spec.ising_linear_ranges)
+        self.assertEqual(widget.ising_quadratic_ranges, spec.ising_quadratic_ranges)
+
+        # but not shared with it
+        widget.ising_linear_ranges[0] = [-1, 1]
+        self.assertEqual(spec.ising_linear_ranges[0], [-2, 2])
@@ -2,6 +2,7 @@ import unittest
 import itertools
 
 import networkx as nx
+import numpy as np
 
 import penaltymodel as pm
 
@@ -18,7 +19,9 @@ class TestSpecification(unittest.TestCase):
 
         spec = pm.Specification(graph, decision_variables, feasible_configurations, vartype=pm.SPIN)
 
-        self.assertEqual(spec.graph, graph)  # literally the same object
+        # the graph is stored compactly, the networkx view has the same nodes and edges
+        self.assertEqual(set(spec.graph.nodes), set(graph.nodes))
+        self.assertEqual(set(map(frozenset, spec.graph.edges)), set(map(frozenset, graph.edges)))
         self.assertEqual(spec.decision_variables, decision_variables)
         self.assertEqual(spec.feasible_configurations, feasible_configurations)
         self.assertIs(spec.vartype, pm.SPIN)
@@ -275,3 +278,419 @@ class TestSpecification(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             spec.relabel_variables(mapping, copy=False)
+
+
+class TestSpecificationFingerprint(unittest.TestCase):
+    def test_known_value(self):
+        # the fingerprint must not change between versions or processes
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        self.assertEqual(spec.fingerprint, 'b01b95a4767e64155a65e1ebec3675b3a59a8fe823164969b3bd2d75b03b4099')
+
+    def test_other_process(self):
+        import subprocess
+        import sys
+        import os
+
+        code = ("import penaltymodel as pm;"
+                "print(pm.Specification([('a', 'b'), ('b', 'c')], ('a', 'c'), {(0, 1): .5}, pm.BINARY).fingerprint)")
+
+        env = dict(os.environ, PYTHONHASHSEED='123')
+        output = subprocess.check_output([sys.executable, '-c', code], env=env)
+
+        spec = pm.Specification([('a', 'b'), ('b', 'c')], ('a', 'c'), {(0, 1): .5}, pm.BINARY)
+        self.assertEqual(output.decode('ascii').strip(), spec.fingerprint)
+
+    def test_construction_order(self):
+        spec0 = pm.Specification([(0, 1), (1, 2)], (0, 2), {(-1, -1): 0, (1, 1): 0}, pm.SPIN)
+        spec1 = pm.Specification([(2, 1), (1, 0)], [0, 2], {(1, 1): 0., (-1, -1): 0.}, 'SPIN',
+                                 ising_linear_ranges={1: (-2, 2)})
+        self.assertEqual(spec0.fingerprint, spec1.fingerprint)
+
+    def test_sensitivity(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+
+        others = [pm.Specification(nx.path_graph(3), (2, 0), {(-1, -1), (1, 1)}, pm.SPIN),
+                  pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1): 0, (1, 1): 1}, pm.SPIN),
+                  pm.Specification(nx.path_graph(3), (0, 2), {(-1, 1), (1, -1)}, pm.SPIN),
+                  pm.Specification(nx.complete_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN),
+                  pm.Specification(nx.path_graph(3), (0, 2), {(0, 0), (1, 1)}, pm.BINARY),
+                  pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN,
+                                   ising_linear_ranges={1: [-1, 1]}),
+                  pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN,
+                                   ising_quadratic_ranges={1: {2: [-1, 0]}}),
+                  pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN).relabel_variables({1: '1'})]
+
+        fingerprints = set(other.fingerprint for other in others)
+        self.assertEqual(len(fingerprints), len(others))
+        self.assertNotIn(spec.fingerprint, fingerprints)
+
+    def test_hash(self):
+        spec0 = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        spec1 = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1): 0., (1, 1): 0.}, pm.SPIN)
+        spec2 = pm.Specification(nx.path_graph(4), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+
+        self.assertEqual(len({spec0, spec1, spec2}), 2)
+
+        # equality ignores the ranges so the hash must too
+        spec3 = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN,
+                                 ising_linear_ranges={1: [-1, 1]})
+        self.assertEqual(spec0, spec3)
+        self.assertEqual(hash(spec0), hash(spec3))
+
+    def test_relabel_inplace(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        fingerprint = spec.fingerprint
+
+        spec.relabel_variables({0: 'a'}, copy=False)
+        self.assertNotEqual(spec.fingerprint, fingerprint)
+
+        spec.relabel_variables({'a': 0}, copy=False)
+        self.assertEqual(spec.fingerprint, fingerprint)
+
+
+class TestSpecificationCanonical(unittest.TestCase):
+    def assertSameCanonical(self, spec0, spec1):
+        canonical0, __ = spec0.canonical()
+        canonical1, __ = spec1.canonical()
+        self.assertEqual(canonical0.fingerprint, canonical1.fingerprint)
+
+    def test_relabeled(self):
+        spec = pm.Specification(nx.barbell_graph(4, 3), (0, 5, 10), {(-1, -1, 1): 0, (1, 1, -1): .5}, pm.SPIN)
+
+        # reverse the order of the nodes, and use different types of labels
+        nodes = list(spec.graph)
+        mapping = {v: 'abcdefghijklmnop'[len(nodes) - 1 - idx] for idx, v in enumerate(nodes)}
+
+        self.assertSameCanonical(spec, spec.relabel_variables(mapping))
+
+    def test_mapping(self):
+        spec = pm.Specification([('a', 'b'), ('b', 'c'), ('c', 'd')], ('a', 'd'), {(-1, -1), (1, 1)}, pm.SPIN,
+                                ising_linear_ranges={'b': [-1, 1]})
+
+        canonical, mapping = spec.canonical()
+
+        self.assertEqual(set(canonical.graph), set(range(4)))
+        self.assertEqual(canonical.relabel_variables(mapping).fingerprint, spec.fingerprint)
+
+    def test_symmetric(self):
+        # highly symmetric graphs with no decision variables to break the ties
+        for graph in [nx.complete_bipartite_graph(4, 4), nx.hypercube_graph(4), nx.petersen_graph(),
+                      nx.complete_graph(12), nx.empty_graph(12), nx.cycle_graph(20)]:
+            graph = nx.convert_node_labels_to_integers(graph)
+            spec = pm.Specification(graph, [], {(): 0}, pm.SPIN)
+
+            nodes = list(graph)
+            mapping = dict(zip(nodes, reversed(nodes)))
+            mapping.update((v, str(mapping[v])) for v in nodes[::3])
+
+            self.assertSameCanonical(spec, spec.relabel_variables(mapping))
+
+    def test_decision_variable_order(self):
+        spec0 = pm.Specification(nx.path_graph(3), (0, 1), {(-1, 1)}, pm.SPIN)
+        spec1 = pm.Specification(nx.path_graph(3), (1, 0), {(-1, 1)}, pm.SPIN)
+
+        self.assertNotEqual(spec0.canonical()[0].fingerprint, spec1.canonical()[0].fingerprint)
+
+        # but the ends of the path are interchangeable
+        spec2 = pm.Specification(nx.path_graph(3), (2, 1), {(-1, 1)}, pm.SPIN)
+        self.assertSameCanonical(spec0, spec2)
+
+    def test_ranges(self):
+        # the two auxiliary variables of the star are only distinguished by their ranges
+        graph = nx.star_graph(3)
+        spec0 = pm.Specification(graph, (1,), {(-1,)}, pm.SPIN, ising_linear_ranges={2: [-1, 1]})
+        spec1 = pm.Specification(graph, (1,), {(-1,)}, pm.SPIN, ising_linear_ranges={3: [-1, 1]})
+        spec2 = pm.Specification(graph, (1,), {(-1,)}, pm.SPIN, ising_quadratic_ranges={0: {3: [-1, 0]}})
+        spec3 = pm.Specification(graph, (1,), {(-1,)}, pm.SPIN, ising_quadratic_ranges={0: {1: [-1, 0]}})
+
+        self.assertSameCanonical(spec0, spec1)
+        self.assertNotEqual(spec0.canonical()[0].fingerprint, spec2.canonical()[0].fingerprint)
+        self.assertNotEqual(spec2.canonical()[0].fingerprint, spec3.canonical()[0].fingerprint)
+
+    def test_relabel_inplace(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        spec.canonical()
+
+        spec.relabel_variables({0: 'a'}, copy=False)
+        self.assertIn('a', spec.canonical()[1].values())
+
+
+class TestSpecificationGauge(unittest.TestCase):
+    def test_flip_variables(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1): 0, (1, 1): 1}, pm.SPIN)
+        self.assertEqual(spec.flip_variables([0]).feasible_configurations, {(1, -1): 0, (-1, 1): 1})
+        self.assertEqual(spec.flip_variables([1]).feasible_configurations, spec.feasible_configurations)
+
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(0, 0): 0, (1, 1): 1}, pm.BINARY)
+        self.assertEqual(spec.flip_variables([2]).feasible_configurations, {(0, 1): 0, (1, 0): 1})
+
+        with self.assertRaises(ValueError):
+            spec.flip_variables(['a'])
+
+    def test_flip_variables_ranges(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN,
+                                ising_linear_ranges={1: [-1, 1]}, ising_quadratic_ranges={0: {1: [-1, 0]}})
+        flipped = spec.flip_variables([0])
+        self.assertEqual(flipped.ising_linear_ranges, spec.ising_linear_ranges)
+        self.assertEqual(flipped.ising_quadratic_ranges, spec.ising_quadratic_ranges)
+
+        flipped.relabel_variables({0: 'a', 1: 'b', 2: 'c'}, copy=False)
+        flipped.ising_linear_ranges['c'] = [0, 0]
+
+        # the original is unchanged
+        self.assertEqual(spec.ising_linear_ranges.overrides, {1: [-1, 1]})
+        self.assertEqual(spec.ising_quadratic_ranges[0][1], [-1, 0])
+        self.assertEqual(spec.ising_linear_ranges[2], [-2, 2])
+
+    def test_equivalence_class(self):
+        graph = nx.complete_graph(4)
+        feasible_configurations = {(-1, -1, 1): 0, (1, -1, -1): 0, (1, 1, 1): .5}
+        spec = pm.Specification(graph, (0, 1, 2), feasible_configurations, pm.SPIN)
+
+        representative, __ = spec.gauge_canonical()
+        for r in range(4):
+            for flipped in itertools.combinations((0, 1, 2), r):
+                other = spec.flip_variables(flipped)
+                other_representative, other_flipped = other.gauge_canonical()
+
+                self.assertEqual(other_representative.fingerprint, representative.fingerprint)
+                self.assertEqual(other_representative.flip_variables(other_flipped).fingerprint,
+                                 other.fingerprint)
+
+    def test_asymmetric_ranges(self):
+        # the range on 1's interaction means it cannot be flipped
+        spec0 = pm.Specification(nx.path_graph(3), (0, 1), {(1, 1)}, pm.SPIN,
+                                 ising_quadratic_ranges={1: {2: [-1, 0]}})
+        spec1 = pm.Specification(nx.path_graph(3), (0, 1), {(-1, -1)}, pm.SPIN,
+                                 ising_quadratic_ranges={1: {2: [-1, 0]}})
+
+        representative0, flipped = spec0.gauge_canonical()
+        self.assertEqual(flipped, (0,))
+        self.assertEqual(representative0.feasible_configurations, {(-1, 1): 0.})
+        self.assertNotEqual(representative0, spec1.gauge_canonical()[0])
+
+    def test_binary(self):
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(1, 1)}, pm.BINARY)
+        self.assertEqual(spec.gauge_canonical(), (spec, ()))
+
+
+class TestSpecificationDecompose(unittest.TestCase):
+    def test_product(self):
+        graph = nx.Graph([(0, 1), (2, 3), (4, 5)])
+        graph.add_node('aux')
+        feasible_configurations = {config: float(config[0] > 0) + 2. * (config[1] != config[2])
+                                   for config in itertools.product((-1, 1), repeat=3)}
+        spec = pm.Specification(graph, (4, 0, 2), feasible_configurations, pm.SPIN,
+                                ising_linear_ranges={4: [-1, 1]},
+                                ising_quadratic_ranges={0: {1: [-1, 0]}})
+
+        parts = spec.decompose()
+
+        self.assertEqual(len(parts), 2)
+        first, second = parts
+
+        # the auxiliary component is put in the first part
+        self.assertEqual(set(first.graph), {0, 1, 2, 3, 'aux'})
+        self.assertEqual(first.decision_variables, (0, 2))
+        self.assertEqual(first.feasible_configurations, {(-1, -1): 0., (-1, 1): 2., (1, -1): 2., (1, 1): 0.})
+        self.assertEqual(first.ising_quadratic_ranges[0][1], [-1, 0])
+
+        self.assertEqual(set(second.graph), {4, 5})
+        self.assertEqual(second.decision_variables, (4,))
+        self.assertEqual(second.feasible_configurations, {(-1,): 0., (1,): 1.})
+        self.assertEqual(second.ising_linear_ranges[4], [-1, 1])
+
+    def test_not_factored(self):
+        graph = nx.Graph([(0, 1), (2, 3)])
+
+        # the configurations are not a product
+        spec = pm.Specification(graph, (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        self.assertEqual(spec.decompose(), [spec])
+
+        # the configurations are a product but the energies do not add
+        spec = pm.Specification(graph, (0, 2), {(-1, -1): 0, (-1, 1): 0, (1, -1): 0, (1, 1): 1}, pm.SPIN)
+        self.assertEqual(spec.decompose(), [spec])
+
+        # connected
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (-1, 1), (1, -1), (1, 1)}, pm.SPIN)
+        self.assertEqual(spec.decompose(), [spec])
+
+    def test_packed(self):
+        graph = nx.Graph([(0, 1), (2, 3), (4, 5)])
+        spec = pm.Specification(graph, (0, 2, 4), lambda configs: configs[:, 0] == configs[:, 1], pm.BINARY)
+
+        parts = spec.decompose()
+
+        self.assertEqual([part.decision_variables for part in parts], [(0, 2), (4,)])
+        self.assertIsInstance(parts[0].feasible_configurations, pm.FeasibleConfigurations)
+        self.assertEqual(parts[0].feasible_configurations, {(0, 0): 0., (1, 1): 0.})
+
+
+class TestSpecificationViews(unittest.TestCase):
+    def test_views(self):
+        spec = pm.Specification(nx.path_graph(4), (3, 0), {(1, 1): 0, (-1, -1): .5}, pm.SPIN,
+                                ising_linear_ranges={2: [-1, 0]},
+                                ising_quadratic_ranges={2: {1: [0, 1]}})
+
+        self.assertEqual(spec.variable_index, {0: 0, 1: 1, 2: 2, 3: 3})
+        self.assertEqual(spec.edge_index.tolist(), [[0, 1], [1, 2], [2, 3]])
+        self.assertEqual(spec.decision_index.tolist(), [3, 0])
+
+        rows = dict(zip(map(tuple, spec.configuration_matrix.tolist()), spec.energy_vector.tolist()))
+        self.assertEqual(rows, spec.feasible_configurations)
+
+        self.assertEqual(spec.linear_min.tolist(), [-2, -2, -1, -2])
+        self.assertEqual(spec.linear_max.tolist(), [2, 2, 0, 2])
+        self.assertEqual(spec.quadratic_min.tolist(), [-1, 0, -1])
+        self.assertEqual(spec.quadratic_max.tolist(), [1, 1, 1])
+
+    def test_no_decision_variables(self):
+        spec = pm.Specification(nx.path_graph(2), (), {()}, pm.SPIN)
+
+        self.assertEqual(spec.configuration_matrix.shape, (1, 0))
+        self.assertEqual(spec.configuration_matrix.dtype, np.int8)
+        self.assertEqual(spec.energy_vector.tolist(), [0.])
+
+    def test_cached(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), {(1, 1), (-1, -1)}, pm.SPIN)
+
+        self.assertIs(spec.decision_index, spec.decision_index)
+        self.assertIs(spec.configuration_matrix, spec.configuration_matrix)
+
+        with self.assertRaises(ValueError):
+            spec.configuration_matrix[0, 0] = 0
+        with self.assertRaises(ValueError):
+            spec.linear_min[0] = 0
+
+        # relabeling in place moves the variables so the views are rebuilt
+        spec.relabel_variables({0: 'a', 1: 'b', 2: 'c'}, copy=False)
+        self.assertEqual(spec.variable_index, {'a': 0, 'b': 1, 'c': 2})
+        self.assertEqual(spec.decision_index.tolist(), [0, 2])
+
+        # other changes need clear_fingerprint
+        spec.ising_linear_ranges['b'] = [-1, 1]
+        spec.clear_fingerprint()
+        self.assertEqual(spec.linear_min.tolist(), [-2, -1, -2])
+
+    def test_packed(self):
+        spec = pm.Specification(nx.path_graph(3), (0, 2), lambda configs: configs[:, 0] != configs[:, 1], pm.BINARY)
+
+        self.assertEqual(sorted(map(tuple, spec.configuration_matrix.tolist())), [(0, 1), (1, 0)])
+        self.assertEqual(spec.energy_vector.tolist(), [0, 0])
+
+
+class TestSpecificationEdit(unittest.TestCase):
+    def assertConsistent(self, spec, expected):
+        # the edited specification matches one built from scratch, including the cached values
+        self.assertEqual(spec, expected)
+        self.assertEqual(spec.fingerprint, expected.fingerprint)
+        self.assertEqual(sorted(zip(map(tuple, spec.configuration_matrix.tolist()), spec.energy_vector.tolist())),
+                         sorted(zip(map(tuple, expected.configuration_matrix.tolist()),
+                                    expected.energy_vector.tolist())))
+        self.assertEqual(spec.linear_min.tolist(), expected.linear_min.tolist())
+        self.assertEqual(spec.linear_max.tolist(), expected.linear_max.tolist())
+        self.assertEqual(spec.quadratic_min.tolist(), expected.quadratic_min.tolist())
+        self.assertEqual(spec.quadratic_max.tolist(), expected.quadratic_max.tolist())
+
+    def prime(self, spec):
+        # compute the cached values so that the edits update them
+        spec.fingerprint
+        spec.configuration_matrix
+        spec.linear_min
+        spec.quadratic_min
+
+    def test_feasible_configurations(self):
+        graph = nx.path_graph(4)
+        spec = pm.Specification(graph, (0, 3), {(-1, -1): 0, (1, 1): 0}, pm.SPIN)
+        self.prime(spec)
+        fingerprint = spec.fingerprint
+
+        added = spec.add_feasible_configurations({(-1, 1): .5})
+        self.assertConsistent(added, pm.Specification(graph, (0, 3), {(-1, -1): 0, (1, 1): 0, (-1, 1): .5}, pm.SPIN))
+        self.assertIs(added.compact_graph, spec.compact_graph)
+        self.assertIs(added.ising_linear_ranges.graph, spec.ising_linear_ranges.graph)
+        self.assertIsNot(added.ising_linear_ranges, spec.ising_linear_ranges)
+
+        replaced = spec.add_feasible_configurations({(1, 1): 1})
+        self.assertConsistent(replaced, pm.Specification(graph, (0, 3), {(-1, -1): 0, (1, 1): 1}, pm.SPIN))
+
+        removed = added.remove_feasible_configurations([(1, 1)])
+        self.assertConsistent(removed, pm.Specification(graph, (0, 3), {(-1, -1): 0, (-1, 1): .5}, pm.SPIN))
+
+        # the original is unchanged
+        self.assertEqual(spec.feasible_configurations, {(-1, -1): 0, (1, 1): 0})
+        self.assertEqual(spec.fingerprint, fingerprint)
+
+        with self.assertRaises(ValueError):
+            spec.add_feasible_configurations([(0, 1)])
+        with self.assertRaises(ValueError):
+            spec.add_feasible_configurations([(1, 1, 1)])
+        with self.assertRaises(ValueError):
+            spec.remove_feasible_configurations([(-1, 1)])
+
+    def test_packed_feasible_configurations(self):
+        graph = nx.path_graph(4)
+        spec = pm.Specification(graph, (0, 1, 3), lambda configs: configs.sum(axis=1) == 1, pm.BINARY)
+        self.prime(spec)
+
+        added = spec.add_feasible_configurations([(1, 1, 1)])
+        self.assertIsInstance(added.feasible_configurations, pm.FeasibleConfigurations)
+        self.assertConsistent(added, pm.Specification(graph, (0, 1, 3), {(1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 1)},
+                                                      pm.BINARY))
+
+        removed = added.remove_feasible_configurations([(0, 1, 0)])
+        self.assertConsistent(removed, pm.Specification(graph, (0, 1, 3), {(1, 0, 0), (0, 0, 1), (1, 1, 1)},
+                                                        pm.BINARY))
+
+        with self.assertRaises(ValueError):
+            spec.remove_feasible_configurations([(1, 1, 1)])
+
+    def test_ranges(self):
+        graph = nx.path_graph(4)
+        spec = pm.Specification(graph, (0, 3), {(-1, -1), (1, 1)}, pm.SPIN,
+                                ising_quadratic_ranges={0: {1: [-1, 0]}})
+        self.prime(spec)
+
+        linear = spec.set_linear_range(2, (-1, 1))
+        self.assertConsistent(linear, pm.Specification(graph, (0, 3), {(-1, -1), (1, 1)}, pm.SPIN,
+                                                       ising_linear_ranges={2: [-1, 1]},
+                                                       ising_quadratic_ranges={0: {1: [-1, 0]}}))
+        self.assertIs(linear.feasible_configurations, spec.feasible_configurations)
+
+        quadratic = linear.set_quadratic_range(2, 1, [0, 1])
+        self.assertConsistent(quadratic, pm.Specification(graph, (0, 3), {(-1, -1), (1, 1)}, pm.SPIN,
+                                                          ising_linear_ranges={2: [-1, 1]},
+                                                          ising_quadratic_ranges={0: {1: [-1, 0]}, 1: {2: [0, 1]}}))
+        self.assertEqual(quadratic.ising_quadratic_ranges[1][2], [0, 1])
+
+        # the originals are unchanged
+        self.assertEqual(spec.ising_linear_ranges[2], [-2, 2])
+        self.assertEqual(linear.ising_quadratic_ranges[1][2], [-1, 1])
+
+        with self.assertRaises(ValueError):
+            spec.set_linear_range('a', [-1, 1])
+        with self.assertRaises(ValueError):
+            spec.set_linear_range(0, [1, -1])
+        with self.assertRaises(ValueError):
+            spec.set_quadratic_range(0, 2, [-1, 1])
+
+    def test_relabel_inplace(self):
+        graph = nx.path_graph(3)
+        spec = pm.Specification(graph, (0, 2), {(-1, -1), (1, 1)}, pm.SPIN,
+                                ising_linear_ranges={1: [-1, 1]})
+        child = spec.set_quadratic_range(0, 1, [0, 1])
+
+        child.relabel_variables({0: 'a', 1: 'b', 2: 'c'}, copy=False)
+        self.assertEqual(child.ising_linear_ranges.overrides, {'b': [-1, 1]})
+        self.assertEqual(child.ising_quadratic_ranges['a']['b'], [0, 1])
+
+        # the parent is unchanged
+        self.assertEqual(spec, pm.Specification(graph, (0, 2), {(-1, -1), (1, 1)}, pm.SPIN))
+        self.assertEqual(spec.ising_linear_ranges.overrides, {1: [-1, 1]})
+        self.assertEqual(spec.ising_linear_ranges[1], [-1, 1])
+        self.assertEqual(spec.ising_linear_ranges[0], [-2, 2])
+        self.assertEqual(spec.ising_quadratic_ranges[0][1], [-1, 1])
+
+        # nor is it changed by editing the child's ranges
+        child.ising_linear_ranges['a'] = [0, 0]
+        self.assertEqual(spec.ising_linear_ranges[0], [-2, 2])
@@ -61,3 +61,20 @@ class Vartype(enum.Enum):
 SPIN = Vartype.SPIN
 BINARY = Vartype.BINARY
 UNDEFINED = Vartype.UNDEFINED
+
+
+def _check_vartype(vartype):
+    """Convert `vartype` to :class:`.Vartype.SPIN` or :class:`.Vartype.BINARY`, raising a TypeError
+    for anything else."""
+    try:
+        if isinstance(vartype, str):
+            vartype = Vartype[vartype]
+        else:
+            vartype = Vartype(vartype)
+        if not (vartype is Vartype.SPIN or vartype is Vartype.BINARY):
+            raise ValueError
+    except (ValueError, KeyError):
+        raise TypeError(("expected input vartype to be one of: "
+                         "Vartype.SPIN, 'SPIN', {-1, 1}, "
+                         "Vartype.BINARY, 'BINARY', or {0, 1}."))
+    return vartype
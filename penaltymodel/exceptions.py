@@ -14,3 +14,7 @@ class ImpossiblePenaltyModel(FactoryException):
 
 class MissingPenaltyModel(FactoryException):
     """PenaltyModel is missing from the cache or otherwise unavailable."""
+
+
+class FactoryTimeout(FactoryException):
+    """Factory did not produce a PenaltyModel within its time budget."""
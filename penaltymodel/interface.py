@@ -14,16 +14,42 @@ Examples:
     >>> spec = pm.Specification(graph, decision_variables, feasible_configurations, pm.SPIN)
     >>> widget = pm.get_penalty_model(spec)
 
+Factories and caches are discovered once, the first time they are needed. Factories
+and caches can also be added and removed without using an entrypoint.
+
+Examples:
+    >>> @pm.penaltymodel_factory(105)
+    ... def factory_function(spec):
+    ...     pass
+    >>> pm.register_factory(factory_function)
+    >>> pm.unregister_factory(factory_function)
+
 Functions and Utilities
 -----------------------
 """
 
-from pkg_resources import iter_entry_points
+import atexit
+import logging
+import threading
+import time
 
-from penaltymodel.exceptions import FactoryException, ImpossiblePenaltyModel
+from concurrent.futures import wait, as_completed, FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError
+from six import iteritems, itervalues
 
-__all__ = ['FACTORY_ENTRYPOINT', 'CACHE_ENTRYPOINT', 'get_penalty_model', 'penaltymodel_factory',
-           'iter_factories', 'iter_caches']
+from penaltymodel.cache import PenaltyModelCache, _cache_writer, _specification_key
+from penaltymodel.classes.penaltymodel import PenaltyModel
+from penaltymodel.exceptions import FactoryException, ImpossiblePenaltyModel, FactoryTimeout, MissingPenaltyModel
+from penaltymodel.memo import MemoCache, NegativeCache
+from penaltymodel.registry import Registry
+from penaltymodel.write_behind import WriteBehindQueue
+
+__all__ = ['FACTORY_ENTRYPOINT', 'CACHE_ENTRYPOINT', 'get_penalty_model', 'get_penalty_models',
+           'penaltymodel_factory',
+           'iter_factories', 'iter_caches',
+           'register_factory', 'unregister_factory', 'register_cache', 'unregister_cache',
+           'refresh_registry',
+           'enable_write_behind', 'disable_write_behind', 'flush_caches',
+           'enable_memo', 'disable_memo', 'enable_negative_cache', 'disable_negative_cache']
 
 FACTORY_ENTRYPOINT = 'penaltymodel_factory'
 """str: constant used when assigning entrypoints for factories."""
@@ -31,54 +57,725 @@ FACTORY_ENTRYPOINT = 'penaltymodel_factory'
 CACHE_ENTRYPOINT = 'penaltymodel_cache'
 """str: constant used when assigning entrypoints for caches."""
 
+_logger = logging.getLogger(__name__)
+
+_registry = Registry(FACTORY_ENTRYPOINT, CACHE_ENTRYPOINT)
+
+_write_behind = None  # the WriteBehindQueue if write-behind is enabled
+_EXIT_FLUSH_TIMEOUT = 30  # seconds that the queued writes are waited for at exit
+
+_memo = None  # the MemoCache if memoization is enabled
+
+_negative = None  # the NegativeCache if negative caching is enabled
+_negative_use_caches = False  # whether impossible outcomes are also sent to the caches
+
+# maps specification keys to a Future for each lookup in progress
+_in_flight = {}
+_in_flight_lock = threading.Lock()
 
-def get_penalty_model(specification):
-    """Retrieve a PenaltyModel from one of the available factories.
+
+def get_penalty_model(specification, executor=None, timeout=None, timed_out=None, canonical=False, gauge=False,
+                      decompose=False):
+    """Retrieve a PenaltyModel from one of the available caches or factories.
+
+    The memo (see :func:`.enable_memo`), the negative cache (see
+    :func:`.enable_negative_cache`) and the read-through caches (see
+    :class:`.PenaltyModelCache`) are checked first. If none of them hold a
+    matching PenaltyModel, the factories are queried in order of decreasing
+    priority and the result is written to all of the caches.
+
+    If several threads look up equal specifications at the same time, only the
+    first does the lookup. The others wait for it and get the same PenaltyModel
+    (or exception).
 
     Args:
         specification (:class:`.Specification`): The specification
             for the desired PenaltyModel.
 
+        executor (:class:`concurrent.futures.Executor`, optional):
+            If provided, all of the factories are submitted to `executor` at
+            once rather than being called one after another. The result of
+            the highest priority factory that succeeds is returned as soon as
+            every higher priority factory has failed. Factories that have
+            not started by then are cancelled, factories that are already
+            running are left to finish in the background.
+            If a :class:`concurrent.futures.ProcessPoolExecutor` is used, the
+            factories and the specification must be picklable.
+
+        timeout (number, optional):
+            The maximum time, in seconds, to spend searching the factories.
+            A factory still running at the deadline is treated as if it had
+            raised :exc:`FactoryTimeout` and any remaining factories are
+            skipped. Factories can also declare their own time budget, see
+            :func:`.penaltymodel_factory`.
+
+        timed_out (list, optional):
+            If provided, each factory that exceeded its time budget is
+            appended to `timed_out`. If the lookup waits on another thread's
+            lookup of an equal specification and `timeout` expires, the
+            factories that the other lookup is still running are appended.
+
+        canonical (bool, optional, default=False):
+            If True, the canonical form of the specification (see
+            :meth:`.Specification.canonical`) is looked up instead and the
+            result is relabeled to match the specification. Specifications
+            that differ only in their variable labels then share the same
+            cached PenaltyModel.
+
+        gauge (bool, optional, default=False):
+            If True, the gauge-canonical representative of the specification
+            (see :meth:`.Specification.gauge_canonical`) is looked up instead
+            and the result is flipped to match the specification.
+            Specifications that differ only by flipped decision variables then
+            share the same cached PenaltyModel. Can be combined with
+            `canonical`.
+
+        decompose (bool, optional, default=False):
+            If True and the specification splits into independent parts (see
+            :meth:`.Specification.decompose`), each part is looked up
+            separately, in parallel, and the results are joined with
+            :meth:`.PenaltyModel.from_parts`. `canonical` and `gauge` are
+            applied to each part. If no PenaltyModel is found for one of the
+            parts, None is returned.
+
     Returns:
-        :class:`.PenaltyModel`/None: A PenaltyModel as returned by
-        the highest priority factory, or None if no factory could
+        :class:`.PenaltyModel`/None: A PenaltyModel as returned by a cache
+        or the highest priority factory, or None if no factory could
         produce it.
 
     Raises:
         :exc:`ImpossiblePenaltyModel`: If the specification
             describes a penalty model that cannot be built by any
-            factory.
+            factory. When racing the factories with `executor`, the first
+            factory to raise :exc:`ImpossiblePenaltyModel` stops the search.
+
+    Notes:
+        A factory cannot be interrupted once it has started. When a time
+        budget applies, each factory is called in its own daemon thread (or
+        in `executor`) and a factory that times out is abandoned: it keeps
+        running in the background until it returns and its result is
+        discarded. Abandoned factories do not keep the interpreter from
+        exiting, unless they were submitted to `executor`.
+
+        A caller that waits on another thread's lookup of an equal
+        specification shares that lookup's `executor` and time budgets. Its
+        own `timeout` only limits how long it waits, and it is given a copy
+        of the PenaltyModel found.
+
+    Examples:
+        >>> from concurrent.futures import ThreadPoolExecutor
+        >>> with ThreadPoolExecutor(max_workers=4) as executor:  # doctest: +SKIP
+        ...     widget = pm.get_penalty_model(spec, executor=executor)
+
+        >>> timed_out = []
+        >>> widget = pm.get_penalty_model(spec, timeout=.5, timed_out=timed_out)  # doctest: +SKIP
 
     """
+    if decompose:
+        parts = specification.decompose()
+        if len(parts) > 1:
+            return _get_decomposed(specification, parts, executor, timeout, timed_out, canonical, gauge)
+
+    if canonical or gauge:
+        form, mapping, flipped = _reduce(specification, canonical, gauge)
+        pm = get_penalty_model(form, executor, timeout, timed_out)
+        return _restore(pm, mapping, flipped)
+
+    # concurrent lookups of equal specifications share the work of the first one
+    key = _specification_key(specification)
+    with _in_flight_lock:
+        flight = _in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _in_flight[key] = Future()
+            flight.running = []  # the factories the lookup is waiting on, in priority order
+
+    if not leader:
+        try:
+            pm, flight_timed_out = flight.result(timeout)
+        except TimeoutError:
+            # the factories that the lookup is still waiting on are the ones that ran out of time
+            if timed_out is not None:
+                timed_out.extend(list(flight.running))
+            return None
+        if timed_out is not None:
+            timed_out.extend(flight_timed_out)
+        # the leader's penalty model is shared by all of its followers, each gets its own copy
+        return None if pm is None else pm.copy()
+
+    flight_timed_out = []
+    try:
+        pm = _get_penalty_model(specification, executor, timeout, flight_timed_out, flight.running)
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    else:
+        flight.set_result((pm, flight_timed_out))
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+    if timed_out is not None:
+        timed_out.extend(flight_timed_out)
+    return pm
+
+
+def _get_decomposed(specification, parts, executor, timeout, timed_out, canonical, gauge):
+    """Look up the parts of a decomposed specification in parallel and join the results."""
+    parts_timed_out = [[] for __ in parts]
+
+    # each lookup may itself race its factories on executor, so the lookups get their own threads
+    pool = ThreadPoolExecutor(max_workers=len(parts))
+    try:
+        futures = [pool.submit(get_penalty_model, part, executor, timeout, part_timed_out, canonical, gauge)
+                   for part, part_timed_out in zip(parts, parts_timed_out)]
+        penalty_models = [future.result() for future in futures]
+    finally:
+        pool.shutdown(wait=False)
+
+        if timed_out is not None:
+            for part_timed_out in parts_timed_out:
+                timed_out.extend(part_timed_out)
+
+    return _join(specification, penalty_models)
+
+
+def _join(specification, penalty_models):
+    """Join the PenaltyModels of the parts of a specification, None if any part has none."""
+    if any(pm is None for pm in penalty_models):
+        return None
+    return PenaltyModel.from_parts(specification, penalty_models)
+
+
+def _reduce(specification, canonical, gauge):
+    """The specification to look up in place of the given one, along with the mapping (or None)
+    and the flipped variables needed to restore the result, see _restore."""
+    flipped = ()
+    if gauge:
+        specification, flipped = specification.gauge_canonical()
+
+    mapping = None
+    if canonical:
+        specification, mapping = specification.canonical()
+
+    return specification, mapping, flipped
+
+
+def _restore(result, mapping, flipped):
+    """Undo _reduce on a PenaltyModel, other results are returned as-is."""
+    if isinstance(result, PenaltyModel):
+        if mapping is not None:
+            result = result.relabel_variables(mapping, copy=True)
+        if flipped:
+            result = result.flip_variables(flipped)
+    return result
+
+
+# returned by _read_memo when neither the memo nor the negative cache know the specification
+_NOT_FOUND = object()
+
+
+def _get_penalty_model(specification, executor, timeout, timed_out, running):
+    """Does the work of get_penalty_model for the first of the concurrent callers. The factories
+    being waited on are kept in running."""
+    # the memo and the negative cache are checked first, then the read-through caches, before
+    # any of the factories are loaded
+    pm = _read_memo(specification)
+    if pm is not _NOT_FOUND:
+        return pm
+
+    try:
+        pm = _read_caches(specification)
+    except ImpossiblePenaltyModel as e:
+        _remember_impossible(specification)
+        raise e
+
+    if pm is not None:
+        _remember(specification, pm)
+        return pm
+
+    deadline = None if timeout is None else _clock() + timeout
+
+    try:
+        if executor is None:
+            pm = _call_factories(specification, deadline, timed_out, running)
+        else:
+            pm = _race_factories(specification, executor, deadline, timed_out, running)
+    except ImpossiblePenaltyModel as e:
+        _record_impossible(specification)
+        raise e
+
+    if pm is None:
+        _remember_missing(specification, timed_out)
+        return None
+
+    _remember(specification, pm)
+
+    # if penalty model was found, broadcast to all of the caches, in the background if
+    # write-behind is enabled
+    _write_to_caches(pm)
+
+    return pm
+
+
+def _read_memo(specification):
+    """The answer of the memo or of the negative cache: a PenaltyModel, None if every factory is
+    known to reject the specification, or _NOT_FOUND. Raises ImpossiblePenaltyModel if the
+    specification is known to be impossible."""
+    memo = _memo
+    if memo is not None:
+        try:
+            return memo.get(specification)
+        except MissingPenaltyModel:
+            pass
+
+    negative = _negative
+    if negative is not None:
+        try:
+            negative.check(specification)  # raises ImpossiblePenaltyModel if known impossible
+        except MissingPenaltyModel:
+            return None
+
+    return _NOT_FOUND
+
+
+def _remember(specification, penalty_model):
+    """Add a PenaltyModel found in a cache or made by a factory to the memo, if enabled."""
+    memo = _memo
+    if memo is not None:
+        memo.put(penalty_model, specification)
+
+
+def _remember_impossible(specification):
+    """Remember that a cache knows the specification to be impossible, if negative caching is
+    enabled."""
+    negative = _negative
+    if negative is not None:
+        negative.add_impossible(specification)
+
+
+def _remember_missing(specification, timed_out):
+    """Remember that no factory could produce the specification, if negative caching is enabled
+    and none of the factories ran out of time."""
+    # if any of the factories ran out of time we cannot say that they all rejected it
+    negative = _negative
+    if negative is not None and not timed_out:
+        negative.add_missing(specification)
+
+
+def _record_impossible(specification):
+    """Remember that the specification is impossible in the negative cache and, if
+    enabled, in the read-through caches."""
+    negative = _negative
+    if negative is None:
+        return
+
+    negative.add_impossible(specification)
+
+    if _negative_use_caches:
+        for cache in iter_caches():
+            put_impossible = getattr(cache, 'put_impossible', None)
+            if put_impossible is not None:
+                put_impossible(specification)
+
+
+def _read_caches(specification):
+    """Ask each read-through cache for the penalty model, None if none of them have it."""
+    for cache in iter_caches():
+        if not isinstance(cache, PenaltyModelCache):
+            # write-only
+            continue
 
-    # Iterate through the available factories until one gives a penalty model
-    for factory in iter_factories():
         try:
-            pm = factory(specification)
+            return cache.get(specification)
         except ImpossiblePenaltyModel as e:
-            # information about impossible models should be propagated
+            # caches may also remember which penalty models are impossible
             raise e
         except FactoryException:
-            # any other type of factory exception, continue through the list
+            # MissingPenaltyModel or similar, try the next cache
+            continue
+        except Exception:
+            # a broken cache should not stop the lookup, the next cache or the factories may
+            # still have the penalty model
+            _logger.exception("reading penalty model cache %r failed", cache)
             continue
 
-        # if penalty model was found, broadcast to all of the caches. This could be done
-        # asynchronously
-        for cache in iter_caches():
-            cache(pm)
+    return None
 
-        return pm
+
+def _read_caches_many(specifications):
+    """Ask the read-through caches for many penalty models at once. Returns a list aligned
+    with specifications, with None for the penalty models that no cache has and the
+    ImpossiblePenaltyModel raised for the ones that a cache knows to be impossible."""
+    penalty_models = [None] * len(specifications)
+    for cache in iter_caches():
+        if not isinstance(cache, PenaltyModelCache):
+            continue
+
+        missing = [idx for idx, pm in enumerate(penalty_models) if pm is None]
+        if not missing:
+            break
+
+        try:
+            found = cache.get_many([specifications[idx] for idx in missing])
+        except Exception:
+            _logger.exception("reading penalty model cache %r failed", cache)
+            continue
+
+        for idx, pm in zip(missing, found):
+            penalty_models[idx] = pm
+
+    return penalty_models
+
+
+def _write_to_caches(penalty_model):
+    """Write the penalty model to every cache, or queue the writes if write-behind is enabled."""
+    queue = _write_behind
+    for cache in iter_caches():
+        write = _cache_writer(cache)
+        if queue is not None:
+            try:
+                queue.put(write, penalty_model)
+                continue
+            except RuntimeError:
+                # write-behind was disabled since the queue was read
+                pass
+        write(penalty_model)
+
+
+def get_penalty_models(specifications, executor=None, max_workers=None, ordered=True, canonical=False,
+                       gauge=False):
+    """Retrieve PenaltyModels for many specifications at once.
+
+    Equal specifications are only looked up once. The memo, the negative cache
+    and the read-through caches are asked for all of the unique specifications at once (see
+    :meth:`.PenaltyModelCache.get_many`), then the specifications that were
+    not found are each passed to :func:`.get_penalty_model` in a pool of workers.
+
+    Args:
+        specifications (iterable[:class:`.Specification`]): The specifications
+            for the desired PenaltyModels.
+
+        executor (:class:`concurrent.futures.Executor`, optional):
+            The executor used to run the lookups. If not provided, a
+            :class:`concurrent.futures.ThreadPoolExecutor` is created for the
+            duration of the call. A
+            :class:`concurrent.futures.ProcessPoolExecutor` can be used for
+            factories that hold the GIL, but its workers only see the
+            factories and caches of the entrypoints (and, if the workers are
+            forked, those registered before the fork) and do not use this
+            process's memo or negative cache.
+
+        max_workers (int, optional): The number of worker threads, only used
+            if `executor` is not provided.
+
+        ordered (bool, optional, default=True): If True, results are yielded
+            in the same order as `specifications`. If False, results are yielded
+            as soon as they are available.
+
+        canonical (bool, optional, default=False): If True, the canonical forms
+            of the specifications are looked up instead, see
+            :func:`.get_penalty_model`. Specifications that differ only in
+            their variable labels are then only looked up once.
+
+        gauge (bool, optional, default=False): If True, the gauge-canonical
+            representatives of the specifications are looked up instead, see
+            :func:`.get_penalty_model`.
+
+    Yields:
+        tuple: A 2-tuple:
+
+            :class:`.Specification`: One of the given specifications.
+
+            :class:`.PenaltyModel`/None/Exception: The PenaltyModel as returned
+            by :func:`.get_penalty_model`, or None if no factory could produce it.
+            If the lookup raised an exception, for instance
+            :exc:`ImpossiblePenaltyModel`, the exception is given instead.
+
+    Examples:
+        >>> for spec, widget in pm.get_penalty_models(specs):  # doctest: +SKIP
+        ...     if isinstance(widget, Exception):
+        ...         print('failed:', widget)
+
+    """
+    # we need all of the specifications up front to find the unique ones
+    specifications = list(specifications)
+
+    if canonical or gauge:
+        # look up the reduced forms, then restore each result to match its specification
+        reduced = [_reduce(specification, canonical, gauge) for specification in specifications]
+        originals = {id(form): (specification, mapping, flipped)
+                     for specification, (form, mapping, flipped) in zip(specifications, reduced)}
+
+        results = get_penalty_models([form for form, __, __ in reduced], executor, max_workers, ordered)
+        try:
+            for form, result in results:
+                specification, mapping, flipped = originals[id(form)]
+                yield specification, _restore(result, mapping, flipped)
+        finally:
+            results.close()
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    futures = {}  # maps a specification key to the future of its lookup
+    try:
+        keys = [_specification_key(specification) for specification in specifications]
+
+        # the unique specifications, by key
+        unique = {}
+        for key, specification in zip(keys, specifications):
+            unique.setdefault(key, specification)
+
+        # check the memo and then the read-through caches for all of them at once, only
+        # the misses are sent to the workers
+        memo = _memo
+        hits = {}
+        if memo is not None:
+            for key, specification in iteritems(unique):
+                try:
+                    hits[key] = memo.get(specification)
+                except MissingPenaltyModel:
+                    pass
+
+        negative = _negative
+        if negative is not None:
+            for key, specification in iteritems(unique):
+                if key in hits:
+                    continue
+                try:
+                    negative.check(specification)
+                except MissingPenaltyModel:
+                    hits[key] = None
+                except ImpossiblePenaltyModel as e:
+                    hits[key] = e
+
+        missing = [key for key in unique if key not in hits]
+        for key, pm in zip(missing, _read_caches_many([unique[key] for key in missing])):
+            if isinstance(pm, ImpossiblePenaltyModel):
+                hits[key] = pm
+                _remember_impossible(unique[key])
+            elif pm is not None:
+                hits[key] = pm
+                _remember(unique[key], pm)
+
+        for key in unique:
+            if key not in hits:
+                futures[key] = executor.submit(get_penalty_model, unique[key])
+
+        if ordered:
+            for key, specification in zip(keys, specifications):
+                if key in hits:
+                    yield specification, hits[key]
+                else:
+                    yield specification, _future_result(futures[key], unique[key])
+        else:
+            # group the specifications by the lookup that will answer them
+            groups = {}
+            for key, specification in zip(keys, specifications):
+                if key in hits:
+                    yield specification, hits[key]
+                else:
+                    groups.setdefault(futures[key], (key, []))[1].append(specification)
+
+            for future in as_completed(groups):
+                key, group = groups[future]
+                result = _future_result(future, unique[key])
+                for specification in group:
+                    yield specification, result
+    finally:
+        # if the caller stopped iterating early, the remaining lookups are not needed
+        for future in itervalues(futures):
+            future.cancel()
+
+        if own_executor:
+            executor.shutdown(wait=False)
+
+
+def _future_result(future, specification):
+    """The result of the future or, if it raised an exception, the exception."""
+    try:
+        pm = future.result()
+    except ImpossiblePenaltyModel as e:
+        # lookups done in other processes do not update this process's negative cache
+        negative = _negative
+        if negative is not None:
+            negative.add_impossible(specification)
+        return e
+    except Exception as e:
+        return e
+
+    # or this process's memo
+    if pm is None:
+        negative = _negative
+        if negative is not None:
+            negative.add_missing(specification)
+    else:
+        memo = _memo
+        if memo is not None:
+            memo.put(pm, specification)
+
+    return pm
+
+
+# time.monotonic is not available in python 2
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def _factory_deadline(factory, start, deadline):
+    """Determine when the factory's time budget runs out, None if it has no budget."""
+    budget = getattr(factory, 'timeout', None)
+    if budget is None:
+        return deadline
+    if deadline is None:
+        return start + budget
+    return min(start + budget, deadline)
+
+
+def _start_factory(factory, specification):
+    """Call the factory in a new daemon thread, returning a Future for its result.
+
+    A factory cannot be interrupted, so one that runs out of time is abandoned and keeps running
+    until it returns, its result is discarded. Daemon threads do not keep the interpreter from
+    exiting, so an abandoned factory that never returns does not block exit.
+    """
+    future = Future()
+
+    def call():
+        if not future.set_running_or_notify_cancel():
+            return  # pragma: no cover
+        try:
+            result = factory(specification)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    thread = threading.Thread(target=call, name='penaltymodel-factory')
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def _call_with_timeout(factory, specification, factory_deadline):
+    """Call the factory in a daemon thread, raising FactoryTimeout if it does not return by
+    factory_deadline. The factory is not started if the deadline has already passed."""
+    remaining = factory_deadline - _clock()
+    if remaining <= 0:
+        raise FactoryTimeout("factory {} had no time left in its time budget".format(factory))
+    try:
+        return _start_factory(factory, specification).result(timeout=remaining)
+    except TimeoutError:
+        raise FactoryTimeout("factory {} did not return within its time budget".format(factory))
+
+
+def _call_factories(specification, deadline, timed_out, running):
+    """Call the factories in order of priority until one gives a penalty model."""
+    for factory in iter_factories():
+        factory_deadline = _factory_deadline(factory, _clock(), deadline)
+
+        running.append(factory)
+        try:
+            if factory_deadline is None:
+                return factory(specification)
+            # the factories with a time budget are called in their own thread so they can be abandoned
+            return _call_with_timeout(factory, specification, factory_deadline)
+        except FactoryException as e:
+            if _factory_failed(factory, e, deadline, timed_out):
+                return None
+        finally:
+            running.remove(factory)
 
     return None
 
 
-def penaltymodel_factory(priority):
+def _factory_failed(factory, exception, deadline, timed_out):
+    """Handle an exception raised by a factory called one after another with the others.
+
+    ImpossiblePenaltyModel is raised again, it ends the search. A timed out factory is appended to
+    timed_out. Returns True if there is no time left for the remaining factories.
+    """
+    if isinstance(exception, ImpossiblePenaltyModel):
+        # information about impossible models should be propagated
+        raise exception
+    if isinstance(exception, FactoryTimeout):
+        timed_out.append(factory)
+        # out of time for the remaining factories?
+        return deadline is not None and _clock() >= deadline
+    # any other type of factory exception, continue through the list
+    return False
+
+
+def _race_factories(specification, executor, deadline, timed_out, running):
+    """Submit all of the factories to the executor, return the result of the highest
+    priority factory that succeeds."""
+    start = _clock()
+    factories = list(iter_factories())
+    futures = [executor.submit(factory, specification) for factory in factories]
+
+    # a factory is no longer waited on once its result is known or it has run out of time
+    running.extend(factories)
+    try:
+        not_done = set(futures)
+
+        # futures are in priority order, so the first future that has not failed is the
+        # only one that can currently win
+        for factory, future in zip(factories, futures):
+            factory_deadline = _factory_deadline(factory, start, deadline)
+
+            while not future.done():
+                if factory_deadline is None:
+                    done, not_done = wait(not_done, return_when=FIRST_COMPLETED)
+                else:
+                    done, not_done = wait(not_done, timeout=max(factory_deadline - _clock(), 0),
+                                          return_when=FIRST_COMPLETED)
+
+                    if not done and not future.done():
+                        break
+
+                # information about impossible models short-circuits the search
+                for f in done:
+                    if isinstance(f.exception(), ImpossiblePenaltyModel):
+                        raise f.exception()
+
+            running.remove(factory)
+
+            if not future.done():
+                # out of time, treat like any other factory exception
+                timed_out.append(factory)
+                if deadline is not None and _clock() >= deadline:
+                    return None
+                continue
+
+            try:
+                return future.result()
+            except ImpossiblePenaltyModel as e:
+                raise e
+            except FactoryException:
+                continue
+
+        return None
+    finally:
+        # cancel any factories that have not started
+        for future in futures:
+            future.cancel()
+        del running[:]
+
+
+def penaltymodel_factory(priority, timeout=None):
     """Decorator to assign a `priority` attribute to the decorated function.
 
     Args:
         priority (int): The priority of the factory. Factories are queried
             in order of decreasing priority.
 
+        timeout (number, optional): The time budget of the factory in seconds.
+            If the factory does not return within `timeout` seconds,
+            :func:`.get_penalty_model` treats it as having raised
+            :exc:`FactoryTimeout`. Assigned to the `timeout` attribute.
+
     Examples:
         Decorate penalty model factories like:
 
@@ -88,9 +785,16 @@ def penaltymodel_factory(priority):
         >>> factory_function.priority
         105
 
+        >>> @pm.penaltymodel_factory(105, timeout=2.5)
+        ... def factory_function(spec):
+        ...     pass
+        >>> factory_function.timeout
+        2.5
+
     """
     def _entry_point(f):
         f.priority = priority
+        f.timeout = timeout
         return f
     return _entry_point
 
@@ -103,13 +807,8 @@ def iter_factories():
         returns a :class:`.PenaltyModel`.
 
     """
-    # retrieve all of the factories with
-    factories = (entry.load() for entry in iter_entry_points(FACTORY_ENTRYPOINT))
-
-    # sort the factories from highest priority to lowest. Any factory with unknown priority
-    # gets assigned priority -1000.
-    for factory in sorted(factories, key=lambda f: getattr(f, 'priority', -1000), reverse=True):
-        yield factory
+    # the registry keeps the factories sorted from highest priority to lowest
+    return iter(_registry.factories())
 
 
 def iter_caches():
@@ -120,5 +819,225 @@ def iter_caches():
         it.
 
     """
-    # for caches we don't need an order
-    return iter(entry.load() for entry in iter_entry_points(CACHE_ENTRYPOINT))
+    return iter(_registry.caches())
+
+
+def register_factory(factory):
+    """Add a factory to the ones used by :func:`.get_penalty_model`.
+
+    Args:
+        factory (function): A function that accepts a :class:`.Specification`
+            and returns a :class:`.PenaltyModel`. Should be decorated with
+            :func:`.penaltymodel_factory`.
+
+    """
+    _registry.register_factory(factory)
+    _registry_changed()
+
+
+def unregister_factory(factory):
+    """Remove a factory from the ones used by :func:`.get_penalty_model`.
+
+    Args:
+        factory (function): A factory previously returned by :func:`.iter_factories`.
+
+    Raises:
+        ValueError: If the factory is not known.
+
+    """
+    _registry.unregister_factory(factory)
+    _registry_changed(impossible=True)
+
+
+def register_cache(cache):
+    """Add a cache to the ones used by :func:`.get_penalty_model`.
+
+    Args:
+        cache (function): A function that accepts a :class:`.PenaltyModel`
+            and caches it.
+
+    """
+    _registry.register_cache(cache)
+    _registry_changed()
+
+
+def unregister_cache(cache):
+    """Remove a cache from the ones used by :func:`.get_penalty_model`.
+
+    Args:
+        cache (function): A cache previously returned by :func:`.iter_caches`.
+
+    Raises:
+        ValueError: If the cache is not known.
+
+    """
+    _registry.unregister_cache(cache)
+
+
+def refresh_registry():
+    """Rescan the factory and cache entrypoints.
+
+    Needed only if packages providing factories or caches are installed
+    after the first call to :func:`.get_penalty_model`.
+
+    """
+    _registry.refresh()
+    _registry_changed(impossible=True)
+
+
+def _registry_changed(impossible=False):
+    """Forget the outcomes of the negative cache that the change to the factories or caches may
+    have made wrong. A new factory or cache may find the specifications that every factory
+    rejected, and only removing a factory can make an impossible specification possible."""
+    negative = _negative
+    if negative is None:
+        return
+    if impossible:
+        negative.clear()
+    else:
+        negative.clear_missing()
+
+
+def enable_write_behind(maxsize=1024, policy='block'):
+    """Write new PenaltyModels to the caches in a background thread.
+
+    Once enabled, :func:`.get_penalty_model` queues the cache writes and returns
+    without waiting for them. The queued writes are flushed when the interpreter
+    exits, waiting at most 30 seconds. Use :func:`.flush_caches` to wait for
+    them sooner.
+
+    Args:
+        maxsize (int, optional, default=1024): The maximum number of queued writes.
+            If 0, the queue is unbounded.
+
+        policy (str, optional, default='block'): Either 'block' or 'drop', what to do
+            when the queue is full. See :class:`.WriteBehindQueue`.
+
+    Returns:
+        :class:`.WriteBehindQueue`: The queue, which holds the counters of pending,
+        failed and dropped writes.
+
+    """
+    global _write_behind
+
+    queue = WriteBehindQueue(maxsize, policy)
+    previous, _write_behind = _write_behind, queue
+
+    if previous is not None:
+        previous.close()
+
+    return queue
+
+
+def disable_write_behind(timeout=None):
+    """Write new PenaltyModels to the caches before :func:`.get_penalty_model` returns.
+
+    The writes already queued are flushed first.
+
+    Args:
+        timeout (number, optional): The maximum time to wait for the queued
+            writes, in seconds.
+
+    Returns:
+        bool: True if all of the queued writes finished, False if the timeout expired.
+
+    """
+    global _write_behind
+
+    queue, _write_behind = _write_behind, None
+
+    if queue is None:
+        return True
+    return queue.close(timeout)
+
+
+def flush_caches(timeout=None):
+    """Wait for all of the queued cache writes to finish.
+
+    Args:
+        timeout (number, optional): The maximum time to wait, in seconds.
+
+    Returns:
+        bool: True if all of the queued writes finished, False if the timeout expired.
+        Always True if write-behind is not enabled.
+
+    """
+    queue = _write_behind
+    if queue is None:
+        return True
+    return queue.flush(timeout)
+
+
+def enable_memo(capacity=1024):
+    """Remember PenaltyModels in memory, in front of all of the caches and factories.
+
+    Once enabled, :func:`.get_penalty_model` returns a copy of the remembered
+    PenaltyModel for every lookup of an equal specification, so the returned
+    penalty models can be modified without affecting the memo or each other.
+
+    Args:
+        capacity (int, optional, default=1024): The maximum number of penalty
+            models remembered.
+
+    Returns:
+        :class:`.MemoCache`: The memo, which can be used to invalidate entries
+        and holds the hit/miss statistics.
+
+    """
+    global _memo
+    _memo = memo = MemoCache(capacity)
+    return memo
+
+
+def disable_memo():
+    """Stop remembering PenaltyModels in memory and discard the ones remembered."""
+    global _memo
+    _memo = None
+
+
+def enable_negative_cache(ttl=300, capacity=1024, use_caches=False):
+    """Remember the specifications for which no PenaltyModel could be found.
+
+    Once enabled, :func:`.get_penalty_model` remembers each specification for
+    which a factory raised :exc:`ImpossiblePenaltyModel`, and each specification
+    that every factory rejected. For `ttl` seconds, repeated lookups raise
+    :exc:`ImpossiblePenaltyModel` or return None right away. Searches in which a
+    factory timed out are not remembered.
+
+    Args:
+        ttl (number, optional, default=300): How long, in seconds, each outcome
+            is remembered for.
+
+        capacity (int, optional, default=1024): The maximum number of outcomes
+            remembered.
+
+        use_caches (bool, optional, default=False): If True, impossible penalty
+            models are also recorded in the read-through caches, see
+            :meth:`.PenaltyModelCache.put_impossible`, so that other processes
+            can share them.
+
+    Returns:
+        :class:`.NegativeCache`: The negative cache, which can be used to
+        invalidate entries and holds the hit statistics.
+
+    """
+    global _negative, _negative_use_caches
+    _negative = negative = NegativeCache(ttl, capacity)
+    _negative_use_caches = use_caches
+    return negative
+
+
+def disable_negative_cache():
+    """Stop remembering the specifications for which no PenaltyModel could be found."""
+    global _negative, _negative_use_caches
+    _negative = None
+    _negative_use_caches = False
+
+
+def _flush_at_exit():
+    flush_caches(_EXIT_FLUSH_TIMEOUT)
+
+
+# the worker thread is a daemon so we need to make sure the writes complete before exit, but
+# a hung cache should not stop the interpreter from exiting
+atexit.register(_flush_at_exit)
@@ -0,0 +1,279 @@
+"""
+Memoization
+-----------
+
+An optional in-memory cache that :func:`.get_penalty_model` checks before any
+other cache or factory. Repeated lookups of equal specifications within one
+process are answered without touching the entrypoints.
+
+Examples:
+    >>> memo = pm.enable_memo(capacity=256)
+    >>> widget = pm.get_penalty_model(spec)  # doctest: +SKIP
+    >>> widget = pm.get_penalty_model(spec)  # doctest: +SKIP
+    >>> memo.hits, memo.misses  # doctest: +SKIP
+    (1, 1)
+    >>> pm.disable_memo()
+
+Likewise, the specifications for which no penalty model could be found can be
+remembered for a limited time, so that repeated lookups fail fast.
+
+Examples:
+    >>> negative_cache = pm.enable_negative_cache(ttl=600)
+    >>> pm.get_penalty_model(impossible_spec)  # doctest: +SKIP
+    Traceback (most recent call last):
+        ...
+    ImpossiblePenaltyModel
+    >>> pm.disable_negative_cache()
+
+"""
+from __future__ import absolute_import
+
+import threading
+import time
+
+from collections import OrderedDict
+
+from penaltymodel.cache import PenaltyModelCache, _specification_key
+from penaltymodel.exceptions import MissingPenaltyModel, ImpossiblePenaltyModel
+
+__all__ = ['MemoCache', 'NegativeCache']
+
+# time.monotonic is not available in python 2
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class MemoCache(PenaltyModelCache):
+    """A thread-safe, least-recently-used cache of PenaltyModels.
+
+    Args:
+        capacity (int, optional, default=1024): The maximum number of penalty
+            models held. Once full, the least recently used penalty model is
+            discarded to make room.
+
+        key (function, optional): A function that maps a :class:`.Specification` to a
+            hashable key. Specifications with equal keys must have the same
+            penalty model.
+
+    Attributes:
+        hits (int): The number of lookups that found a penalty model.
+
+        misses (int): The number of lookups that did not.
+
+    Notes:
+        The penalty models are copied as they are added and again each time
+        they are retrieved (see :meth:`.PenaltyModel.copy`), so callers can
+        modify the penalty models they are given without affecting the memo.
+
+    """
+    def __init__(self, capacity=1024, key=None):
+        if capacity < 1:
+            raise ValueError("capacity must be a positive integer")
+        self.capacity = capacity
+
+        self.key = _specification_key if key is None else key
+
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._models)
+
+    def get(self, specification):
+        """Retrieve the PenaltyModel matching the specification.
+
+        Args:
+            specification (:class:`.Specification`): The specification
+                for the desired PenaltyModel.
+
+        Returns:
+            :class:`.PenaltyModel`: A copy of the held penalty model.
+
+        Raises:
+            :exc:`MissingPenaltyModel`: If no matching penalty model is held.
+
+        """
+        key = self.key(specification)
+        with self._lock:
+            try:
+                # pop and re-insert to mark as most recently used, python 2's
+                # OrderedDict does not have move_to_end
+                penalty_model = self._models[key] = self._models.pop(key)
+            except KeyError:
+                self.misses += 1
+                raise MissingPenaltyModel
+            self.hits += 1
+        return penalty_model.copy()
+
+    def put(self, penalty_model, specification=None):
+        """Add a PenaltyModel, discarding the least recently used one if full.
+
+        Args:
+            penalty_model (:class:`.PenaltyModel`): The penalty model to hold. A
+                copy is held, so `penalty_model` can be modified afterwards.
+
+            specification (:class:`.Specification`, optional): The specification
+                that `penalty_model` should be returned for. Defaults to
+                `penalty_model` itself.
+
+        """
+        key = self.key(penalty_model if specification is None else specification)
+        penalty_model = penalty_model.copy()
+        with self._lock:
+            self._models.pop(key, None)
+            self._models[key] = penalty_model
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+
+    def invalidate(self, specification):
+        """Discard the PenaltyModel matching the specification, if held.
+
+        Args:
+            specification (:class:`.Specification`): The specification
+                of the PenaltyModel to discard.
+
+        Returns:
+            bool: True if a penalty model was discarded.
+
+        """
+        key = self.key(specification)
+        with self._lock:
+            return self._models.pop(key, None) is not None
+
+    def clear(self):
+        """Discard all of the PenaltyModels and reset the statistics."""
+        with self._lock:
+            self._models.clear()
+            self.hits = self.misses = 0
+
+
+class NegativeCache(object):
+    """A thread-safe cache of the specifications for which no PenaltyModel exists.
+
+    Two outcomes are remembered: specifications for which a factory raised
+    :exc:`ImpossiblePenaltyModel`, and specifications that every factory
+    rejected.
+
+    Args:
+        ttl (number, optional, default=300): How long, in seconds, each outcome
+            is remembered for.
+
+        capacity (int, optional, default=1024): The maximum number of outcomes
+            remembered. Once full, the least recently used outcome is discarded
+            to make room.
+
+        key (function, optional): A function that maps a :class:`.Specification`
+            to a hashable key. Specifications with equal keys must have the same
+            penalty model.
+
+    Attributes:
+        hits (int): The number of lookups that found a remembered outcome.
+
+    """
+    _IMPOSSIBLE = 'impossible'
+    _MISSING = 'missing'
+
+    def __init__(self, ttl=300, capacity=1024, key=None):
+        if capacity < 1:
+            raise ValueError("capacity must be a positive integer")
+        self.capacity = capacity
+        self.ttl = ttl
+
+        self.key = _specification_key if key is None else key
+
+        self._lock = threading.Lock()
+        self._outcomes = OrderedDict()  # key -> (expiry, outcome)
+
+        self.hits = 0
+
+    def __len__(self):
+        return len(self._outcomes)
+
+    def check(self, specification):
+        """Raise if the specification is remembered as having no penalty model.
+
+        Args:
+            specification (:class:`.Specification`): The specification
+                for the desired PenaltyModel.
+
+        Raises:
+            :exc:`ImpossiblePenaltyModel`: If a factory found the penalty model
+                to be impossible.
+
+            :exc:`MissingPenaltyModel`: If every factory rejected the
+                specification.
+
+        """
+        key = self.key(specification)
+        with self._lock:
+            try:
+                expiry, outcome = self._outcomes.pop(key)
+            except KeyError:
+                return
+
+            if expiry <= _clock():
+                # expired, leave it removed
+                return
+
+            self._outcomes[key] = (expiry, outcome)
+            self.hits += 1
+
+        if outcome is self._IMPOSSIBLE:
+            raise ImpossiblePenaltyModel("specification is known to be impossible")
+        raise MissingPenaltyModel("no factory could produce the specification")
+
+    def _add(self, specification, outcome):
+        key = self.key(specification)
+        with self._lock:
+            self._outcomes.pop(key, None)
+            self._outcomes[key] = (_clock() + self.ttl, outcome)
+            while len(self._outcomes) > self.capacity:
+                self._outcomes.popitem(last=False)
+
+    def add_impossible(self, specification):
+        """Remember that the specification's penalty model is impossible.
+
+        Args:
+            specification (:class:`.Specification`): The specification.
+
+        """
+        self._add(specification, self._IMPOSSIBLE)
+
+    def add_missing(self, specification):
+        """Remember that every factory rejected the specification.
+
+        Args:
+            specification (:class:`.Specification`): The specification.
+
+        """
+        self._add(specification, self._MISSING)
+
+    def invalidate(self, specification):
+        """Forget the outcome for the specification, if remembered.
+
+        Args:
+            specification (:class:`.Specification`): The specification.
+
+        Returns:
+            bool: True if an outcome was forgotten.
+
+        """
+        key = self.key(specification)
+        with self._lock:
+            return self._outcomes.pop(key, None) is not None
+
+    def clear_missing(self):
+        """Forget the specifications that every factory rejected, for instance because the
+        factories have changed. The impossible ones are still remembered."""
+        with self._lock:
+            for key, (__, outcome) in list(self._outcomes.items()):
+                if outcome is self._MISSING:
+                    del self._outcomes[key]
+
+    def clear(self):
+        """Forget all of the outcomes and reset the statistics."""
+        with self._lock:
+            self._outcomes.clear()
+            self.hits = 0
@@ -0,0 +1,196 @@
+"""
+Registry
+--------
+
+The registry holds the factories and caches used by :func:`.get_penalty_model`.
+
+Entry points are scanned and loaded once, on first use, and the factories are
+kept sorted by decreasing priority so that each lookup only needs to read the
+current tuple of factories. Factories and caches can also be added or removed at run time
+without going through the entry points.
+"""
+from __future__ import absolute_import
+
+import threading
+
+from pkg_resources import iter_entry_points
+
+__all__ = ['Registry']
+
+
+def _priority(factory):
+    # Any factory with unknown priority gets assigned priority -1000.
+    return getattr(factory, 'priority', -1000)
+
+
+class Registry(object):
+    """Process-wide collection of penalty model factories and caches.
+
+    Reading from the registry is lock-free: the factories and caches are each
+    held in an immutable tuple that is replaced (under a lock) whenever the
+    registry is modified. This makes it safe to query the registry from many
+    threads at once.
+
+    Args:
+        factory_entrypoint (str): The entrypoint used to discover factories.
+
+        cache_entrypoint (str): The entrypoint used to discover caches.
+
+    Examples:
+        >>> registry = pm.Registry(pm.FACTORY_ENTRYPOINT, pm.CACHE_ENTRYPOINT)
+        >>> @pm.penaltymodel_factory(105)
+        ... def factory_function(spec):
+        ...     pass
+        >>> registry.register_factory(factory_function)
+        >>> factory_function in registry.factories()
+        True
+
+    """
+    def __init__(self, factory_entrypoint, cache_entrypoint):
+        self.factory_entrypoint = factory_entrypoint
+        self.cache_entrypoint = cache_entrypoint
+
+        self._lock = threading.RLock()
+
+        # factories/caches added with register_*, these survive a refresh
+        self._registered_factories = []
+        self._registered_caches = []
+
+        # the factories and caches are each held as a tuple. They are loaded separately so
+        # that reading from the caches does not require loading the factories. None until the
+        # entry points are first scanned
+        self._factories = None
+        self._caches = None
+
+    def _load_factories(self):
+        """Scan the factory entrypoint. Must be called with the lock held."""
+        factories = [entry.load() for entry in iter_entry_points(self.factory_entrypoint)]
+        factories.extend(f for f in self._registered_factories if f not in factories)
+
+        # sorted is stable so factories of equal priority stay in discovery order
+        self._factories = tuple(sorted(factories, key=_priority, reverse=True))
+
+    def _load_caches(self):
+        """Scan the cache entrypoint. Must be called with the lock held."""
+        caches = [entry.load() for entry in iter_entry_points(self.cache_entrypoint)]
+        caches.extend(c for c in self._registered_caches if c not in caches)
+
+        self._caches = tuple(caches)
+
+    def factories(self):
+        """The factories, sorted from highest priority to lowest.
+
+        Returns:
+            tuple[function]: Functions that accept a :class:`.Specification` and
+            return a :class:`.PenaltyModel`.
+
+        """
+        factories = self._factories
+        if factories is None:
+            with self._lock:
+                if self._factories is None:
+                    self._load_factories()
+                factories = self._factories
+        return factories
+
+    def caches(self):
+        """The caches, in no particular order.
+
+        Returns:
+            tuple[function/:class:`.PenaltyModelCache`]: Functions that accept a
+            :class:`.PenaltyModel` and cache it.
+
+        """
+        caches = self._caches
+        if caches is None:
+            with self._lock:
+                if self._caches is None:
+                    self._load_caches()
+                caches = self._caches
+        return caches
+
+    def refresh(self):
+        """Rescan the entrypoints.
+
+        Factories and caches added with :meth:`.register_factory` and
+        :meth:`.register_cache` are kept. Entrypoint factories and caches that
+        were removed with :meth:`.unregister_factory` or :meth:`.unregister_cache`
+        are discovered again.
+
+        """
+        with self._lock:
+            self._load_factories()
+            self._load_caches()
+
+    def register_factory(self, factory):
+        """Add a factory to the registry.
+
+        Args:
+            factory (function): A function that accepts a :class:`.Specification`
+                and returns a :class:`.PenaltyModel`. Its position is determined
+                by its `priority` attribute, see :func:`.penaltymodel_factory`.
+
+        """
+        with self._lock:
+            if factory not in self._registered_factories:
+                self._registered_factories.append(factory)
+
+            factories = self.factories()
+            if factory not in factories:
+                self._factories = tuple(sorted(factories + (factory,), key=_priority, reverse=True))
+
+    def unregister_factory(self, factory):
+        """Remove a factory from the registry.
+
+        Args:
+            factory (function): A factory currently in the registry.
+
+        Raises:
+            ValueError: If the factory is not in the registry.
+
+        """
+        with self._lock:
+            factories = self.factories()
+            if factory not in factories:
+                raise ValueError("{} is not a registered factory".format(factory))
+
+            if factory in self._registered_factories:
+                self._registered_factories.remove(factory)
+
+            self._factories = tuple(f for f in factories if f != factory)
+
+    def register_cache(self, cache):
+        """Add a cache to the registry.
+
+        Args:
+            cache (function/:class:`.PenaltyModelCache`): A function that accepts
+                a :class:`.PenaltyModel` and caches it, or a read-through cache.
+
+        """
+        with self._lock:
+            if cache not in self._registered_caches:
+                self._registered_caches.append(cache)
+
+            caches = self.caches()
+            if cache not in caches:
+                self._caches = caches + (cache,)
+
+    def unregister_cache(self, cache):
+        """Remove a cache from the registry.
+
+        Args:
+            cache (function): A cache currently in the registry.
+
+        Raises:
+            ValueError: If the cache is not in the registry.
+
+        """
+        with self._lock:
+            caches = self.caches()
+            if cache not in caches:
+                raise ValueError("{} is not a registered cache".format(cache))
+
+            if cache in self._registered_caches:
+                self._registered_caches.remove(cache)
+
+            self._caches = tuple(c for c in caches if c != cache)
@@ -0,0 +1,20 @@
+"""Coroutine factories and caches for test_async_interface, requires python 3.5+."""
+import asyncio
+
+import penaltymodel as pm
+
+
+def make_async_factory(priority, result=None, exception=None, delay=0, timeout=None):
+    @pm.penaltymodel_factory(priority, timeout=timeout)
+    async def factory(specification):
+        await asyncio.sleep(delay)
+        if exception is not None:
+            raise exception
+        return result
+    return factory
+
+
+def make_async_cache(cached):
+    async def cache(penalty_model):
+        cached.append(penalty_model)
+    return cache
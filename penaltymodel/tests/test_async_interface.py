@@ -0,0 +1,104 @@
+import sys
+import time
+import unittest
+
+import networkx as nx
+
+import penaltymodel as pm
+
+from penaltymodel.tests.test_interface import RegisteredFactoriesMixin, _simple_widget
+
+_async = sys.version_info >= (3, 5)
+if _async:
+    import asyncio
+    from penaltymodel.tests.async_factories import make_async_factory, make_async_cache
+
+
+@unittest.skipUnless(_async, "asyncio interface requires python 3.5+")
+class TestGetPenaltyModelAsync(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def run_coroutine(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_coroutine_factory(self):
+        widget = _simple_widget()
+        cached = []
+        cache = make_async_cache(cached)
+
+        self.register(make_async_factory(10 ** 6, result=widget))
+        pm.register_cache(cache)
+        self.addCleanup(pm.unregister_cache, cache)
+
+        self.assertIs(self.run_coroutine(pm.get_penalty_model_async(self.spec)), widget)
+        self.assertEqual(cached, [widget])
+
+    def test_sync_factory_priority(self):
+        widget = _simple_widget()
+
+        @pm.penaltymodel_factory(10 ** 6 + 1)
+        def sync_factory(specification):
+            return widget
+
+        self.register(make_async_factory(10 ** 6, result=_simple_widget()),
+                      make_async_factory(10 ** 6 + 2, exception=pm.MissingPenaltyModel()),
+                      sync_factory)
+
+        self.assertIs(self.run_coroutine(pm.get_penalty_model_async(self.spec)), widget)
+
+    def test_impossible(self):
+        self.register(make_async_factory(10 ** 6 + 1, exception=pm.ImpossiblePenaltyModel()),
+                      make_async_factory(10 ** 6, result=_simple_widget()))
+
+        with self.assertRaises(pm.ImpossiblePenaltyModel):
+            self.run_coroutine(pm.get_penalty_model_async(self.spec))
+
+    def test_timeout(self):
+        widget = _simple_widget()
+        slow = make_async_factory(10 ** 6 + 1, result=_simple_widget(), delay=5, timeout=.05)
+        self.register(slow, make_async_factory(10 ** 6, result=widget))
+
+        timed_out = []
+        t = time.time()
+        result = self.run_coroutine(pm.get_penalty_model_async(self.spec, timed_out=timed_out))
+
+        self.assertLess(time.time() - t, 1)
+        self.assertIs(result, widget)
+        self.assertEqual(timed_out, [slow])
+
+    def test_no_time_left(self):
+        calls = []
+
+        @pm.penaltymodel_factory(10 ** 6 + 1, timeout=0)
+        def no_budget(specification):
+            calls.append(specification)
+            return _simple_widget()
+
+        widget = _simple_widget()
+        self.register(no_budget, make_async_factory(10 ** 6, result=widget))
+
+        timed_out = []
+        self.assertIs(self.run_coroutine(pm.get_penalty_model_async(self.spec, timed_out=timed_out)), widget)
+        self.assertEqual(timed_out, [no_budget])
+        self.assertEqual(calls, [])
+
+    def test_decompose(self):
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            model = pm.BinaryQuadraticModel({v: 0 for v in specification.graph},
+                                            {edge: -1 for edge in specification.graph.edges},
+                                            0.0, pm.SPIN)
+            return pm.PenaltyModel.from_specification(specification, model, 2, -1)
+
+        self.register(factory)
+
+        spec = pm.Specification([(0, 1), ('a', 'b')], (0, 1, 'a', 'b'),
+                                {(s, s, t, t) for s in (-1, 1) for t in (-1, 1)}, pm.SPIN)
+        widget = self.run_coroutine(pm.get_penalty_model_async(spec, decompose=True))
+
+        self.assertTrue(pm.Specification.__eq__(spec, widget))
+        self.assertEqual(widget.model.quadratic, {(0, 1): -1, ('a', 'b'): -1})
+        self.assertEqual(widget.ground_energy, -2)
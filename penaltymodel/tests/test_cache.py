@@ -0,0 +1,152 @@
+import unittest
+
+import networkx as nx
+
+import penaltymodel as pm
+
+from penaltymodel.tests.test_interface import RegisteredFactoriesMixin, _simple_widget
+
+
+class DictCache(pm.PenaltyModelCache):
+    """Read-through cache that holds penalty models in a list."""
+    def __init__(self):
+        self.models = []
+        self.gets = 0
+        self.get_manys = 0
+
+    def get(self, specification):
+        self.gets += 1
+        for penalty_model in self.models:
+            if pm.Specification.__eq__(specification, penalty_model):
+                return penalty_model
+        raise pm.MissingPenaltyModel
+
+    def get_many(self, specifications):
+        self.get_manys += 1
+        return pm.PenaltyModelCache.get_many(self, specifications)
+
+    def put(self, penalty_model):
+        self.models.append(penalty_model)
+
+
+class TestPenaltyModelCache(unittest.TestCase):
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            pm.PenaltyModelCache()
+
+    def test_duck_typing(self):
+        class Cache(object):
+            def get(self, specification):
+                pass
+
+            def put(self, penalty_model):
+                pass
+
+        self.assertIsInstance(Cache(), pm.PenaltyModelCache)
+        self.assertNotIsInstance(lambda penalty_model: None, pm.PenaltyModelCache)
+
+    def test_get_many(self):
+        cache = DictCache()
+        widget = _simple_widget()
+        cache(widget)  # calling is the same as put
+
+        other = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        self.assertEqual(cache.get_many([other, widget]), [None, widget])
+
+    def test_registry_does_not_load_factories(self):
+        registry = pm.Registry('penaltymodel_test_factory', 'penaltymodel_test_cache')
+        registry.caches()
+        self.assertIsNone(registry._factories)
+
+
+class TestReadThrough(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.cache = cache = DictCache()
+        pm.register_cache(cache)
+        self.addCleanup(pm.unregister_cache, cache)
+
+        self.factory_calls = calls = []
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            calls.append(specification)
+            model = pm.BinaryQuadraticModel({v: 0 for v in specification.graph},
+                                            {edge: -1 for edge in specification.graph.edges},
+                                            0.0, pm.SPIN)
+            return pm.PenaltyModel.from_specification(specification, model, 2, -1)
+
+        self.register(factory)
+
+    def test_hit_skips_factories(self):
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+
+        widget = pm.get_penalty_model(spec)
+        self.assertEqual(len(self.factory_calls), 1)
+        self.assertEqual(self.cache.models, [widget])  # written on the miss
+
+        self.assertIs(pm.get_penalty_model(spec), widget)
+        self.assertEqual(len(self.factory_calls), 1)
+
+    def test_impossible_from_cache(self):
+        class ImpossibleCache(DictCache):
+            def get(self, specification):
+                raise pm.ImpossiblePenaltyModel
+
+        cache = ImpossibleCache()
+        pm.register_cache(cache)
+        self.addCleanup(pm.unregister_cache, cache)
+
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        with self.assertRaises(pm.ImpossiblePenaltyModel):
+            pm.get_penalty_model(spec)
+        self.assertEqual(self.factory_calls, [])
+
+    def test_broken_cache(self):
+        class BrokenCache(DictCache):
+            def get(self, specification):
+                raise RuntimeError("lost the connection")
+
+        cache = BrokenCache()
+        pm.register_cache(cache)
+        self.addCleanup(pm.unregister_cache, cache)
+
+        # the error is logged and the lookup goes on to the factories
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        with self.assertLogs('penaltymodel.interface', 'ERROR'):
+            self.assertIsNotNone(pm.get_penalty_model(spec))
+        self.assertEqual(self.factory_calls, [spec])
+
+        other = pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)
+        with self.assertLogs('penaltymodel.interface', 'ERROR'):
+            (__, result), = pm.get_penalty_models([other])
+        self.assertIsNotNone(result)
+
+    def test_batch_impossible_from_cache(self):
+        class ImpossibleCache(DictCache):
+            def get(self, specification):
+                raise pm.ImpossiblePenaltyModel
+
+        cache = ImpossibleCache()
+        pm.register_cache(cache)
+        self.addCleanup(pm.unregister_cache, cache)
+
+        # impossible is reported like get_penalty_model does, rather than sent to the factories
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        (__, result), = pm.get_penalty_models([spec])
+        self.assertIsInstance(result, pm.ImpossiblePenaltyModel)
+        self.assertEqual(self.factory_calls, [])
+
+    def test_batch_uses_get_many(self):
+        cached_spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        widget = pm.get_penalty_model(cached_spec)
+        del self.factory_calls[:]
+
+        specs = [cached_spec, pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN)]
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(pm.get_penalty_models(specs, executor=executor))
+
+        self.assertEqual(self.cache.get_manys, 1)
+        self.assertIs(results[0][1], widget)
+        self.assertEqual(self.factory_calls, [specs[1]])
@@ -1,4 +1,9 @@
 import unittest
+import time
+import threading
+import multiprocessing
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 import networkx as nx
 
@@ -44,3 +49,484 @@ class TestInterfaceWithMaxGap(unittest.TestCase):
 
         self.assertEqual(widget.model.linear, {0: 0, 1: 0})
         self.assertEqual(widget.model.quadratic, {(0, 1): -1})
+
+
+def _simple_widget():
+    spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+    model = pm.BinaryQuadraticModel({0: 0, 1: 0}, {(0, 1): -1}, 0.0, vartype=pm.SPIN)
+    return pm.PenaltyModel.from_specification(spec, model, 2, -1)
+
+
+# module-level factories so that they can be pickled for the process pool
+@pm.penaltymodel_factory(10 ** 6 + 2)
+def _slow_failing_factory(specification):
+    time.sleep(.5)
+    raise pm.FactoryException
+
+
+@pm.penaltymodel_factory(10 ** 6 + 1)
+def _fast_factory(specification):
+    return _simple_widget()
+
+
+class RegisteredFactoriesMixin(object):
+    """Registers factories for the duration of each test."""
+    def register(self, *factories):
+        for factory in factories:
+            pm.register_factory(factory)
+            self.addCleanup(pm.unregister_factory, factory)
+
+
+class TestRaceFactories(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+
+    def test_lower_priority_wins_after_failure(self):
+        self.register(_slow_failing_factory, _fast_factory)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            widget = pm.get_penalty_model(self.spec, executor=executor)
+
+        self.assertEqual(widget, _simple_widget())
+
+    def test_higher_priority_preferred(self):
+        high_widget = _simple_widget()
+        low_widget = _simple_widget()
+
+        @pm.penaltymodel_factory(10 ** 6 + 2)
+        def slow(specification):
+            time.sleep(.1)
+            return high_widget
+
+        @pm.penaltymodel_factory(10 ** 6 + 1)
+        def fast(specification):
+            return low_widget
+
+        self.register(slow, fast)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            widget = pm.get_penalty_model(self.spec, executor=executor)
+
+        self.assertIs(widget, high_widget)
+
+    def test_impossible_short_circuits(self):
+        blocker = threading.Event()
+        self.addCleanup(blocker.set)
+
+        @pm.penaltymodel_factory(10 ** 6 + 2)
+        def blocked(specification):
+            blocker.wait(5)
+            return _simple_widget()
+
+        @pm.penaltymodel_factory(10 ** 6 + 1)
+        def impossible(specification):
+            raise pm.ImpossiblePenaltyModel
+
+        self.register(blocked, impossible)
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        with self.assertRaises(pm.ImpossiblePenaltyModel):
+            pm.get_penalty_model(self.spec, executor=executor)
+
+    def test_no_factory_succeeds(self):
+        @pm.penaltymodel_factory(10 ** 6)
+        def failing(specification):
+            raise pm.MissingPenaltyModel
+
+        # only the registered factory can succeed so any installed ones must be removed
+        for factory in list(pm.iter_factories()):
+            pm.unregister_factory(factory)
+            self.addCleanup(pm.register_factory, factory)
+        self.register(failing)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertIsNone(pm.get_penalty_model(self.spec, executor=executor))
+
+    def test_process_pool(self):
+        self.register(_slow_failing_factory, _fast_factory)
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            widget = pm.get_penalty_model(self.spec, executor=executor)
+
+        self.assertEqual(widget, _simple_widget())
+
+
+class TestTimeouts(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+
+        self.blocker = blocker = threading.Event()
+        self.addCleanup(blocker.set)
+
+        @pm.penaltymodel_factory(10 ** 6 + 2, timeout=.05)
+        def slow(specification):
+            blocker.wait(5)
+            return _simple_widget()
+
+        self.slow = slow
+
+    def test_decorator(self):
+        @pm.penaltymodel_factory(5, timeout=1.5)
+        def factory(specification):
+            pass
+
+        self.assertEqual(factory.priority, 5)
+        self.assertEqual(factory.timeout, 1.5)
+
+    def test_factory_budget(self):
+        self.register(self.slow, _fast_factory)
+
+        timed_out = []
+        widget = pm.get_penalty_model(self.spec, timed_out=timed_out)
+
+        self.assertEqual(widget, _simple_widget())
+        self.assertEqual(timed_out, [self.slow])
+
+    def test_abandoned_factory(self):
+        threads = []
+
+        @pm.penaltymodel_factory(10 ** 6 + 2, timeout=.05)
+        def slow(specification):
+            threads.append(threading.current_thread())
+            self.blocker.wait(5)
+            return _simple_widget()
+
+        self.register(slow)
+
+        timed_out = []
+        pm.get_penalty_model(self.spec, timed_out=timed_out)
+        self.assertEqual(timed_out, [slow])
+
+        # the factory that timed out keeps running, in a thread that does not block exit
+        thread, = threads
+        self.assertTrue(thread.is_alive())
+        self.assertTrue(thread.daemon)
+
+        self.blocker.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_global_deadline(self):
+        blocker = self.blocker
+
+        @pm.penaltymodel_factory(10 ** 6 + 2)
+        def unbudgeted(specification):
+            blocker.wait(5)
+            return _simple_widget()
+
+        self.register(unbudgeted, _fast_factory)
+
+        timed_out = []
+        t = time.time()
+        widget = pm.get_penalty_model(self.spec, timeout=.05, timed_out=timed_out)
+
+        self.assertLess(time.time() - t, 1)
+        self.assertIsNone(widget)  # no time left for _fast_factory
+        self.assertEqual(timed_out, [unbudgeted])
+
+    def test_no_time_left(self):
+        calls = []
+
+        @pm.penaltymodel_factory(10 ** 6 + 2, timeout=0)
+        def no_budget(specification):
+            calls.append(specification)
+            return _simple_widget()
+
+        self.register(no_budget, _fast_factory)
+
+        # a factory whose time budget has already run out is not started
+        timed_out = []
+        widget = pm.get_penalty_model(self.spec, timed_out=timed_out)
+
+        self.assertEqual(widget, _simple_widget())
+        self.assertEqual(timed_out, [no_budget])
+        self.assertEqual(calls, [])
+
+    def test_race_factory_budget(self):
+        self.register(self.slow, _fast_factory)
+
+        timed_out = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            widget = pm.get_penalty_model(self.spec, executor=executor, timed_out=timed_out)
+            self.blocker.set()
+
+        self.assertEqual(widget, _simple_widget())
+        self.assertEqual(timed_out, [self.slow])
+
+    def test_race_global_deadline(self):
+        self.register(self.slow, _slow_failing_factory)
+
+        timed_out = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            widget = pm.get_penalty_model(self.spec, executor=executor, timeout=.1, timed_out=timed_out)
+            self.blocker.set()
+
+        self.assertIsNone(widget)
+        self.assertEqual(timed_out, [self.slow, _slow_failing_factory])
+
+
+class TestGetPenaltyModels(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.calls = calls = []
+        self.lock = lock = threading.Lock()
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            with lock:
+                calls.append(specification)
+            if len(specification) > 3:
+                raise pm.ImpossiblePenaltyModel
+            model = pm.BinaryQuadraticModel({v: 0 for v in specification.graph},
+                                            {edge: -1 for edge in specification.graph.edges},
+                                            0.0, pm.SPIN)
+            return pm.PenaltyModel.from_specification(specification, model, 2, -1)
+
+        self.register(factory)
+
+    def test_deduplication(self):
+        specs = [pm.Specification(nx.path_graph(n), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN)
+                 for n in [2, 3, 2, 2, 3]]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(pm.get_penalty_models(specs, executor=executor))
+
+        self.assertEqual(len(self.calls), 2)
+
+        self.assertEqual(len(results), len(specs))
+        for spec, (result_spec, widget) in zip(specs, results):
+            self.assertIs(spec, result_spec)
+            self.assertEqual(len(widget), len(spec))
+
+    def test_errors_per_spec(self):
+        specs = [pm.Specification(nx.path_graph(n), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN)
+                 for n in [2, 5, 3]]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(pm.get_penalty_models(specs, executor=executor))
+
+        self.assertIsInstance(results[0][1], pm.PenaltyModel)
+        self.assertIsInstance(results[1][1], pm.ImpossiblePenaltyModel)
+        self.assertIsInstance(results[2][1], pm.PenaltyModel)
+
+    def test_unordered(self):
+        specs = [pm.Specification(nx.path_graph(n), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN)
+                 for n in [2, 3, 4, 2]]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(pm.get_penalty_models(specs, executor=executor, ordered=False))
+
+        self.assertEqual(len(results), len(specs))
+        self.assertEqual(set(id(spec) for spec, __ in results), set(id(spec) for spec in specs))
+
+    def test_different_ranges_not_collapsed(self):
+        graph = nx.path_graph(2)
+        specs = [pm.Specification(graph, (0, 1), {(-1, -1), (1, 1)}, pm.SPIN),
+                 pm.Specification(graph, (0, 1), {(-1, -1), (1, 1)}, pm.SPIN,
+                                  ising_quadratic_ranges={0: {1: [-1, 0]}})]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(pm.get_penalty_models(specs, executor=executor))
+
+        self.assertEqual(len(self.calls), 2)
+
+    def test_canonical(self):
+        specs = [pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN),
+                 pm.Specification([('a', 'b'), ('b', 'c')], ('c', 'a'), {(-1, -1), (1, 1)}, pm.SPIN)]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(pm.get_penalty_models(specs, executor=executor, canonical=True))
+
+        self.assertEqual(len(self.calls), 1)
+        for spec, (result_spec, widget) in zip(specs, results):
+            self.assertIs(spec, result_spec)
+            self.assertTrue(pm.Specification.__eq__(spec, widget))
+            self.assertEqual(set(widget.model.linear), set(spec.graph))
+
+    def test_gauge(self):
+        specs = [pm.Specification(nx.path_graph(3), (0, 2), {(-1, -1), (1, 1)}, pm.SPIN),
+                 pm.Specification(nx.path_graph(3), (0, 2), {(-1, 1), (1, -1)}, pm.SPIN),
+                 pm.Specification([('a', 'b'), ('b', 'c')], ('a', 'c'), {(-1, 1), (1, -1)}, pm.SPIN)]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(pm.get_penalty_models(specs, executor=executor, gauge=True, canonical=True))
+
+        self.assertEqual(len(self.calls), 1)
+        for spec, (result_spec, widget) in zip(specs, results):
+            self.assertIs(spec, result_spec)
+            self.assertTrue(pm.Specification.__eq__(spec, widget))
+
+        # the path of ferromagnetic couplers has one antiferromagnetic coupler when the ends disagree
+        self.assertEqual(sorted(results[1][1].model.quadratic.values()), [-1, 1])
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork',
+                         "registered factories are only inherited by forked workers")
+    def test_process_pool(self):
+        specs = [pm.Specification(nx.path_graph(n), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN)
+                 for n in [2, 5, 2]]
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = [widget for __, widget in pm.get_penalty_models(specs, executor=executor)]
+
+        self.assertIsInstance(results[0], pm.PenaltyModel)
+        self.assertIsInstance(results[1], pm.ImpossiblePenaltyModel)
+        self.assertEqual(results[0], results[2])
+
+    def test_default_executor(self):
+        specs = [pm.Specification(nx.path_graph(n), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN)
+                 for n in [2, 5, 2]]
+
+        # the lookups run in this process, so they see the factories registered here
+        results = [widget for __, widget in pm.get_penalty_models(specs, max_workers=2)]
+
+        self.assertIsInstance(results[0], pm.PenaltyModel)
+        self.assertIsInstance(results[1], pm.ImpossiblePenaltyModel)
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(len(self.calls), 2)
+
+
+class TestDecompose(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.calls = calls = []
+        self.lock = lock = threading.Lock()
+
+        # ferromagnetic chains, only correct when the decision variables should all agree
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            with lock:
+                calls.append(specification)
+            model = pm.BinaryQuadraticModel({v: 0 for v in specification.graph},
+                                            {edge: -1 for edge in specification.graph.edges},
+                                            0.0, pm.SPIN)
+            return pm.PenaltyModel.from_specification(specification, model, 2, -len(model.quadratic))
+
+        self.register(factory)
+
+        graph = nx.Graph([(0, 1), (1, 2), ('a', 'b'), ('b', 'c'), ('c', 'd')])
+        self.spec = pm.Specification(graph, (0, 2, 'a', 'd'),
+                                     {(s, s, t, t) for s in (-1, 1) for t in (-1, 1)}, pm.SPIN)
+
+    def test_parts(self):
+        widget = pm.get_penalty_model(self.spec, decompose=True)
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(sorted(len(spec) for spec in self.calls), [3, 4])
+
+        self.assertTrue(pm.Specification.__eq__(self.spec, widget))
+        self.assertEqual(len(widget.model.quadratic), 5)
+        self.assertEqual(widget.classical_gap, 2)
+        self.assertEqual(widget.ground_energy, -5)
+
+        for config in self.spec.feasible_configurations:
+            sample = {v: 1 for v in self.spec.graph}
+            sample.update(zip((0, 1, 2), [config[0]] * 3))
+            sample.update(zip('abcd', [config[2]] * 4))
+            self.assertEqual(widget.model.energy(sample), widget.ground_energy)
+
+    def test_not_factored(self):
+        spec = pm.Specification(self.spec.graph, (0, 'a'), {(-1, -1), (1, 1)}, pm.SPIN)
+
+        widget = pm.get_penalty_model(spec, decompose=True)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertIs(self.calls[0], spec)
+        self.assertTrue(pm.Specification.__eq__(spec, widget))
+
+
+class TestSingleFlight(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        self.calls = []
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def run_threads(self, num_threads):
+        results = [None] * num_threads
+
+        def lookup(idx):
+            try:
+                results[idx] = pm.get_penalty_model(pm.Specification(nx.path_graph(2), (0, 1),
+                                                                     {(-1, -1), (1, 1)}, vartype=pm.SPIN))
+            except Exception as e:
+                results[idx] = e
+
+        threads = [threading.Thread(target=lookup, args=(idx,)) for idx in range(num_threads)]
+        for t in threads:
+            t.start()
+
+        # let all of the threads queue up behind the first before releasing the factory
+        time.sleep(.1)
+        self.release.set()
+
+        for t in threads:
+            t.join()
+
+        return results
+
+    def test_coalesced(self):
+        calls, release = self.calls, self.release
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            calls.append(specification)
+            release.wait(5)
+            return _simple_widget()
+
+        self.register(factory)
+
+        results = self.run_threads(8)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r == results[0] for r in results))
+        self.assertIsInstance(results[0], pm.PenaltyModel)
+
+        # the followers are given copies, so editing one result does not change the others
+        self.assertEqual(len(set(map(id, results))), len(results))
+        results[1].model.linear[0] = 5
+        self.assertNotEqual(results[0].model.linear[0], 5)
+
+        # once finished, the next lookup is done again
+        pm.get_penalty_model(self.spec)
+        self.assertEqual(len(calls), 2)
+
+    def test_exception_shared(self):
+        calls, release = self.calls, self.release
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            calls.append(specification)
+            release.wait(5)
+            raise pm.ImpossiblePenaltyModel
+
+        self.register(factory)
+
+        results = self.run_threads(8)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(r, pm.ImpossiblePenaltyModel) for r in results))
+
+    def test_follower_timeout(self):
+        calls, release = self.calls, self.release
+        started = threading.Event()
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            calls.append(specification)
+            started.set()
+            release.wait(5)
+            return _simple_widget()
+
+        self.register(factory)
+
+        leader = threading.Thread(target=pm.get_penalty_model, args=(self.spec,))
+        leader.start()
+        started.wait(5)
+
+        # the follower gives up waiting, which is reported like the leader's own timeouts
+        timed_out = []
+        self.assertIsNone(pm.get_penalty_model(self.spec, timeout=.01, timed_out=timed_out))
+        self.assertEqual(timed_out, [factory])
+
+        release.set()
+        leader.join()
+        self.assertEqual(len(calls), 1)
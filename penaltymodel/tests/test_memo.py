@@ -0,0 +1,250 @@
+import unittest
+
+import networkx as nx
+
+import penaltymodel as pm
+
+from penaltymodel.tests.test_interface import RegisteredFactoriesMixin
+
+
+def _path_spec(n):
+    return pm.Specification(nx.path_graph(n), (0, n - 1), {(-1, -1), (1, 1)}, pm.SPIN)
+
+
+def _path_widget(specification):
+    model = pm.BinaryQuadraticModel({v: 0 for v in specification.graph},
+                                    {edge: -1 for edge in specification.graph.edges},
+                                    0.0, pm.SPIN)
+    return pm.PenaltyModel.from_specification(specification, model, 2, -len(specification) + 1)
+
+
+class TestMemoCache(unittest.TestCase):
+    def test_lru(self):
+        memo = pm.MemoCache(capacity=2)
+
+        widgets = [_path_widget(_path_spec(n)) for n in range(2, 5)]
+        memo.put(widgets[0])
+        memo.put(widgets[1])
+
+        # touch the first so that the second is the least recently used
+        self.assertEqual(memo.get(_path_spec(2)), widgets[0])
+
+        memo.put(widgets[2])
+        self.assertEqual(len(memo), 2)
+
+        self.assertEqual(memo.get(_path_spec(2)), widgets[0])
+        self.assertEqual(memo.get(_path_spec(4)), widgets[2])
+        with self.assertRaises(pm.MissingPenaltyModel):
+            memo.get(_path_spec(3))
+
+        self.assertEqual((memo.hits, memo.misses), (3, 1))
+
+    def test_invalidate(self):
+        memo = pm.MemoCache()
+        memo.put(_path_widget(_path_spec(2)))
+
+        self.assertTrue(memo.invalidate(_path_spec(2)))
+        self.assertFalse(memo.invalidate(_path_spec(2)))
+        self.assertEqual(len(memo), 0)
+
+        memo.put(_path_widget(_path_spec(2)))
+        memo.get(_path_spec(2))
+        memo.clear()
+        self.assertEqual(len(memo), 0)
+        self.assertEqual((memo.hits, memo.misses), (0, 0))
+
+    def test_copies(self):
+        memo = pm.MemoCache()
+        widget = _path_widget(_path_spec(3))
+        memo.put(widget)
+
+        # neither the added penalty model nor the retrieved ones are held
+        widget.model.linear[0] = 5
+        first = memo.get(_path_spec(3))
+        self.assertIsNot(first, widget)
+        self.assertEqual(first.model.linear[0], 0)
+
+        first.relabel_variables({0: 'a', 1: 'b', 2: 'c'}, copy=False)
+        first.model.quadratic[('a', 'b')] = 5
+        second = memo.get(_path_spec(3))
+        self.assertEqual(second, _path_widget(_path_spec(3)))
+        self.assertEqual(second.model, _path_widget(_path_spec(3)).model)
+
+    def test_ranges_in_key(self):
+        memo = pm.MemoCache()
+        memo.put(_path_widget(_path_spec(2)))
+
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, pm.SPIN,
+                                ising_linear_ranges={0: [-1, 1]})
+        with self.assertRaises(pm.MissingPenaltyModel):
+            memo.get(spec)
+
+    def test_bad_capacity(self):
+        with self.assertRaises(ValueError):
+            pm.MemoCache(0)
+
+
+class TestInterfaceMemo(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.calls = calls = []
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            calls.append(specification)
+            return _path_widget(specification)
+
+        self.register(factory)
+
+        self.memo = pm.enable_memo(capacity=16)
+        self.addCleanup(pm.disable_memo)
+
+    def test_get_penalty_model(self):
+        widget = pm.get_penalty_model(_path_spec(3))
+        self.assertEqual(pm.get_penalty_model(_path_spec(3)), widget)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual((self.memo.hits, self.memo.misses), (1, 1))
+
+        self.memo.invalidate(_path_spec(3))
+        pm.get_penalty_model(_path_spec(3))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_get_penalty_models(self):
+        widget = pm.get_penalty_model(_path_spec(3))
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(pm.get_penalty_models([_path_spec(3), _path_spec(4)], executor=executor))
+
+        self.assertEqual(results[0][1], widget)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(pm.get_penalty_model(_path_spec(4)), results[1][1])
+
+    def test_disable(self):
+        pm.disable_memo()
+        pm.get_penalty_model(_path_spec(3))
+        pm.get_penalty_model(_path_spec(3))
+        self.assertEqual(len(self.calls), 2)
+
+
+class TestNegativeCache(unittest.TestCase):
+    def test_outcomes(self):
+        negative = pm.NegativeCache()
+
+        negative.check(_path_spec(2))  # unknown, does nothing
+
+        negative.add_impossible(_path_spec(2))
+        negative.add_missing(_path_spec(3))
+
+        with self.assertRaises(pm.ImpossiblePenaltyModel):
+            negative.check(_path_spec(2))
+        with self.assertRaises(pm.MissingPenaltyModel):
+            negative.check(_path_spec(3))
+        self.assertEqual(negative.hits, 2)
+
+        self.assertTrue(negative.invalidate(_path_spec(2)))
+        negative.check(_path_spec(2))
+
+    def test_ttl(self):
+        negative = pm.NegativeCache(ttl=0)
+        negative.add_impossible(_path_spec(2))
+        negative.check(_path_spec(2))  # already expired
+        self.assertEqual(len(negative), 0)
+
+    def test_capacity(self):
+        negative = pm.NegativeCache(capacity=1)
+        negative.add_impossible(_path_spec(2))
+        negative.add_impossible(_path_spec(3))
+        negative.check(_path_spec(2))
+        self.assertEqual(len(negative), 1)
+
+
+class TestInterfaceNegativeCache(RegisteredFactoriesMixin, unittest.TestCase):
+    def setUp(self):
+        self.calls = calls = []
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            calls.append(specification)
+            if len(specification) > 3:
+                raise pm.ImpossiblePenaltyModel
+            raise pm.MissingPenaltyModel
+
+        # only the registered factory should be able to answer
+        for installed in list(pm.iter_factories()):
+            pm.unregister_factory(installed)
+            self.addCleanup(pm.register_factory, installed)
+        self.register(factory)
+
+        self.negative = pm.enable_negative_cache(ttl=60)
+        self.addCleanup(pm.disable_negative_cache)
+
+    def test_impossible(self):
+        for __ in range(3):
+            with self.assertRaises(pm.ImpossiblePenaltyModel):
+                pm.get_penalty_model(_path_spec(4))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.negative.hits, 2)
+
+    def test_missing(self):
+        for __ in range(3):
+            self.assertIsNone(pm.get_penalty_model(_path_spec(2)))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_register_after_missing(self):
+        self.assertIsNone(pm.get_penalty_model(_path_spec(2)))
+        with self.assertRaises(pm.ImpossiblePenaltyModel):
+            pm.get_penalty_model(_path_spec(4))
+
+        @pm.penaltymodel_factory(10 ** 6 + 1)
+        def solver(specification):
+            return _path_widget(specification)
+
+        # the new factory is asked, the impossible outcome is still remembered
+        pm.register_factory(solver)
+        self.assertEqual(pm.get_penalty_model(_path_spec(2)), _path_widget(_path_spec(2)))
+        with self.assertRaises(pm.ImpossiblePenaltyModel):
+            pm.get_penalty_model(_path_spec(4))
+        self.assertEqual(len(self.calls), 2)
+
+        # removing a factory forgets everything
+        pm.unregister_factory(solver)
+        self.assertEqual(len(self.negative), 0)
+
+    def test_timeout_not_remembered(self):
+        import threading
+        blocker = threading.Event()
+        self.addCleanup(blocker.set)
+
+        @pm.penaltymodel_factory(10 ** 6 + 1, timeout=.01)
+        def slow(specification):
+            blocker.wait(5)
+
+        self.register(slow)
+
+        self.assertIsNone(pm.get_penalty_model(_path_spec(2)))
+        self.assertEqual(len(self.negative), 0)
+
+    def test_use_caches(self):
+        recorded = []
+
+        class Cache(pm.PenaltyModelCache):
+            def get(self, specification):
+                raise pm.MissingPenaltyModel
+
+            def put(self, penalty_model):
+                pass
+
+            def put_impossible(self, specification):
+                recorded.append(specification)
+
+        cache = Cache()
+        pm.register_cache(cache)
+        self.addCleanup(pm.unregister_cache, cache)
+
+        pm.enable_negative_cache(use_caches=True)
+
+        spec = _path_spec(4)
+        with self.assertRaises(pm.ImpossiblePenaltyModel):
+            pm.get_penalty_model(spec)
+        self.assertEqual(recorded, [spec])
@@ -0,0 +1,144 @@
+import unittest
+import threading
+
+import networkx as nx
+
+import penaltymodel as pm
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        # use entrypoints that nothing is installed under so the tests are isolated
+        self.registry = pm.Registry('penaltymodel_test_factory', 'penaltymodel_test_cache')
+
+    def test_empty(self):
+        self.assertEqual(self.registry.factories(), ())
+        self.assertEqual(self.registry.caches(), ())
+
+    def test_factory_priority(self):
+        registry = self.registry
+
+        @pm.penaltymodel_factory(10)
+        def low(spec):
+            pass
+
+        @pm.penaltymodel_factory(100)
+        def high(spec):
+            pass
+
+        def unknown(spec):
+            pass
+
+        registry.register_factory(low)
+        registry.register_factory(unknown)
+        registry.register_factory(high)
+
+        self.assertEqual(registry.factories(), (high, low, unknown))
+
+        # registering twice has no effect
+        registry.register_factory(high)
+        self.assertEqual(registry.factories(), (high, low, unknown))
+
+        registry.unregister_factory(low)
+        self.assertEqual(registry.factories(), (high, unknown))
+
+        with self.assertRaises(ValueError):
+            registry.unregister_factory(low)
+
+    def test_caches(self):
+        registry = self.registry
+
+        def cache(penalty_model):
+            pass
+
+        registry.register_cache(cache)
+        self.assertEqual(registry.caches(), (cache,))
+
+        registry.unregister_cache(cache)
+        self.assertEqual(registry.caches(), ())
+
+        with self.assertRaises(ValueError):
+            registry.unregister_cache(cache)
+
+    def test_refresh_keeps_registered(self):
+        registry = self.registry
+
+        @pm.penaltymodel_factory(10)
+        def factory(spec):
+            pass
+
+        def cache(penalty_model):
+            pass
+
+        registry.register_factory(factory)
+        registry.register_cache(cache)
+        registry.refresh()
+
+        self.assertEqual(registry.factories(), (factory,))
+        self.assertEqual(registry.caches(), (cache,))
+
+    def test_snapshot_is_stable(self):
+        registry = self.registry
+
+        @pm.penaltymodel_factory(10)
+        def factory(spec):
+            pass
+
+        factories = registry.factories()
+        registry.register_factory(factory)
+
+        # previously read snapshots are not modified
+        self.assertEqual(factories, ())
+        self.assertEqual(registry.factories(), (factory,))
+
+    def test_concurrent_reads(self):
+        registry = self.registry
+        errors = []
+
+        def reader():
+            try:
+                for __ in range(1000):
+                    factories = registry.factories()
+                    priorities = [f.priority for f in factories]
+                    if priorities != sorted(priorities, reverse=True):
+                        errors.append(priorities)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=reader) for __ in range(4)]
+        for t in threads:
+            t.start()
+
+        for priority in range(100):
+            registry.register_factory(pm.penaltymodel_factory(priority)(lambda spec: None))
+
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(registry.factories()), 100)
+
+
+class TestInterfaceRegistry(unittest.TestCase):
+    def test_register_factory(self):
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        model = pm.BinaryQuadraticModel({0: 0, 1: 0}, {(0, 1): -1}, 0.0, vartype=pm.SPIN)
+        widget = pm.PenaltyModel.from_specification(spec, model, 2, -1)
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            return widget
+
+        cached = []
+
+        pm.register_factory(factory)
+        pm.register_cache(cached.append)
+        try:
+            self.assertIn(factory, list(pm.iter_factories()))
+            self.assertIs(pm.get_penalty_model(spec), widget)
+            self.assertEqual(cached, [widget])
+        finally:
+            pm.unregister_factory(factory)
+            pm.unregister_cache(cached.append)
+
+        self.assertNotIn(factory, list(pm.iter_factories()))
@@ -0,0 +1,130 @@
+import unittest
+import threading
+
+import networkx as nx
+
+import penaltymodel as pm
+
+from penaltymodel.tests.test_interface import RegisteredFactoriesMixin, _simple_widget
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def test_writes(self):
+        queue = pm.WriteBehindQueue()
+        self.addCleanup(queue.close)
+
+        cached = []
+        for i in range(10):
+            self.assertTrue(queue.put(cached.append, i))
+
+        self.assertTrue(queue.flush())
+        self.assertEqual(cached, list(range(10)))
+        self.assertEqual(queue.pending, 0)
+
+    def test_failed(self):
+        queue = pm.WriteBehindQueue()
+        self.addCleanup(queue.close)
+
+        def cache(penalty_model):
+            raise RuntimeError
+
+        queue.put(cache, 0)
+        queue.put(cache, 1)
+
+        self.assertTrue(queue.flush())
+        self.assertEqual(queue.failed, 2)
+
+    def test_drop(self):
+        queue = pm.WriteBehindQueue(maxsize=1, policy='drop')
+
+        blocker = threading.Event()
+        started = threading.Event()
+
+        def slow_cache(penalty_model):
+            started.set()
+            blocker.wait(5)
+
+        queue.put(slow_cache, 0)
+        started.wait(5)
+
+        # the worker is busy with the first write, so there is only room for one more
+        self.assertTrue(queue.put(slow_cache, 1))
+        self.assertFalse(queue.put(slow_cache, 2))
+        self.assertEqual(queue.dropped, 1)
+        self.assertEqual(queue.pending, 2)
+
+        self.assertFalse(queue.flush(timeout=.01))
+
+        blocker.set()
+        self.assertTrue(queue.close())
+        self.assertEqual(queue.pending, 0)
+
+    def test_close_full_queue(self):
+        queue = pm.WriteBehindQueue(maxsize=1)
+
+        blocker = threading.Event()
+        started = threading.Event()
+        cached = []
+
+        def slow_cache(penalty_model):
+            started.set()
+            blocker.wait(5)
+            cached.append(penalty_model)
+
+        queue.put(slow_cache, 0)
+        started.wait(5)
+        queue.put(slow_cache, 1)  # fills the queue
+
+        # the timeout is respected even though there is no room for the sentinel
+        self.assertFalse(queue.close(timeout=.01))
+
+        with self.assertRaises(RuntimeError):
+            queue.put(slow_cache, 2)
+        self.assertEqual(queue.pending, 2)
+
+        # the queued writes still finish and then the worker stops
+        blocker.set()
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual(cached, [0, 1])
+        queue._worker.join(5)
+        self.assertFalse(queue._worker.is_alive())
+
+    def test_bad_policy(self):
+        with self.assertRaises(ValueError):
+            pm.WriteBehindQueue(policy='ignore')
+
+
+class TestInterfaceWriteBehind(RegisteredFactoriesMixin, unittest.TestCase):
+    def test_get_penalty_model(self):
+        spec = pm.Specification(nx.path_graph(2), (0, 1), {(-1, -1), (1, 1)}, vartype=pm.SPIN)
+        widget = _simple_widget()
+
+        @pm.penaltymodel_factory(10 ** 6)
+        def factory(specification):
+            return widget
+
+        blocker = threading.Event()
+        cached = []
+
+        def slow_cache(penalty_model):
+            blocker.wait(5)
+            cached.append(penalty_model)
+
+        self.register(factory)
+        pm.register_cache(slow_cache)
+        self.addCleanup(pm.unregister_cache, slow_cache)
+
+        queue = pm.enable_write_behind()
+        self.addCleanup(pm.disable_write_behind)
+
+        # returns without waiting for the cache
+        self.assertIs(pm.get_penalty_model(spec), widget)
+        self.assertEqual(cached, [])
+        self.assertEqual(queue.pending, 1)
+
+        blocker.set()
+        self.assertTrue(pm.flush_caches())
+        self.assertEqual(cached, [widget])
+
+        self.assertTrue(pm.disable_write_behind())
+        self.assertTrue(pm.flush_caches())
@@ -0,0 +1,182 @@
+"""
+Write-Behind Queue
+------------------
+
+By default :func:`.get_penalty_model` writes each new PenaltyModel to every cache
+before returning it. With write-behind enabled the writes are instead queued and
+performed by a background worker, so a slow cache does not add to the lookup
+time.
+
+Examples:
+    >>> queue = pm.enable_write_behind(maxsize=100, policy='drop')
+    >>> widget = pm.get_penalty_model(spec)  # doctest: +SKIP
+    >>> pm.flush_caches()  # wait for the queued writes, e.g. on shutdown
+    True
+    >>> queue.pending, queue.failed, queue.dropped
+    (0, 0, 0)
+    >>> pm.disable_write_behind()
+
+"""
+from __future__ import absolute_import
+
+import threading
+import time
+
+from six.moves import queue as queue_module
+
+__all__ = ['WriteBehindQueue']
+
+
+class WriteBehindQueue(object):
+    """A bounded queue of cache writes, drained by a background thread.
+
+    Args:
+        maxsize (int, optional, default=0): The maximum number of writes waiting in
+            the queue. If 0, the queue is unbounded.
+
+        policy (str, optional, default='block'): What to do when a write is added to
+            a full queue. If 'block', :meth:`.put` waits until there is room
+            (backpressure). If 'drop', the write is discarded and counted in
+            :attr:`.dropped`.
+
+    Attributes:
+        pending (int): The number of writes queued or in progress.
+
+        failed (int): The number of writes for which the cache raised an exception.
+
+        dropped (int): The number of writes discarded because the queue was full.
+
+    Notes:
+        Once :meth:`.close` is called no more writes can be added. The worker
+        stops when the writes already queued have finished.
+
+    """
+    _POLICIES = ('block', 'drop')
+
+    def __init__(self, maxsize=0, policy='block'):
+        if policy not in self._POLICIES:
+            raise ValueError("policy must be one of {}".format(self._POLICIES))
+        self.policy = policy
+
+        self._queue = queue_module.Queue(maxsize)
+
+        # guards the counters, notified whenever pending drops to 0
+        self._condition = threading.Condition()
+        self.pending = 0
+        self.failed = 0
+        self.dropped = 0
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._run, name='penaltymodel-write-behind')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def put(self, cache, penalty_model):
+        """Queue a write of `penalty_model` to `cache`.
+
+        Args:
+            cache (function): A function that accepts a :class:`.PenaltyModel`
+                and caches it.
+
+            penalty_model (:class:`.PenaltyModel`): The penalty model to write.
+
+        Returns:
+            bool: False if the write was dropped, otherwise True.
+
+        Raises:
+            RuntimeError: If the queue is closed.
+
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("the write-behind queue is closed")
+            self.pending += 1
+
+        try:
+            if self.policy == 'block':
+                self._queue.put((cache, penalty_model))
+            else:
+                self._queue.put_nowait((cache, penalty_model))
+        except queue_module.Full:
+            with self._condition:
+                self.dropped += 1
+                self._done()
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        """Wait for all of the queued writes to finish.
+
+        Args:
+            timeout (number, optional): The maximum time to wait, in seconds.
+
+        Returns:
+            bool: True if all of the writes finished, False if the timeout expired.
+
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self.pending:
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout=None):
+        """Stop accepting writes, flush the queue and stop the background worker.
+
+        If the timeout expires, the worker still stops once it has finished the
+        queued writes.
+
+        Args:
+            timeout (number, optional): The maximum time to wait for the queued
+                writes, in seconds.
+
+        Returns:
+            bool: True if all of the writes finished, False if the timeout expired.
+
+        """
+        with self._condition:
+            self._closed = True
+
+        flushed = self.flush(timeout)
+
+        # wake the worker if it is waiting for a write. If the queue is full the worker is busy
+        # and stops by itself when it runs out of writes
+        try:
+            self._queue.put_nowait(None)  # sentinel
+        except queue_module.Full:
+            pass
+        return flushed
+
+    def _done(self):
+        # must be called with the condition held
+        self.pending -= 1
+        if not self.pending:
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+
+            if item is not None:
+                cache, penalty_model = item
+                try:
+                    cache(penalty_model)
+                except Exception:
+                    with self._condition:
+                        self.failed += 1
+                        self._done()
+                else:
+                    with self._condition:
+                        self._done()
+
+            # a put that was accepted before close may not have reached the queue yet, it is
+            # counted in pending
+            with self._condition:
+                if self._closed and not self.pending:
+                    return
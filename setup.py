@@ -5,7 +5,9 @@ from penaltymodel.package_info import __version__, __author__, __description__,
 install_requires = ['dimod>=0.5.0<0.6.0',
                     'six>=1.11.0<2.0.0',
                     'networkx>=2.0<3.0',
-                    'enum34>=1.1.6<2.0.0']
+                    'numpy>=1.13.0<2.0.0',
+                    'enum34>=1.1.6<2.0.0',
+                    'futures>=3.1.1<4.0.0;python_version<"3.2"']
 extras_require = {'all': ['penaltymodel_cache>=0.1.0<0.2.0',
                           'penaltymodel_maxgap>=0.1.0<0.2.0']}
 